@@ -0,0 +1,99 @@
+"""Tests for the benchmark regression gate (no network required)."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import bench_compare  # noqa: E402
+from results_store import ResultsStore  # noqa: E402
+
+
+def run(latency, tps, latency_sd=0.01, vram=None, model="m"):
+    result = {
+        "runtime": "ollama",
+        "model": model,
+        "latency": {
+            "ok": True,
+            "avg_latency_sec": latency,
+            "avg_tokens_per_sec": tps,
+            "stats": {"count": 10, "mean": latency, "stddev": latency_sd, "p90": latency},
+            "tokens_per_sec_stats": {"count": 10, "mean": tps, "stddev": 1.0},
+        },
+    }
+    if vram is not None:
+        result["vram_series"] = {"peak_used_mib": vram}
+    return {"schema_version": "runtime-probe-v1", "results": [result], "failures": []}
+
+
+def statuses(report):
+    return {row["metric"]: row["status"] for row in report["comparisons"]}
+
+
+def test_significant_regressions_fail_and_noise_passes():
+    baseline = run(1.0, 50.0, vram=4000)
+    report = bench_compare.compare(baseline, run(1.3, 30.0, vram=4500))
+    assert not report["ok"] and report["regressions"] == 4
+    assert statuses(report) == {
+        "avg_latency_sec": "regression",
+        "avg_tokens_per_sec": "regression",
+        "p90_latency_sec": "regression",
+        "peak_vram_used_mib": "regression",
+    }
+    latency_row = report["comparisons"][0]
+    assert latency_row["test"] == "welch" and latency_row["p_value"] < 0.05
+    assert latency_row["change"] == pytest.approx(0.3)
+
+    # Same 30% shift, but the spread is so wide the t-test cannot tell it from noise.
+    noisy = bench_compare.compare(run(1.0, 50.0, latency_sd=2.0), run(1.3, 50.0, latency_sd=2.0))
+    assert statuses(noisy)["avg_latency_sec"] == "ok"
+    assert statuses(noisy)["p90_latency_sec"] == "regression"  # threshold-only metric
+    relaxed = bench_compare.compare(
+        run(1.0, 50.0, latency_sd=2.0),
+        run(1.3, 50.0, latency_sd=2.0),
+        bench_compare.parse_thresholds(["p90_latency_sec=0.5"]),
+    )
+    assert relaxed["ok"]
+    assert statuses(bench_compare.compare(baseline, run(0.5, 80.0)))["avg_latency_sec"] == (
+        "improvement"
+    )
+
+
+def test_missing_models_and_schema_mismatch():
+    baseline = run(1.0, 50.0)
+    baseline["results"].append(run(1.0, 50.0, model="gone")["results"][0])
+    report = bench_compare.compare(baseline, run(1.0, 50.0))
+    assert not report["ok"]
+    assert {"runtime": "ollama", "model": "gone", "metric": "result", "status": "missing"} in (
+        report["comparisons"]
+    )
+    assert bench_compare.compare(baseline, run(1.0, 50.0), allow_missing=True)["ok"]
+    with pytest.raises(ValueError):
+        bench_compare.compare({"schema_version": "vram-bench-v1"}, run(1.0, 50.0))
+    with pytest.raises(ValueError):
+        bench_compare.parse_thresholds(["unknown=0.1"])
+
+
+def test_cli_uses_latest_stored_baseline(tmp_path, monkeypatch, capsys):
+    db = tmp_path / "results.sqlite"
+    store = ResultsStore(db)
+    store.record("runtime_probe", run(5.0, 10.0), ts=100.0)
+    store.record("runtime_probe", run(1.0, 50.0), ts=200.0)
+    current = run(1.5, 50.0)
+    store.record("runtime_probe", current, ts=300.0)  # the current run itself is skipped
+    store.close()
+    path = tmp_path / "current.json"
+    path.write_text(json.dumps(current), encoding="utf-8")
+
+    argv = ["bench_compare.py", "--current", str(path), "--baseline-store", str(db)]
+    monkeypatch.setattr(sys, "argv", argv)
+    assert bench_compare.main() == 1
+    captured = capsys.readouterr()
+    assert json.loads(captured.out)["regressions"] == 2
+    assert "REGRESSION" in captured.err and "+50.0%" in captured.err
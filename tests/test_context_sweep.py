@@ -0,0 +1,91 @@
+"""Tests for the prompt/output length sweep against the in-process mock server."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import context_sweep  # noqa: E402
+import mock_openai_server  # noqa: E402
+import policy_calibrate  # noqa: E402
+from probe_common import HttpClient  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def chat_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), mock_openai_server.Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    server.shutdown()
+    server.server_close()
+
+
+def test_prompts_converge_on_reported_token_counts(chat_url):
+    builder = context_sweep.PromptBuilder(seed=1)
+    builder.tokens_per_word = 2.0  # a bad initial guess, corrected by the first response
+    args = argparse.Namespace(
+        model="ok", url=chat_url, iterations=1, ignore_eos=True, timeout_sec=5
+    )
+    client = HttpClient(timeout_sec=5)
+    first = context_sweep.measure_cell(client, builder, args, 2000, 4, None)
+    second = context_sweep.measure_cell(client, builder, args, 2000, 4, None)
+    assert first["prompt_tokens"] < 1100
+    assert abs(second["prompt_tokens"] - 2000) < 50
+    assert second["output_tokens"] == 4
+    assert second["ttft_sec"] < second["total_sec"] and second["decode_tokens_per_sec"] > 0
+    prompts = {builder.build(10).split("]")[0] for _ in range(3)}
+    assert len(prompts) == 3  # unique nonces defeat prefix caching
+
+    failed = context_sweep.measure_cell(
+        client, builder, argparse.Namespace(**{**vars(args), "model": "http_500"}), 100, 4, None
+    )
+    assert failed["error"].startswith("HTTP 500")
+    client.close()
+
+
+def test_fits_and_calibration_input(tmp_path):
+    def cell(prompt, output, ttft, vram):
+        return {
+            "prompt_tokens_target": prompt,
+            "output_tokens_target": output,
+            "prompt_tokens": prompt,
+            "output_tokens": output,
+            "ttft_sec": ttft,
+            "decode_tokens_per_sec": 50.0,
+            "total_sec": ttft + output / 50.0,
+            "peak_vram_used_mib": vram,
+        }
+
+    grid = [
+        cell(k * 1000, out, 0.1 + 0.05 * k + 0.001 * k * k, 4000 + 60 * k)
+        for k in (1, 4, 16, 32)
+        for out in (16, 256)
+    ]
+    grid.append({"prompt_tokens_target": 64000, "output_tokens_target": 16, "error": "timeout"})
+    fits = context_sweep.fit_grid(grid)
+    assert fits["prefill_sec"]["degree"] == 2
+    assert fits["prefill_sec"]["coefficients_per_ktok"] == pytest.approx(
+        [0.1, 0.05, 0.001], abs=1e-6
+    )
+    assert fits["peak_vram_mib"]["r2"] > 0.9
+
+    path = tmp_path / "sweep.json"
+    path.write_text(
+        json.dumps({"schema_version": "context-sweep-v1", "model": "m", "grid": grid}),
+        encoding="utf-8",
+    )
+    points, _ = policy_calibrate.collect_inputs([path], probe_prompt_tokens=16)
+    assert [p.prompt_tokens for p in points] == [1000, 4000, 16000, 32000]
+    assert points[0].latency_p95_sec == pytest.approx(grid[1]["total_sec"])  # output 256
+    points, _ = policy_calibrate.collect_inputs([path], 16, sweep_output_tokens=16)
+    assert points[0].vram_used_mib == 4060.0 and points[0].model == "m"
@@ -0,0 +1,27 @@
+"""Tests for the per-file stat cache."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+from file_cache import StatCache  # noqa: E402
+
+
+def test_save_is_atomic_and_bounded(tmp_path):
+    path = tmp_path / "nested" / "cache.json"
+    cache = StatCache(path, fingerprint="v1", max_entries=2)
+    for name in ("a", "b", "c"):
+        cache.put((str(tmp_path / name), 1, 1), name)
+    cache.put((str(tmp_path / "b"), 2, 2), "b2")  # rewrite moves b behind c
+    cache.save()
+    assert [p.name for p in path.parent.iterdir()] == ["cache.json"]  # no temp file left
+
+    reloaded = StatCache(path, fingerprint="v1")
+    assert reloaded.get((str(tmp_path / "a"), 1, 1)) is None
+    assert reloaded.get((str(tmp_path / "c"), 1, 1)) == "c"
+    assert reloaded.get((str(tmp_path / "b"), 2, 2)) == "b2"
+    assert StatCache(path, fingerprint="v2").get((str(tmp_path / "c"), 1, 1)) is None
@@ -0,0 +1,79 @@
+"""Tests for shared latency statistics (no network required)."""
+
+from __future__ import annotations
+
+import itertools
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+from latency_stats import (  # noqa: E402
+    Histogram,
+    LatencyStats,
+    SamplingPlan,
+    bootstrap_ci,
+    run_adaptive,
+    student_t_sf,
+    summary_stats,
+    welch_t_test,
+)
+
+
+def test_warmup_is_discarded():
+    values = iter([9.0, 1.0, 2.0, 3.0])
+    kept, stats = run_adaptive(lambda: next(values), float, SamplingPlan(warmup=1))
+    assert kept == [1.0, 2.0, 3.0]
+    summary = stats.to_dict()
+    assert summary["mean"] == pytest.approx(2.0)
+    assert summary["stddev"] == pytest.approx(1.0)
+    assert summary["warmup_discarded"] == 1 and summary["converged"] is None
+
+
+def test_adaptive_stops_when_ci_is_narrow():
+    rng = random.Random(3)
+    noisy = lambda: 1.0 + rng.uniform(-0.05, 0.05)  # noqa: E731
+    plan = SamplingPlan(warmup=0, min_iterations=5, max_iterations=200, target_rel_ci=0.01)
+    kept, stats = run_adaptive(noisy, float, plan)
+    assert 5 <= len(kept) < 200
+    assert stats.converged is True and stats.rel_ci_half_width() <= 0.01
+
+    counter = itertools.count()
+    wild = lambda: float(next(counter) % 2 * 100 + 1)  # noqa: E731
+    plan = SamplingPlan(warmup=0, min_iterations=3, max_iterations=6, target_rel_ci=0.001)
+    kept, stats = run_adaptive(wild, float, plan)
+    assert len(kept) == 6 and stats.converged is False
+
+
+def test_bootstrap_ci_brackets_the_mean():
+    values = [float(v) for v in range(1, 21)]
+    low, high = bootstrap_ci(values, rng=random.Random(0))
+    assert low < 10.5 < high
+    assert bootstrap_ci([4.0]) == (4.0, 4.0)
+
+
+def test_histogram_round_trips_and_bounds_percentiles():
+    stats = LatencyStats.from_samples([0.1 * n for n in range(1, 101)])
+    hist = stats.histogram()
+    assert hist.count == 100
+    for pct in (50, 90, 99):
+        exact = stats.to_dict()[f"p{pct}"]
+        assert hist.percentile(pct) == pytest.approx(exact, rel=0.02)
+    restored = Histogram.from_dict(hist.to_dict())
+    assert restored.counts == hist.counts
+    restored.merge(hist)
+    assert restored.count == 200
+
+
+def test_welch_t_test_matches_reference_values():
+    assert student_t_sf(2.0, 10) == pytest.approx(0.036694, abs=1e-6)
+    assert student_t_sf(-2.0, 10) == pytest.approx(1 - 0.036694, abs=1e-6)
+    t, df, p = welch_t_test(summary_stats([1, 2, 3, 4]), summary_stats([3, 4, 5, 6, 7]))
+    assert (t, df, p) == pytest.approx((2.611165, 6.980769, 0.017469), abs=1e-5)
+    assert welch_t_test(summary_stats([1.0]), summary_stats([2.0, 3.0])) is None
+    assert welch_t_test(summary_stats([1.0, 1.0]), summary_stats([1.0, 1.0]))[2] == 1.0
+    assert welch_t_test(summary_stats([1.0, 1.0]), summary_stats([2.0, 2.0]))[2] == 0.0
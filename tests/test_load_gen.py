@@ -0,0 +1,64 @@
+"""Tests for the concurrency-sweep load generator against the in-process mock server."""
+
+from __future__ import annotations
+
+import random
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import load_gen  # noqa: E402
+import mock_openai_server  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def chat_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), mock_openai_server.Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrency_steps():
+    assert load_gen.concurrency_steps(1) == [1]
+    assert load_gen.concurrency_steps(8) == [1, 2, 4, 8]
+    assert load_gen.concurrency_steps(6) == [1, 2, 4, 6]
+
+
+def test_closed_loop_scales_with_users(chat_url):
+    send = load_gen.make_sender(chat_url, "ok", "hi", 16, 5)
+    one = load_gen.summarize_step(*load_gen.closed_loop(send, 1, 0.3))
+    four = load_gen.summarize_step(*load_gen.closed_loop(send, 4, 0.3))
+    assert one["errors"] == 0 and four["errors"] == 0
+    assert four["output_tokens_per_sec"] > 2 * one["output_tokens_per_sec"]
+    assert 0 < four["ttft_sec"]["p50"] < four["latency_sec"]["p50"] <= four["latency_sec"]["p99"]
+
+
+def test_open_loop_sends_each_arrival(chat_url):
+    send = load_gen.make_sender(chat_url, "ok", "hi", 16, 5)
+    arrivals = load_gen.poisson_arrivals(50.0, 0.2, random.Random(1))
+    assert arrivals == load_gen.poisson_arrivals(50.0, 0.2, random.Random(1))
+    samples, wall, dropped = load_gen.open_loop(send, arrivals, max_in_flight=64)
+    assert len(samples) == len(arrivals) and dropped == 0
+    assert wall >= arrivals[-1]
+
+    errors = load_gen.summarize_step(
+        load_gen.open_loop(load_gen.make_sender(chat_url, "http_500", "hi", 16, 5), [0.0], 4)[0],
+        0.1,
+    )
+    assert errors["errors"] == 1 and errors["error_samples"][0].startswith("HTTP 500")
+    assert errors["latency_sec"] is None
+
+
+def test_knee_is_last_step_that_still_scales():
+    steps = [{"output_tokens_per_sec": v} for v in (100.0, 190.0, 200.0, 400.0)]
+    assert load_gen.knee_index(steps, 0.1) == 1
+    assert load_gen.knee_index([{"output_tokens_per_sec": 0.0}], 0.1) is None
@@ -0,0 +1,115 @@
+"""Tests for live load signals and the local_saturated routing stage."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import load_signals  # noqa: E402
+import placement  # noqa: E402
+import policy_engine  # noqa: E402
+import policy_service  # noqa: E402
+
+METRICS = """\
+# HELP vllm:num_requests_waiting Number of requests waiting to be processed.
+# TYPE vllm:num_requests_waiting gauge
+vllm:num_requests_waiting{model_name="Qwen/Qwen2.5-7B-Instruct"} 3.0
+vllm:num_requests_waiting{model_name="other model"} 1.0
+vllm:num_requests_running{model_name="Qwen/Qwen2.5-7B-Instruct"} 2.0
+"""
+
+
+def test_prometheus_parse_sums_label_sets():
+    assert load_signals.parse_prometheus(METRICS, load_signals.WAITING_METRICS) == 4.0
+    assert load_signals.parse_prometheus(METRICS, load_signals.RUNNING_METRICS) == 2.0
+    assert load_signals.parse_prometheus("", load_signals.WAITING_METRICS) is None
+
+
+def test_ewma_and_queue_prediction():
+    tracker = load_signals.LoadTracker(alpha=0.5, max_age_sec=10)
+    assert tracker.predicted_latency("ollama") is None
+    tracker.observe_latency("ollama", 2.0)
+    tracker.observe_latency("ollama", 4.0)
+    assert tracker.predicted_latency("ollama") == pytest.approx(3.0)
+
+    # Two slots, both busy, two waiting: waits 1.5 service times for a slot.
+    tracker.update_queue("ollama", load_signals.QueueSample(waiting=2, running=2, slots=2), now=0)
+    assert tracker.snapshot("ollama", now=1).predicted_latency_sec == pytest.approx(7.5)
+    # Stale queue samples are ignored.
+    assert tracker.snapshot("ollama", now=11).predicted_latency_sec == pytest.approx(3.0)
+
+    tracker.start("ollama")
+    tracker.start("ollama")
+    assert tracker.snapshot("ollama", now=11).predicted_latency_sec == pytest.approx(9.0)
+    tracker.finish("ollama", latency_sec=3.0)
+    assert tracker.snapshot("ollama", now=11).in_flight == 1
+
+
+def test_engine_load_stage_only_when_otherwise_local():
+    rules = policy_engine.load_rules(TOOLS_DIR / "policy_rules.json")
+    rules["local_latency_slo_sec"] = 10
+    compiled = policy_engine.compile_rules(rules)
+
+    saturated = policy_engine.decide_record(
+        {"paths": ["README.md"], "predicted_latency_sec": 40}, compiled
+    )
+    assert saturated == {
+        "route": "claude_first",
+        "reason": "local_saturated",
+        "predicted_latency_sec": 40,
+    }
+    fast = policy_engine.decide_record(
+        {"paths": ["README.md"], "predicted_latency_sec": 4}, compiled
+    )
+    denied = policy_engine.decide_record({"paths": [".env"], "predicted_latency_sec": 40}, compiled)
+    assert fast["reason"] == "default_safe"
+    assert denied["reason"] == "denylist_path"
+
+
+@pytest.fixture
+def service():
+    rules = policy_engine.load_rules(TOOLS_DIR / "policy_rules.json")
+    rules["local_latency_slo_sec"] = 10
+    monitor = policy_service.VramMonitor(interval_sec=0, timeout_sec=1)
+    return policy_service.PolicyService(rules, monitor, policy_service.DecisionCache(8))
+
+
+def test_service_observe_drives_saturation(service):
+    record = {"paths": ["README.md"], "vram_free_mib": 4096}
+    assert service.decide(record)["reason"] == "default_safe"
+
+    service.observe({"runtime": "ollama", "latency_sec": 8.0})
+    service.observe({"runtime": "ollama", "event": "start"})
+    service.observe({"runtime": "ollama", "event": "start"})
+    decision = service.decide(record)
+    assert (decision["route"], decision["reason"]) == ("claude_first", "local_saturated")
+    assert decision["predicted_latency_sec"] == 24.0
+
+    service.observe({"runtime": "ollama", "event": "end", "latency_sec": 8.0})
+    service.observe({"runtime": "ollama", "event": "end", "latency_sec": 8.0})
+    assert service.decide(record)["reason"] == "default_safe"
+    with pytest.raises(ValueError):
+        service.observe({"runtime": "ollama", "event": "stop"})
+
+
+def test_service_placement_skips_saturated_runtime(service):
+    service.placement_config = placement.PlacementConfig(
+        runtimes=[
+            placement.RuntimeSpec(name="fast-but-busy", url="", models=["a"]),
+            placement.RuntimeSpec(name="idle", url="", models=["b"]),
+        ],
+        footprints={"a": 1000, "b": 1000},
+    )
+    gpus = [{"index": 0, "free_mib": 8000, "total_mib": 8000}]
+    service.observe({"runtime": "fast-but-busy", "latency_sec": 30.0})
+    decision = service.decide({"paths": ["README.md"], "gpus": gpus})
+    assert decision["placement"]["runtime"] == "idle"
+
+    service.observe({"runtime": "idle", "latency_sec": 30.0})
+    decision = service.decide({"paths": ["README.md"], "gpus": gpus})
+    assert decision["reason"] == "local_saturated"
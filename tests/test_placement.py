@@ -0,0 +1,101 @@
+"""Tests for multi-GPU / multi-runtime placement decisions."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import placement  # noqa: E402
+import policy_engine  # noqa: E402
+import residency  # noqa: E402
+
+
+def gpu(index: int, free_mib: int, total_mib: int = 24576) -> dict:
+    return {"index": index, "free_mib": free_mib, "total_mib": total_mib}
+
+
+def make_config() -> placement.PlacementConfig:
+    return placement.PlacementConfig(
+        runtimes=[
+            placement.RuntimeSpec(name="vllm", url="", models=["big"], gpus=[0]),
+            placement.RuntimeSpec(name="ollama", url="", models=["big", "small", "unknown"]),
+        ],
+        footprints={"big": 20000, "small": 4000},
+    )
+
+
+def test_footprints_use_smallest_catalog_tier():
+    footprints = placement.load_footprints()
+    assert footprints["qwen2.5:0.5b-instruct"] == 1024
+    assert footprints["llama3.1:latest"] == 8192
+
+
+def test_idle_second_gpu_is_used_when_first_is_busy():
+    chosen = placement.choose_placement([gpu(0, 1200), gpu(1, 23000)], make_config())
+    assert chosen is not None
+    assert (chosen.runtime, chosen.model, chosen.gpu_index) == ("ollama", "big", 1)
+
+
+def test_runtime_gpu_restriction_and_fallback_to_smaller_model():
+    chosen = placement.choose_placement([gpu(0, 22000), gpu(1, 5000)], make_config())
+    assert (chosen.runtime, chosen.gpu_index) == ("vllm", 0)
+
+    chosen = placement.choose_placement([gpu(0, 3000), gpu(1, 5000)], make_config())
+    assert (chosen.runtime, chosen.model, chosen.gpu_index) == ("ollama", "small", 1)
+
+
+def test_min_free_thresholds_apply_per_gpu():
+    chosen = placement.choose_placement(
+        [gpu(0, 6000), gpu(1, 5000)], make_config(), min_free_mib=5500
+    )
+    assert chosen.gpu_index == 0
+    assert placement.choose_placement([gpu(0, 5000)], make_config(), min_free_ratio=0.5) is None
+
+
+def test_evaluate_reports_placement_or_escalates():
+    rules = {"denylist_paths": [".env"]}
+    config = make_config()
+    decision = policy_engine.evaluate(
+        ["README.md"], 0, rules, gpus=[gpu(0, 1000), gpu(1, 23000)], placement_config=config
+    )
+    assert decision["route"] == "local"
+    assert decision["placement"]["gpu_index"] == 1
+
+    decision = policy_engine.evaluate(
+        ["README.md"], 0, rules, gpus=[gpu(0, 1000)], placement_config=config
+    )
+    assert decision == {"route": "claude_first", "reason": "no_local_capacity"}
+    decision = policy_engine.evaluate(["README.md"], 0, rules, placement_config=config)
+    assert decision == {"route": "claude_first", "reason": "missing_vram_signal"}
+
+
+def test_resident_model_beats_marginally_better_model():
+    config = make_config()
+    gpus = [gpu(0, 1000), gpu(1, 23000)]
+    resident = {"ollama": {"small"}}
+
+    chosen = placement.choose_placement(gpus, config, resident=resident, swap_cost_weight=1.5)
+    assert (chosen.model, chosen.resident) == ("small", True)
+
+    chosen = placement.choose_placement(gpus, config, resident=resident, swap_cost_weight=0.5)
+    assert (chosen.model, chosen.resident) == ("big", False)
+
+
+def test_resident_model_needs_no_free_vram_for_weights():
+    config = make_config()
+    chosen = placement.choose_placement(
+        [gpu(1, 2000)], config, resident={"ollama": {"unknown"}}, swap_cost_weight=1.0
+    )
+    assert (chosen.model, chosen.footprint_mib, chosen.resident) == ("unknown", None, True)
+
+
+def test_residency_tracker_expires_and_replaces():
+    tracker = residency.ResidencyTracker(ttl_sec=10)
+    tracker.observe("ollama", "a", now=0)
+    tracker.observe("ollama", "b", now=5)
+    assert tracker.snapshot(now=12) == {"ollama": {"b"}}
+    tracker.replace("ollama", ["c"], now=12)
+    assert tracker.snapshot(now=13) == {"ollama": {"c"}}
@@ -0,0 +1,122 @@
+"""Tests for policy threshold calibration."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import policy_calibrate  # noqa: E402
+
+
+def curve(tokens: int) -> float:
+    # 0.5 s + 0.1 s per ktok + 0.002 s per ktok^2
+    k = tokens / 1000
+    return 0.5 + 0.1 * k + 0.002 * k * k
+
+
+def test_quadratic_fit_recovers_threshold_and_vram_growth(tmp_path):
+    points = [
+        {"prompt_tokens": t, "samples": [curve(t) * 0.9, curve(t)], "vram_used_mib": 5000 + t / 20}
+        for t in (1000, 4000, 16000, 32000, 64000)
+    ]
+    path = tmp_path / "points.json"
+    path.write_text(json.dumps({"points": points}), encoding="utf-8")
+
+    found, drops = policy_calibrate.collect_inputs([path], probe_prompt_tokens=16)
+    result = policy_calibrate.calibrate(found, drops, 10.0, headroom_mib=512, max_extrapolation=1.5)
+
+    # p95 of the two samples is 0.995 * curve; the threshold is where that reaches 10 s.
+    threshold = result["proposed"]["long_context_threshold_tokens"]
+    assert 0.995 * curve(threshold) <= 10.0 < 0.995 * curve(threshold + 1)
+    assert result["latency_fit"]["degree"] == 2
+    assert result["proposed"]["min_free_vram_mib"] == pytest.approx(threshold / 20 + 512, abs=2)
+    assert result["notes"] == []
+
+
+def test_probe_outputs_feed_points_and_vram_fallback(tmp_path):
+    bench = {
+        "schema_version": "vram-bench-v1",
+        "results": [
+            {
+                "model": "m",
+                "latency": {
+                    "ok": True,
+                    "avg_latency_sec": 0.4,
+                    "latency_stats": {"p90": 0.5, "p99": 0.6},
+                },
+                "min_free_drop_mib": 4200,
+            },
+        ],
+    }
+    (tmp_path / "bench.json").write_text(json.dumps(bench), encoding="utf-8")
+    (tmp_path / "long.jsonl").write_text(
+        json.dumps({"model": "m", "prompt_tokens": 8016, "latency_sec": 2.6}) + "\n",
+        encoding="utf-8",
+    )
+    points, drops = policy_calibrate.collect_inputs(
+        [tmp_path / "bench.json", tmp_path / "long.jsonl"], probe_prompt_tokens=16
+    )
+    assert (points[0].latency_p95_sec, points[0].statistic) == (0.6, "p99")
+    result = policy_calibrate.calibrate(points, drops, 30.0, headroom_mib=256, max_extrapolation=2)
+
+    assert result["latency_fit"]["degree"] == 1
+    assert result["proposed"] == {
+        "long_context_threshold_tokens": 16032,
+        "min_free_vram_mib": 4456,
+    }
+    assert any("extrapolation cap" in note for note in result["notes"])
+
+
+def test_mean_only_probe_latency_is_noted():
+    assert policy_calibrate.probe_latency({"stats": {"p90": 0.9}, "avg_latency_sec": 0.5}) == (
+        0.9,
+        "p90",
+    )
+    assert policy_calibrate.probe_latency({"avg_latency_sec": 0.5}) == (0.5, "mean")
+    points = [
+        policy_calibrate.Point(16, 0.5, statistic="mean"),
+        policy_calibrate.Point(4000, 2.0),
+    ]
+    result = policy_calibrate.calibrate(points, [], 10.0, headroom_mib=0, max_extrapolation=1)
+    assert any("mean latency" in note for note in result["notes"])
+
+
+def test_unreachable_slo_writes_no_candidate(tmp_path, monkeypatch, capsys):
+    points = [policy_calibrate.Point(1000, 30.0), policy_calibrate.Point(4000, 40.0)]
+    result = policy_calibrate.calibrate(points, [], 5.0, headroom_mib=0, max_extrapolation=1)
+    assert result["proposed"] == {"long_context_threshold_tokens": None, "min_free_vram_mib": None}
+    assert any("never meets" in note for note in result["notes"])
+    with pytest.raises(ValueError):
+        policy_calibrate.candidate_rules({"long_context_threshold_tokens": 60000}, result, [])
+
+    inputs = tmp_path / "points.jsonl"
+    inputs.write_text(
+        "".join(
+            json.dumps({"prompt_tokens": p.prompt_tokens, "latency_sec": p.latency_p95_sec}) + "\n"
+            for p in points
+        ),
+        encoding="utf-8",
+    )
+    output = tmp_path / "candidate.json"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "policy_calibrate.py",
+            "--inputs",
+            str(inputs),
+            "--slo-p95-sec",
+            "5",
+            "--output",
+            str(output),
+        ],
+    )
+    assert policy_calibrate.main() == 1
+    assert not output.exists()
+    assert json.loads(capsys.readouterr().out)["ok"] is False
@@ -0,0 +1,131 @@
+"""Tests for the routing policy engine."""
+
+from __future__ import annotations
+
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import policy_engine  # noqa: E402
+import policy_fuzz  # noqa: E402
+
+RULES_PATH = TOOLS_DIR / "policy_rules.json"
+
+EDGE_PATHS = [
+    "README.md",
+    ".env",
+    ".env.local",
+    "env",
+    "src/.env",
+    "/home/user/.ssh/id_ed25519",
+    "C:\\Users\\user\\.ssh\\id_rsa",
+    "C:\\\\Users\\\\user\\\\.ssh\\\\id_rsa",
+    "a//b///secrets/x",
+    "secrets/x",
+    "/secrets/",
+    "src/auth/middleware.ts",
+    "src/Auth/middleware.ts",
+    "infra",
+    "deploy/infra/main.tf",
+    "certs/server.pem",
+    "server.pem",
+    ".docker/config.json",
+    "home/.docker/config.json",
+    "x/.config/gh/hosts.yml",
+    "weird[brackets]/.netrc",
+    "unicode/ключ.key",
+    "",
+    "/",
+]
+
+
+@pytest.fixture
+def rules():
+    return policy_engine.load_rules(RULES_PATH)
+
+
+def test_compiled_matcher_matches_fnmatch(rules):
+    """Compiled matchers must agree with match_any for every edge-case path."""
+    compiled = policy_engine.compile_rules(rules)
+    for path in EDGE_PATHS:
+        assert compiled.denylist.matches(path) == policy_engine.match_any(
+            path, rules["denylist_paths"]
+        ), path
+        assert compiled.sensitive.matches(path) == policy_engine.match_any(
+            path, rules["sensitive_paths"]
+        ), path
+
+
+def test_empty_pattern_list_never_matches():
+    matcher = policy_engine.compile_patterns(())
+    assert not matcher.matches("anything")
+
+
+def test_evaluate_accepts_raw_and_compiled_rules(rules):
+    compiled = policy_engine.compile_rules(rules)
+    for path in EDGE_PATHS:
+        assert policy_engine.evaluate([path], 0, rules) == policy_engine.evaluate(
+            [path], 0, compiled
+        )
+
+
+def test_denylist_takes_precedence_over_sensitive(rules):
+    decision = policy_engine.evaluate(["src/auth/x.ts", "keys/server.key"], 0, rules)
+    assert decision == {"route": "claude_only", "reason": "denylist_path"}
+
+
+def test_run_batch_streams_one_decision_per_line(rules):
+    compiled = policy_engine.compile_rules(rules)
+    source = io.StringIO(
+        '{"id": 1, "paths": ["README.md"]}\n'
+        "\n"
+        "not json\n"
+        '{"id": "b", "paths": [".env"], "tokens": 5}\n'
+        '{"id": "c", "paths": "README.md"}\n'
+        '{"id": "d", "paths": [], "tokens": 1e999}\n'
+        '{"id": "e", "paths": [], "vram_free_mib": Infinity}\n'
+    )
+    sink = io.StringIO()
+    errors = policy_engine.run_batch(source, sink, compiled)
+    lines = [json.loads(line) for line in sink.getvalue().splitlines()]
+
+    assert errors == 4
+    assert lines[0] == {"route": "local", "reason": "default_safe", "id": 1}
+    assert lines[1]["line"] == 3 and "error" in lines[1]
+    assert lines[2] == {"route": "claude_only", "reason": "denylist_path", "id": "b"}
+    assert lines[3] == {"error": "paths must be string array", "line": 5, "id": "c"}
+    assert lines[4] == {"error": "tokens must be a finite number", "line": 6, "id": "d"}
+    assert lines[5]["id"] == "e" and "finite" in lines[5]["error"]
+
+
+def test_paths_and_batch_are_mutually_exclusive(monkeypatch, capsys):
+    argv = ["policy_engine.py", "--rules", "r.json", "--batch", "--paths", "a.py"]
+    monkeypatch.setattr(sys, "argv", argv)
+    with pytest.raises(SystemExit) as exc:
+        policy_engine.parse_args()
+    assert exc.value.code == 2
+    assert "--paths cannot be combined with --batch" in capsys.readouterr().err
+
+
+def test_batch_record_vram_overrides_defaults():
+    compiled = policy_engine.compile_rules({"min_free_vram_mib": 1000})
+    record = {"paths": ["README.md"], "vram_free_mib": 500}
+    context = policy_engine.RoutingContext(vram_free_mib=4000)
+    decision = policy_engine.decide_record(record, compiled, context)
+    assert decision == {"route": "claude_first", "reason": "low_vram"}
+    decision = policy_engine.decide_record({"paths": ["README.md"]}, compiled, context)
+    assert decision == {"route": "local", "reason": "default_safe"}
+
+
+def test_fuzzed_decisions_match_reference(rules):
+    rules = dict(rules, min_free_vram_mib=2048, min_free_vram_ratio=0.2)
+    report = policy_fuzz.fuzz(
+        rules, policy_engine.evaluate, policy_engine.compile_rules(rules), 5000, seed=7
+    )
+    assert report["ok"], report["first_divergences"]
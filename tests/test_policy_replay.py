@@ -0,0 +1,86 @@
+"""Tests for the policy rules A/B replay."""
+
+from __future__ import annotations
+
+import io
+import json
+import sys
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import policy_replay  # noqa: E402
+
+RULES_A = {"denylist_paths": [".env"], "sensitive_paths": [], "long_context_threshold_tokens": 1000}
+RULES_B = {**RULES_A, "sensitive_paths": ["**/auth/**"], "long_context_threshold_tokens": 500}
+PRICING = {
+    "claude_pricing": {"input_per_mtok": 3.0, "output_per_mtok": 15.0},
+    "local_cost_per_mtok": 0.0,
+}
+
+LOG = "\n".join(
+    json.dumps(r) if isinstance(r, dict) else r
+    for r in [
+        {"id": "a", "paths": ["src/app.py"], "tokens": 100, "vram_free_mib": 9000},
+        {"id": "b", "paths": ["pkg/auth/x.py"], "tokens": 100, "vram_free_mib": 9000},
+        {
+            "id": "c",
+            "paths": ["README.md"],
+            "tokens": 800,
+            "vram_free_mib": 9000,
+            "output_tokens": 0,
+        },
+        {"id": "d", "paths": [".env"], "tokens": 100},
+        "not json",
+    ]
+)
+
+
+def test_replay_counts_transitions_shares_and_cost():
+    stats = policy_replay.replay(io.StringIO(LOG), RULES_A, RULES_B, chunk_size=2)
+    report = policy_replay.build_report(stats, PRICING)
+
+    assert (report["records"], report["errors"], report["changed"]) == (4, 1, 2)
+    assert report["error_examples"][0]["line"] == 5
+    assert report["transitions"] == {
+        "local/default_safe -> claude_first/sensitive_path": 1,
+        "local/default_safe -> claude_first/long_context": 1,
+    }
+    assert [e["id"] for e in report["changed_examples"]] == ["b", "c"]
+    assert report["local_share"] == {"a": 0.75, "b": 0.25}
+    assert report["tokens"] == {"input": 1100, "output": 60}
+    assert report["local_token_share"] == {"a": round(1040 / 1160, 4), "b": round(120 / 1160, 4)}
+    # compute_costs applies the token-weighted share to input and output alike.
+    assert report["cost"]["delta"] == round(((986 - 114) * 3.0 + (54 - 6) * 15.0) / 1e6, 4)
+
+
+def test_unusable_output_tokens_fall_back_to_the_ratio_estimate():
+    for bad in (float("nan"), float("inf"), -5, "12", True):
+        assert policy_replay.record_tokens({"tokens": 100, "output_tokens": bad}, 0.25) == (100, 25)
+    assert policy_replay.record_tokens({"tokens": 100, "output_tokens": 7.9}, 0.25) == (100, 7)
+    log = json.dumps({"paths": ["a.py"], "tokens": 100, "output_tokens": float("nan")})
+    stats = policy_replay.replay(io.StringIO(log), RULES_A, RULES_B)
+    assert (stats["records"], stats["errors"], stats["output_tokens"]) == (1, 0, 20)
+
+
+def test_replay_with_worker_processes_matches_in_process():
+    log = "\n".join([LOG] * 50)
+    serial = policy_replay.replay(io.StringIO(log), RULES_A, RULES_B, chunk_size=7)
+    parallel = policy_replay.replay(io.StringIO(log), RULES_A, RULES_B, workers=2, chunk_size=7)
+    assert policy_replay.build_report(parallel, PRICING) == policy_replay.build_report(
+        serial, PRICING
+    )
+
+
+def test_worker_processes_honor_max_examples():
+    log = "\n".join([LOG] * 50)
+    serial = policy_replay.replay(
+        io.StringIO(log), RULES_A, RULES_B, chunk_size=50, max_examples=20
+    )
+    parallel = policy_replay.replay(
+        io.StringIO(log), RULES_A, RULES_B, workers=2, chunk_size=50, max_examples=20
+    )
+    assert len(parallel["changed_examples"]) == 20
+    assert parallel["changed_examples"] == serial["changed_examples"]
+    assert parallel["error_examples"] == serial["error_examples"]
@@ -0,0 +1,104 @@
+"""Tests for the git-driven repository policy scan."""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import policy_engine  # noqa: E402
+import policy_scan  # noqa: E402
+import token_estimator  # noqa: E402
+
+RULES = {
+    "denylist_paths": [".env", "**/secrets/**"],
+    "sensitive_paths": ["**/auth/**"],
+    "long_context_threshold_tokens": 100,
+}
+MODEL = token_estimator.TokenModel(default_bytes_per_token=4.0, non_ascii_bytes_per_token=2.0)
+
+
+def git(repo: Path, *args: str) -> None:
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+def make_repo(tmp_path: Path) -> Path:
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "config", "user.email", "t@example.com")
+    git(tmp_path, "config", "user.name", "t")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("x = 1\n" * 10, encoding="utf-8")
+    (tmp_path / "README.md").write_text("hello\n", encoding="utf-8")
+    git(tmp_path, "add", "-A")
+    git(tmp_path, "commit", "-qm", "base")
+    return tmp_path
+
+
+def test_parse_numstat_handles_renames_and_binaries():
+    raw = b"3\t1\tsrc/a.py\x00-\t-\timg.png\x000\t0\t\x00old name.py\x00new name.py\x00"
+    entries = policy_scan.parse_numstat(raw)
+    assert [(e.path, e.added, e.deleted, e.binary) for e in entries] == [
+        ("src/a.py", 3, 1, False),
+        ("img.png", 0, 0, True),
+        ("new name.py", 0, 0, False),
+    ]
+
+
+def test_diff_scan_matches_engine_decision(tmp_path):
+    repo = make_repo(tmp_path)
+    (repo / "pkg" / "auth").mkdir(parents=True)
+    (repo / "pkg" / "auth" / "login.py").write_text("y = 2\n" * 5, encoding="utf-8")
+    (repo / "README.md").write_text("hello\nworld\n", encoding="utf-8")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-qm", "change")
+
+    mode, entries = policy_scan.collect(repo, "HEAD~1..HEAD", False, None)
+    compiled = policy_engine.compile_rules(RULES)
+    per_file, summary = policy_scan.scan(entries, compiled, MODEL, bytes_per_line=8.0)
+
+    assert mode == "diff"
+    assert {item["path"]: item["reason"] for item in per_file} == {
+        "README.md": "default_safe",
+        "pkg/auth/login.py": "sensitive_path",
+    }
+    assert summary["tokens"] == round(1 * 8 / 4) + round(5 * 8 / 4)
+    decision = policy_scan.aggregate_decision(summary, compiled, None, None, static_only=True)
+    expected = policy_engine.evaluate(
+        [e.path for e in entries], summary["tokens"], RULES, vram_free_mib=1
+    )
+    assert decision == expected == {"route": "claude_first", "reason": "sensitive_path"}
+
+
+def test_tree_and_worktree_scans_use_sizes(tmp_path):
+    repo = make_repo(tmp_path)
+    (repo / ".env").write_text("SECRET=1\n", encoding="utf-8")
+    git(repo, "add", ".env")
+
+    _, tree = policy_scan.collect(repo, None, False, "HEAD")
+    assert {e.path: e.size_bytes for e in tree} == {"README.md": 6, "src/app.py": 60}
+
+    compiled = policy_engine.compile_rules(RULES)
+    _, worktree = policy_scan.collect(repo, None, False, None)
+    per_file, summary = policy_scan.scan(worktree, compiled, MODEL)
+    assert {item["path"]: item["reason"] for item in per_file} == {
+        ".env": "denylist_path",
+        "README.md": "default_safe",
+        "src/app.py": "default_safe",
+    }
+    assert summary["tokens"] == round(9 / 4) + round(6 / 4) + round(60 / 4)
+    decision = policy_scan.aggregate_decision(summary, compiled, None, None, static_only=False)
+    assert decision == {"route": "claude_only", "reason": "denylist_path"}
+
+
+def test_extensionless_files_use_the_calibrated_ratio():
+    model = token_estimator.TokenModel(
+        default_bytes_per_token=4.0,
+        non_ascii_bytes_per_token=2.0,
+        bytes_per_token={token_estimator.NO_SUFFIX: 2.0},
+    )
+    entries = [policy_scan.ScanEntry("Makefile", 40), policy_scan.ScanEntry("a.py", 40)]
+    per_file, _ = policy_scan.scan(entries, policy_engine.compile_rules(RULES), model)
+    assert [item["tokens"] for item in per_file] == [20, 10]
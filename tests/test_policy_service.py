@@ -0,0 +1,119 @@
+"""Tests for the policy decision service (no HTTP server or GPU required)."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import policy_engine  # noqa: E402
+import policy_service  # noqa: E402
+import secret_scan  # noqa: E402
+import task_classifier  # noqa: E402
+
+
+@pytest.fixture
+def service():
+    rules = policy_engine.load_rules(TOOLS_DIR / "policy_rules.json")
+    rules["min_free_vram_mib"] = 2048
+    monitor = policy_service.VramMonitor(interval_sec=0, timeout_sec=1)
+    return policy_service.PolicyService(rules, monitor, policy_service.DecisionCache(8))
+
+
+def test_decisions_match_engine_and_hit_cache(service):
+    record = {"paths": ["src/a.py", "src//a.py"], "tokens": 10, "vram_free_mib": 4096}
+    first = service.decide(record)
+    second = service.decide({"paths": ["src/a.py"], "tokens": 20, "vram_free_mib": 4096})
+
+    expected = policy_engine.evaluate(["src/a.py"], 10, service.compiled, vram_free_mib=4096)
+    assert {k: first[k] for k in ("route", "reason")} == expected
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["vram"]["source"] == "request"
+
+
+def test_service_and_engine_run_the_same_stages(tmp_path):
+    secret = tmp_path / "settings.py"
+    secret.write_text("KEY = 'AKIA" + "Q7" * 8 + "'\n", encoding="utf-8")
+    rules = policy_engine.load_rules(TOOLS_DIR / "policy_rules.json")
+    rules.update(
+        min_free_vram_mib=2048,
+        long_context_threshold_tokens=1000,
+        local_latency_slo_sec=2.0,
+        budget={"budget_usd": 1.0, "relax_reasons": ["long_context"]},
+    )
+    classifier = task_classifier.load_classifier()
+    service = policy_service.PolicyService(
+        rules,
+        policy_service.VramMonitor(interval_sec=0, timeout_sec=1),
+        policy_service.DecisionCache(8),
+        classifier=classifier,
+        scanner=secret_scan.SecretScanner(),
+    )
+    context = policy_engine.RoutingContext(
+        classifier=classifier, content_scan=secret_scan.SecretScanner().first_finding
+    )
+    long_task = {"paths": ["src/app.py"], "tokens": 5000, "vram_free_mib": 4096}
+    records = [
+        {"id": "plain", "paths": ["src/app.py"], "tokens": 10, "vram_free_mib": 4096},
+        {"paths": [".env"], "prompt": "Rotate API keys / credentials"},
+        {"paths": ["README.md"], "prompt": "Rotate API keys / credentials", "vram_free_mib": 4096},
+        {"paths": ["config/router.json"], "prompt": "Change router/proxy defaults"},
+        {"paths": [str(secret)], "vram_free_mib": 4096},
+        {"paths": ["src/app.py"], "predicted_latency_sec": 5.0, "vram_free_mib": 4096},
+        {**long_task, "budget_pressure": 1.2},
+        {**long_task, "budget_pressure": 0.5},
+        {**long_task, "budget_pressure": 1.2, "vram_free_mib": 1024},
+        {"paths": ["src/app.py"], "vram_free_mib": 1024},
+    ]
+    reasons = set()
+    for record in records * 2:  # the second pass starts from cached static decisions
+        expected = policy_engine.decide_record(record, service.compiled, context)
+        got = service.decide(record)
+        assert {k: v for k, v in got.items() if k not in ("cached", "rules_hash", "vram")} == (
+            expected
+        )
+        reasons.add(expected["reason"])
+    assert reasons >= {
+        "default_safe",
+        "denylist_path",
+        "task_tier_l3",
+        "task_tier_l2",
+        "secret_content",
+        "local_saturated",
+        "budget_pressure",
+        "long_context",
+        "low_vram",
+    }
+
+
+def test_vram_stage_is_not_cached(service):
+    service.decide({"paths": ["README.md"], "vram_free_mib": 4096})
+    low = service.decide({"paths": ["README.md"], "vram_free_mib": 1024})
+    assert low["cached"] is True
+    assert (low["route"], low["reason"]) == ("claude_first", "low_vram")
+
+
+def test_missing_sampler_reports_no_signal(service):
+    decision = service.decide({"paths": ["README.md"]})
+    assert decision["reason"] == "missing_vram_signal"
+    assert decision["vram"] == {
+        "source": "none",
+        "age_sec": None,
+        "min_free_mib": None,
+        "min_free_ratio": None,
+    }
+
+
+def test_lru_evicts_oldest_entry():
+    cache = policy_service.DecisionCache(2)
+    cache.put(("h", ("a",), False), None)
+    cache.put(("h", ("b",), False), None)
+    cache.get(("h", ("a",), False))
+    cache.put(("h", ("c",), False), None)
+    assert cache.get(("h", ("b",), False)) == (False, None)
+    assert cache.get(("h", ("a",), False))[0] is True
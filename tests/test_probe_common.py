@@ -0,0 +1,181 @@
+"""Tests for the shared probe HTTP client against the in-process mock server."""
+
+from __future__ import annotations
+
+import socket
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import mock_openai_server  # noqa: E402
+from probe_common import (  # noqa: E402
+    HttpClient,
+    ProbeError,
+    create_add_tool_payload,
+    distribution,
+    percentile,
+    stream_summary,
+    validate_add_call,
+    validate_tool_calls,
+)
+from tool_call_probe import validate_tool_call  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def chat_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), mock_openai_server.Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_reused(chat_url):
+    client = HttpClient(timeout_sec=5)
+    timings = [client.post_json(chat_url, create_add_tool_payload("ok"))[1] for _ in range(3)]
+    assert [t.reused for t in timings] == [False, True, True]
+    assert timings[0].connect_sec > 0 and timings[1].connect_sec == 0
+    data, _ = client.post_json(chat_url, create_add_tool_payload("ok"))
+    assert validate_add_call(data["choices"][0]["message"]) == (True, "ok")
+    client.close()
+
+
+def test_error_classification(chat_url):
+    client = HttpClient(timeout_sec=5)
+    with pytest.raises(ProbeError) as http_error:
+        client.post_json(chat_url, create_add_tool_payload("http_500"))
+    assert http_error.value.kind == "http"
+    assert str(http_error.value).startswith("HTTP 500 (")
+    assert "simulated server error" in str(http_error.value)
+
+    with pytest.raises(ProbeError) as timeout:
+        client.post_json(chat_url, create_add_tool_payload("timeout"), timeout_sec=0.2)
+    assert timeout.value.kind == "timeout"
+    assert str(timeout.value).startswith("timeout (")
+
+    with pytest.raises(ProbeError) as refused:
+        client.post_json("http://127.0.0.1:1/v1/chat/completions", {})
+    assert refused.value.kind == "url"
+    assert str(refused.value).startswith("URL error (")
+
+
+def test_stale_pooled_connection_is_retried(chat_url):
+    client = HttpClient(timeout_sec=5)
+    client.post_json(chat_url, create_add_tool_payload("ok"))
+    for pool in client._idle.values():
+        for conn in pool:
+            conn.sock.shutdown(socket.SHUT_RDWR)  # the idle socket went away
+    data, timing = client.post_json(chat_url, create_add_tool_payload("ok"))
+    assert "choices" in data
+    assert timing.reused is False
+
+
+def test_stream_records_token_timing(chat_url):
+    client = HttpClient(timeout_sec=5)
+    payload = {"model": "ok", "messages": [{"role": "user", "content": "say hi " * 16}]}
+    streams = [client.stream_chat(chat_url, payload) for _ in range(2)]
+    first = streams[0]
+    assert first.streamed and first.usage() == {"prompt_tokens": 32, "completion_tokens": 8}
+    assert len(first.token_times) == mock_openai_server.STREAM_TOKENS
+    assert 0 < first.ttft_sec < first.token_times[-1] <= first.total_sec
+    assert len(first.inter_token_sec()) == mock_openai_server.STREAM_TOKENS - 1
+    assert streams[1].timing.reused is True  # the stream was fully drained
+
+    summary = stream_summary(streams)
+    assert summary["inter_token_sec"]["count"] == 2 * (mock_openai_server.STREAM_TOKENS - 1)
+    assert summary["inter_token_sec"]["p50"] >= mock_openai_server.STREAM_DELAY_SEC * 0.5
+    assert summary["avg_decode_tokens_per_sec"] > 0
+    assert summary["avg_prefill_tokens_per_sec"] > summary["avg_decode_tokens_per_sec"]
+
+    with pytest.raises(ProbeError) as http_error:
+        client.stream_chat(chat_url, {"model": "http_500", "messages": []})
+    assert http_error.value.kind == "http"
+
+
+def test_stream_assembles_tool_calls(chat_url):
+    client = HttpClient(timeout_sec=5)
+    result = client.stream_chat(chat_url, create_add_tool_payload("ok"))
+    assert result.ttft_sec is not None and result.ttft_sec < result.total_sec
+    assert result.message["tool_calls"][0]["function"] == {
+        "name": "add",
+        "arguments": '{"a": 2, "b": 3}',
+    }
+    assert validate_add_call(result.message) == (True, "ok")
+    missing = client.stream_chat(chat_url, create_add_tool_payload("missing_tool_calls"))
+    assert validate_add_call(missing.message)[1].startswith("missing tool_calls (content=tok0")
+    client.close()
+
+
+def test_validate_tool_calls_parallel_and_nested():
+    def message(*calls):
+        return {
+            "tool_calls": [{"function": {"name": name, "arguments": args}} for name, args in calls]
+        }
+
+    pair = [("add", {"a": 2, "b": 3}), ("add", {"a": 4, "b": 5})]
+    swapped = message(("add", '{"a": 4, "b": 5}'), ("add", {"a": 2, "b": 3}))
+    assert validate_tool_calls(swapped, pair) == (True, "ok")
+    assert validate_tool_calls(message(("add", {"a": 2, "b": 3})), pair) == (
+        False,
+        "expected 2 tool calls, got 1",
+    )
+    wrong = message(("add", {"a": 2, "b": 3}), ("add", {"a": 4, "b": 6}))
+    assert validate_tool_calls(wrong, pair) == (False, "unexpected arguments (a=4, b=6)")
+    extra = message(("add", {"a": 2, "b": 3}), ("sub", {}))
+    assert validate_tool_calls(extra, pair[:1]) == (False, "unexpected extra tool calls (sub)")
+    assert validate_tool_calls(extra, pair[:1], allow_extra=True) == (True, "ok")
+
+    nested = {"start": {"date": "2025-03-14"}, "people": [{"email": "a@x", "optional": False}]}
+    got = {
+        "start": {"date": "2025-03-14", "tz": "UTC"},
+        "people": [{"email": "a@x", "optional": 0}],
+    }
+    assert not validate_tool_calls(message(("ev", got)), [("ev", nested)])[0]  # 0 is not False
+    got["people"][0]["optional"] = False
+    assert validate_tool_calls(message(("ev", got)), [("ev", nested)]) == (True, "ok")
+    assert validate_add_call(message(("mul", {"a": 2, "b": 3}))) == (
+        False,
+        "unexpected function name (mul)",
+    )
+
+
+def test_validate_add_call_is_strict():
+    def message(*calls):
+        return {
+            "tool_calls": [{"function": {"name": name, "arguments": args}} for name, args in calls]
+        }
+
+    add = ("add", {"a": 2, "b": 3})
+    assert validate_add_call(message(add)) == (True, "ok")
+    assert validate_add_call(message(add, ("sub", {}))) == (
+        False,
+        "unexpected extra tool calls (sub)",
+    )
+    assert validate_add_call(message(("mul", {}), add)) == (
+        False,
+        "unexpected function name (mul)",
+    )
+    assert validate_add_call(message(("add", {"a": 2, "b": 3, "c": 4}))) == (
+        False,
+        "unexpected arguments (a=2, b=3, c=4)",
+    )
+    assert validate_tool_call(message(add, add), "add", 2, 3) == (
+        False,
+        "unexpected extra tool calls (add)",
+    )
+    # The matrix probe keeps the lenient default: any order, extra keys allowed.
+    lenient = message(("mul", {}), ("add", {"a": 2, "b": 3, "c": 4}))
+    assert validate_tool_calls(lenient, [add], allow_extra=True) == (True, "ok")
+
+
+def test_percentile_interpolates():
+    assert percentile([4.0, 1.0, 3.0, 2.0], 50) == pytest.approx(2.5)
+    assert percentile([1.0], 99) == 1.0
+    assert distribution([]) is None
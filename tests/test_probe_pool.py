@@ -0,0 +1,90 @@
+"""Tests for bounded parallel probe execution (no network required)."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+from probe_pool import ProbeTask, run_tasks, runtime_lanes  # noqa: E402
+
+
+class LaneMonitor:
+    """Records the peak number of concurrent tasks per lane."""
+
+    def __init__(self) -> None:
+        self.active: dict = {}
+        self.peak: dict = {}
+        self.lock = threading.Lock()
+
+    def task(self, lanes, value, delay=0.02):
+        def run():
+            with self.lock:
+                for lane in lanes:
+                    self.active[lane] = self.active.get(lane, 0) + 1
+                    self.peak[lane] = max(self.peak.get(lane, 0), self.active[lane])
+            time.sleep(delay)
+            with self.lock:
+                for lane in lanes:
+                    self.active[lane] -= 1
+            return value
+
+        return ProbeTask(lanes=tuple(lanes), run=run)
+
+
+def test_results_keep_task_order_and_lanes_are_bounded():
+    monitor = LaneMonitor()
+    tasks = []
+    for n in range(12):
+        lane = ["runtime:gpu-a", "runtime:gpu-b", "runtime:cpu"][n % 3]
+        tasks.append(monitor.task([lane], n, delay=0.01 * (12 - n) / 4))
+    outcome = run_tasks(tasks, jobs=6, lane_limits={"runtime:cpu": 2})
+    assert outcome.results == list(range(12))
+    assert outcome.stopped is False
+    assert monitor.peak == {"runtime:gpu-a": 1, "runtime:gpu-b": 1, "runtime:cpu": 2}
+
+
+def test_shared_gpu_serializes_runtimes():
+    lanes_a, limits_a = runtime_lanes({"name": "ollama", "gpus": [0], "max_concurrency": 4})
+    lanes_b, limits_b = runtime_lanes({"name": "llamacpp", "gpus": [0]})
+    assert lanes_a == ("runtime:ollama", "gpu:0")
+    monitor = LaneMonitor()
+    tasks = [monitor.task(lanes_a, 1), monitor.task(lanes_b, 2), monitor.task(lanes_a, 3)]
+    run_tasks(tasks, jobs=3, lane_limits={**limits_a, **limits_b})
+    assert monitor.peak["gpu:0"] == 1
+
+
+def test_fail_fast_stops_without_waiting_for_in_flight():
+    release = threading.Event()
+    tasks = [
+        ProbeTask(lanes=("a",), run=lambda: (release.wait(5), "slow")[1]),
+        ProbeTask(lanes=("b",), run=lambda: "fail"),
+        ProbeTask(lanes=("b",), run=lambda: "never"),
+    ]
+    started = time.perf_counter()
+    outcome = run_tasks(tasks, jobs=2, fail_fast=True, failed=lambda r: r == "fail")
+    release.set()
+    assert time.perf_counter() - started < 1.0
+    assert outcome.stopped is True
+    assert outcome.results == [None, "fail", None]
+    assert outcome.cancelled() == [0, 2]
+
+
+def test_task_errors_propagate():
+    def boom():
+        raise RuntimeError("probe crashed")
+
+    with pytest.raises(RuntimeError, match="probe crashed"):
+        run_tasks([ProbeTask(lanes=("a",), run=boom)], jobs=1)
+
+
+def test_none_result_is_completed_not_cancelled():
+    outcome = run_tasks([ProbeTask(lanes=("a",), run=lambda: None)], jobs=1)
+    assert outcome.results == [None]
+    assert outcome.cancelled() == []
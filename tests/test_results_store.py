@@ -0,0 +1,112 @@
+"""Tests for the append-only SQLite results store."""
+
+from __future__ import annotations
+
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import latency_probe  # noqa: E402
+import mock_openai_server  # noqa: E402
+import results_store  # noqa: E402
+from latency_stats import SamplingPlan  # noqa: E402
+from results_store import ResultsStore  # noqa: E402
+
+
+def runtime_probe_payload(latencies):
+    return {
+        "schema_version": "runtime-probe-v1",
+        "results": [
+            {
+                "runtime": runtime,
+                "model": model,
+                "tool_calls": {"ok": model != "b"},
+                "latency": {"ok": True, "avg_latency_sec": latency, "stats": {"p90": latency * 2}},
+            }
+            for (runtime, model), latency in latencies.items()
+        ],
+        "failures": [],
+    }
+
+
+def test_series_and_aggregates_use_indexed_filters(tmp_path):
+    store = ResultsStore(tmp_path / "results.sqlite")
+    store.record("runtime_probe", runtime_probe_payload({("ollama", "a"): 1.0}), ts=200.0)
+    store.record(
+        "runtime_probe",
+        runtime_probe_payload({("ollama", "a"): 3.0, ("vllm", "b"): 0.5}),
+        ts=100.0,
+    )
+
+    series = list(store.series("avg_latency_sec", model="a"))
+    assert [(row["ts"], row["value"]) for row in series] == [(100.0, 3.0), (200.0, 1.0)]
+    assert [row["value"] for row in store.series("avg_latency_sec", since=150)] == [1.0]
+    assert [row["value"] for row in store.series("stats.p90", runtime="vllm")] == [1.0]
+    assert [row["value"] for row in store.series("tool_call_ok", model="b")] == [0.0]
+
+    groups = store.aggregate("avg_latency_sec", ["runtime", "model"])
+    assert [(g["runtime"], g["model"], g["count"], g["mean"]) for g in groups] == [
+        ("ollama", "a", 2, 2.0),
+        ("vllm", "b", 1, 0.5),
+    ]
+    host = results_store.host_fingerprint()[0]
+    (by_host,) = store.aggregate("avg_latency_sec", ["host"])
+    assert by_host["host"] == host and by_host["count"] == 3
+    assert (by_host["mean"], by_host["first_ts"], by_host["last_ts"]) == (1.5, 100.0, 200.0)
+    assert [h["fingerprint"] for h in store.hosts()] == [host]
+    with pytest.raises(ValueError):
+        store.aggregate("avg_latency_sec", ["value; DROP TABLE runs"])
+    store.close()
+
+
+def test_sweep_payloads_get_parameter_suffixes():
+    load = {
+        "schema_version": "load-sweep-v1",
+        "model": "m",
+        "runtime": "vllm",
+        "steps": [{"concurrency": 4, "output_tokens_per_sec": 120.0, "latency_sec": None}],
+    }
+    assert results_store.extract_measurements("load_gen", load) == [
+        ("m", "vllm", "output_tokens_per_sec@c=4", 120.0)
+    ]
+    sweep = {
+        "schema_version": "context-sweep-v1",
+        "model": "m",
+        "grid": [
+            {"prompt_tokens_target": 1024, "output_tokens_target": 16, "ttft_sec": 0.2},
+            {"prompt_tokens_target": 4096, "output_tokens_target": 16, "error": "timeout"},
+        ],
+    }
+    assert results_store.extract_measurements("context_sweep", sweep) == [
+        ("m", None, "ttft_sec@p=1024,o=16", 0.2)
+    ]
+    assert results_store.extract_measurements("x", {"schema_version": "unknown-v9"}) == []
+
+
+def test_probe_output_is_recorded(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), mock_openai_server.Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    try:
+        plan = SamplingPlan(warmup=0, min_iterations=2, max_iterations=2)
+        summary = latency_probe.probe(url, "ok", plan=plan)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    path = tmp_path / "nested" / "results.sqlite"
+    results_store.store_result(str(path), "latency_probe", summary)
+    results_store.store_result(None, "latency_probe", summary)  # --store not given: no-op
+    store = ResultsStore(path)
+    rows = list(store.series("avg_latency_sec", model="ok"))
+    assert len(rows) == 1 and rows[0]["tool"] == "latency_probe"
+    assert rows[0]["value"] == pytest.approx(summary["avg_latency_sec"])
+    assert list(store.series("latency_stats.p99"))
+    store.close()
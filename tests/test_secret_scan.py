@@ -0,0 +1,111 @@
+"""Tests for content-aware secret scanning (fixtures are assembled at runtime)."""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import policy_engine  # noqa: E402
+import secret_scan  # noqa: E402
+
+AWS_KEY = "AKIA" + "Q7" * 8
+
+
+@pytest.mark.parametrize(
+    ("content", "kind"),
+    [
+        (f'aws_key = "{AWS_KEY}"\n', "aws_access_key"),
+        ("x\n\n-----BEGIN " + "OPENSSH PRIVATE KEY-----\nb3Bl\n", "private_key"),
+        ("token: " + "ghp_" + "a1B2" * 9 + "\n", "github_token"),
+        ("ANTHROPIC_API_KEY=" + "sk-ant-" + "api03-Zx9" * 4 + "\n", "anthropic_key"),
+        ('password = "q8Zr/Tn2Lw+Vb7Xk1Mp4Hs9c"\n', "high_entropy_assignment"),
+        # A rejected low-entropy candidate must not hide a key prefix inside it.
+        (f"token: {'a' * 4}{AWS_KEY}\n", "aws_access_key"),
+    ],
+)
+def test_detects_secret_kinds(tmp_path, content, kind):
+    path = tmp_path / "config.ts"
+    path.write_text(content, encoding="utf-8")
+    finding = secret_scan.SecretScanner().scan_file(str(path))
+    assert finding is not None and finding.kind == kind
+
+
+def test_ignores_placeholders_binaries_and_missing_files(tmp_path):
+    placeholder = tmp_path / "a.py"
+    placeholder.write_text('api_key = "your-api-key-goes-here-xxxx"\n', encoding="utf-8")
+    binary = tmp_path / "b.bin"
+    binary.write_bytes(b"\0" + AWS_KEY.encode())
+    empty = tmp_path / "c.txt"
+    empty.write_bytes(b"")
+    paths = [str(placeholder), str(binary), str(empty), str(tmp_path / "missing"), str(tmp_path)]
+    assert secret_scan.SecretScanner().scan_paths(paths) is None
+
+
+def test_cache_skips_rescan_until_file_changes(tmp_path):
+    path = tmp_path / "settings.py"
+    path.write_text("DEBUG = True\n", encoding="utf-8")
+    cache_file = tmp_path / "cache.json"
+    scanner = secret_scan.SecretScanner(secret_scan.open_cache(cache_file))
+    assert scanner.scan_file(str(path)) is None
+    scanner.cache.save()
+
+    warm = secret_scan.SecretScanner(secret_scan.open_cache(cache_file))
+    assert warm.scan_file(str(path)) is None
+    assert (warm.files_scanned, warm.cache.hits) == (0, 1)
+
+    path.write_text(f"DEBUG = True\nKEY = '{AWS_KEY}'\n", encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    finding = warm.scan_file(str(path))
+    assert (finding.kind, finding.line) == ("aws_access_key", 2)
+
+
+def test_unreadable_file_fails_closed_and_is_not_cached(tmp_path, monkeypatch):
+    path = tmp_path / "locked.env"
+    path.write_text("DEBUG = True\n", encoding="utf-8")
+
+    def denied(*args, **kwargs):
+        raise PermissionError("denied")
+
+    scanner = secret_scan.SecretScanner(secret_scan.open_cache(tmp_path / "cache.json"))
+    monkeypatch.setattr(secret_scan.mmap, "mmap", denied)
+    finding = scanner.scan_file(str(path))
+    assert (finding.kind, finding.line) == (secret_scan.UNSCANNABLE, 0)
+    monkeypatch.undo()
+    assert scanner.scan_file(str(path)) is None
+    assert scanner.cache.hits == 0
+
+
+def test_secret_past_max_bytes_fails_closed_and_is_not_cached(tmp_path):
+    path = tmp_path / "big.py"
+    path.write_text("x = 1\n" * 100 + f"KEY = '{AWS_KEY}'\n", encoding="utf-8")
+    scanner = secret_scan.SecretScanner(secret_scan.open_cache(tmp_path / "cache.json"), 64)
+    finding = scanner.scan_file(str(path))
+    assert (finding.kind, finding.line) == (secret_scan.UNSCANNABLE, 0)
+    assert scanner.scan_file(str(path)).kind == secret_scan.UNSCANNABLE
+    assert (scanner.files_scanned, scanner.cache.hits) == (2, 0)
+
+    full = secret_scan.SecretScanner(max_bytes=1 << 20).scan_file(str(path))
+    assert (full.kind, full.line) == ("aws_access_key", 101)
+
+
+def test_secret_content_routes_claude_only(tmp_path):
+    path = tmp_path / "config.ts"
+    path.write_text(f"export const key = '{AWS_KEY}';\n", encoding="utf-8")
+    rules = {"denylist_paths": [], "sensitive_paths": ["**/config.ts"]}
+    scanner = secret_scan.SecretScanner()
+    decision = policy_engine.evaluate(
+        [str(path)], 0, rules, vram_free_mib=8000, content_scan=scanner.first_finding
+    )
+    assert (decision["route"], decision["reason"]) == ("claude_only", "secret_content")
+    assert decision["secret"] == {"path": str(path), "kind": "aws_access_key", "line": 1}
+
+    rules["denylist_paths"] = ["**/config.ts"]
+    scanner.files_scanned = 0
+    policy_engine.evaluate([str(path)], 0, rules, content_scan=scanner.first_finding)
+    assert scanner.files_scanned == 0
@@ -0,0 +1,96 @@
+"""Tests for the spend governor and budget-pressure relaxation."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import cost_model  # noqa: E402
+import policy_engine  # noqa: E402
+import policy_service  # noqa: E402
+import spend_governor  # noqa: E402
+
+PRICING = cost_model.Pricing(input_per_mtok=3.0, output_per_mtok=15.0)
+BUDGET = {"budget_usd": 1.0, "window_sec": 60, "buckets": 6, "relax_reasons": ["long_context"]}
+
+
+def make_governor() -> spend_governor.SpendGovernor:
+    config = spend_governor.parse_budget(BUDGET)
+    assert config is not None
+    return spend_governor.SpendGovernor(config, PRICING, local_cost_per_mtok=0.2)
+
+
+def test_costs_match_compute_costs():
+    governor = make_governor()
+    for route, share in (("claude", 0.0), ("local", 1.0)):
+        scenario = cost_model.Scenario("x", 200_000, 30_000, share)
+        expected = cost_model.compute_costs(PRICING, 0.2, scenario)["total_cost"]
+        assert governor.cost(200_000, 30_000, route) == pytest.approx(expected)
+
+
+def test_window_expires_old_spend():
+    window = spend_governor.SpendWindow(window_sec=60, buckets=6)
+    assert window.add(100.0, 1.0)
+    assert window.add(125.0, 2.0)
+    assert window.total(130.0) == pytest.approx(3.0)
+    assert window.total(165.0) == pytest.approx(2.0)  # the t=100 bucket expired
+    assert not window.add(90.0, 5.0)  # already outside the window
+    assert window.total(10_000.0) == 0.0
+    assert len(window._values) == 6
+
+
+def test_pressure_relaxes_only_configured_claude_first():
+    rules = policy_engine.load_rules(TOOLS_DIR / "policy_rules.json")
+    rules["budget"] = BUDGET
+    compiled = policy_engine.compile_rules(rules)
+    long_task = {"paths": ["src/a.py"], "tokens": 100_000, "vram_free_mib": 4096}
+
+    calm = policy_engine.decide_record({**long_task, "budget_pressure": 0.5}, compiled)
+    assert calm["reason"] == "long_context"
+
+    relaxed = policy_engine.decide_record({**long_task, "budget_pressure": 1.2}, compiled)
+    assert relaxed == {
+        "route": "local",
+        "reason": "budget_pressure",
+        "relaxed_reason": "long_context",
+        "budget_pressure": 1.2,
+    }
+    sensitive = policy_engine.decide_record(
+        {"paths": ["src/auth/x.py"], "budget_pressure": 5.0}, compiled
+    )
+    denied = policy_engine.decide_record({"paths": [".env"], "budget_pressure": 5.0}, compiled)
+    assert sensitive["reason"] == "sensitive_path"
+    assert denied["route"] == "claude_only"
+
+    rules["min_free_vram_mib"] = 8192
+    compiled = policy_engine.compile_rules(rules)
+    no_room = policy_engine.decide_record({**long_task, "budget_pressure": 1.2}, compiled)
+    assert no_room["reason"] == "low_vram"
+
+
+def test_capacity_reasons_cannot_be_relaxed():
+    with pytest.raises(ValueError, match="capacity"):
+        spend_governor.parse_budget({**BUDGET, "relax_reasons": ["low_vram"]})
+
+
+def test_service_usage_feeds_pressure():
+    rules = policy_engine.load_rules(TOOLS_DIR / "policy_rules.json")
+    rules["budget"] = BUDGET
+    service = policy_service.PolicyService(
+        rules,
+        policy_service.VramMonitor(interval_sec=0, timeout_sec=1),
+        policy_service.DecisionCache(8),
+        governor=make_governor(),
+    )
+    long_task = {"paths": ["src/a.py"], "tokens": 100_000, "vram_free_mib": 4096}
+    assert service.decide(long_task)["reason"] == "long_context"
+
+    usage = service.record_usage({"input_tokens": 200_000, "output_tokens": 40_000})
+    assert usage["cost_usd"] == pytest.approx(1.2)
+    assert usage["relaxing"] is True
+    assert service.decide(long_task)["reason"] == "budget_pressure"
@@ -0,0 +1,92 @@
+"""Tests for the L0-L3 task classifier and its policy engine stage."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import policy_engine  # noqa: E402
+import task_classifier  # noqa: E402
+
+RULES = {
+    "denylist_paths": [".env"],
+    "sensitive_paths": ["**/infra/**"],
+    "long_context_threshold_tokens": 60000,
+}
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return task_classifier.load_classifier()
+
+
+@pytest.mark.parametrize(
+    ("prompt", "paths", "tools", "tier"),
+    [
+        # Examples from docs/task-classification.md.
+        ("Update README formatting", ["README.md"], [], "L0"),
+        ("Summarize `docs/benchmarks.md`", ["docs/benchmarks.md"], [], "L0"),
+        ("Refactor helper function in `tools/local_llm/*`", ["tools/a.py"], ["Edit"], "L1"),
+        ("Add a new Make target with minimal changes", ["Makefile"], ["Edit"], "L1"),
+        ("Change router/proxy defaults", ["config/router.json"], [], "L2"),
+        ("Modify supply-chain verification scripts", ["tools/supply_chain/v.py"], [], "L2"),
+        ("Edit `.env` or `~/.ssh/*`", [".env"], [], "L3"),
+        ("Rotate API keys / credentials", [], [], "L3"),
+    ],
+)
+def test_documented_examples(classifier, prompt, paths, tools, tier):
+    assert classifier.classify(prompt, paths, tools).tier == tier
+
+
+def test_prompt_features_are_cached_by_hash(classifier):
+    first = classifier.classify("Fix the OAuth login flow", ["src/app.py"])
+    second = classifier.classify("Fix the OAuth login flow", ["src/other.py"], ["Bash"])
+    assert (first.cached, second.cached) == (False, True)
+    assert "auth_kw" in second.features and "shell_tool" in second.features
+
+
+def test_keyword_patterns_are_word_bounded_and_factored():
+    model = task_classifier.compile_model(
+        {
+            "tiers": ["L0", "L3"],
+            "features": {
+                "k": {"kind": "keyword", "patterns": ["ci", "api[ _-]?keys?", "(?:x|y)z"]},
+            },
+            "weights": {"L0": {"bias": 0.1}, "L3": {"k": 1.0}},
+        }
+    )
+    clf = task_classifier.TaskClassifier(model)
+    assert clf.classify("update the CI config").tier == "L3"
+    assert clf.classify("decide on a circle").tier == "L0"
+    assert clf.classify("store the API_KEY safely").tier == "L3"
+    assert clf.classify("yz").tier == "L3"
+
+
+@pytest.mark.parametrize(
+    ("paths", "tier", "expected"),
+    [
+        ([".env"], "L3", ("claude_only", "denylist_path")),
+        (["ops/infra/main.tf"], "L3", ("claude_only", "task_tier_l3")),
+        (["ops/infra/main.tf"], "L2", ("claude_first", "sensitive_path")),
+        (["src/a.py"], "L2", ("claude_first", "task_tier_l2")),
+        (["src/a.py"], "L1", ("local", "default_safe")),
+    ],
+)
+def test_tier_precedence(paths, tier, expected):
+    decision = policy_engine.evaluate(paths, 0, RULES, vram_free_mib=8000, tier=tier)
+    assert (decision["route"], decision["reason"]) == expected
+
+
+def test_decide_record_reports_tier(classifier):
+    context = policy_engine.RoutingContext(vram_free_mib=8000, classifier=classifier)
+    compiled = policy_engine.compile_rules(RULES)
+    record = {"paths": ["src/a.py"], "prompt": "rotate the staging password"}
+    decision = policy_engine.decide_record(record, compiled, context)
+    assert decision == {"route": "claude_only", "reason": "task_tier_l3", "tier": "L3"}
+    with pytest.raises(ValueError):
+        policy_engine.parse_record({"paths": [], "tools": "Bash"})
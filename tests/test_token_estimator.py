@@ -0,0 +1,71 @@
+"""Tests for the cached file token estimator."""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import token_estimator  # noqa: E402
+
+
+def test_estimate_uses_extension_ratio_and_detects_binary(tmp_path):
+    model = token_estimator.TokenModel(
+        default_bytes_per_token=4.0,
+        non_ascii_bytes_per_token=2.0,
+        bytes_per_token={".py": 2.0},
+    )
+    text = tmp_path / "a.py"
+    text.write_bytes(b"x" * 100)
+    other = tmp_path / "b.txt"
+    other.write_text("x" * 100 + "é" * 10, encoding="utf-8")
+    blob = tmp_path / "c.bin"
+    blob.write_bytes(b"\0" * 50)
+
+    total, estimates = token_estimator.estimate_paths(
+        [str(text), str(other), str(blob), str(tmp_path / "missing.md")], model
+    )
+    assert [e.tokens for e in estimates] == [50, 35, 0, 0]
+    assert estimates[2].binary and estimates[3].missing
+    assert total == 85
+
+
+def test_cache_hits_until_file_changes(tmp_path):
+    model = token_estimator.load_model()
+    cache_path = tmp_path / "cache.json"
+    target = tmp_path / "doc.md"
+    target.write_text("hello world " * 50, encoding="utf-8")
+
+    cache = token_estimator.open_cache(cache_path, model)
+    first = token_estimator.estimate_file(str(target), model, cache)
+    cache.save()
+
+    cache = token_estimator.open_cache(cache_path, model)
+    second = token_estimator.estimate_file(str(target), model, cache)
+    assert second.cached and second.tokens == first.tokens
+
+    target.write_text("hello world " * 100, encoding="utf-8")
+    stat = target.stat()
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    third = token_estimator.estimate_file(str(target), model, cache)
+    assert not third.cached and third.tokens > first.tokens
+
+
+def test_greedy_token_count_prefers_longest_match():
+    vocab = {"hello", " world", "he"}
+    assert token_estimator.greedy_token_count("hello world!", vocab, 6) == 3
+
+
+def test_calibrated_ratio_applies_to_files_without_extension(tmp_path):
+    path = tmp_path / "Makefile"
+    path.write_text("all: build build build\n", encoding="ascii")
+    measured = token_estimator.calibrate([str(path)], ["build", " ", "all", ":", "\n"])
+    model = token_estimator.TokenModel(
+        default_bytes_per_token=4.0, non_ascii_bytes_per_token=2.0, bytes_per_token=measured
+    )
+    assert set(measured) == {token_estimator.NO_SUFFIX}
+    assert model.ratio_for(str(path)) == measured[token_estimator.NO_SUFFIX] != 4.0
+    assert model.ratio_for("src/main.py") == 4.0
@@ -0,0 +1,86 @@
+"""Tests for the tool-call probe matrix against the in-process mock server."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import mock_openai_server  # noqa: E402
+import tool_matrix_probe  # noqa: E402
+from probe_common import HttpClient  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def chat_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), mock_openai_server.Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    server.shutdown()
+    server.server_close()
+
+
+def test_cells_hide_targets_among_fillers():
+    rng = random.Random(0)
+    tools, messages, expected = tool_matrix_probe.build_cell(60, "large", "nested", 3, rng)
+    names = [tool["function"]["name"] for tool in tools]
+    assert len(names) == len(set(names)) == 60 and "create_event" in names
+    assert expected == [("create_event", tool_matrix_probe.EVENT_ARGS)]
+    small, _, _ = tool_matrix_probe.build_cell(60, "small", "flat", 3, rng)
+    assert len(json.dumps(tools)) > 5 * len(json.dumps(small))
+
+    _, other_messages, pairs = tool_matrix_probe.build_cell(60, "large", "parallel", 4, rng)
+    assert [name for name, _ in pairs] == ["add"] * 4
+    assert "4 times in parallel" in other_messages[1]["content"]
+    assert messages[0]["content"] != other_messages[0]["content"]  # per-request nonce
+
+
+def test_parse_counts_rejects_counts_beyond_the_filler_pool(monkeypatch, capsys):
+    limit = tool_matrix_probe.MAX_TOOL_COUNT
+    assert tool_matrix_probe.parse_counts(f"{limit},1,1") == [1, limit]
+    tools, _, _ = tool_matrix_probe.build_cell(limit, "small", "flat", 2, random.Random(0))
+    assert len(tools) == limit
+    with pytest.raises(ValueError, match="above"):
+        tool_matrix_probe.parse_counts(f"5,{limit + 1}")
+    argv = ["tool_matrix_probe.py", "--url", "http://127.0.0.1:9", "--model", "m"]
+    monkeypatch.setattr(sys, "argv", [*argv, "--tool-counts", "400"])
+    assert tool_matrix_probe.main() == 2
+    assert "ERROR: tool counts above" in capsys.readouterr().err
+
+
+def test_matrix_records_correctness_and_latency(chat_url):
+    args = argparse.Namespace(
+        url=chat_url, model="ok", iterations=2, parallel_calls=3, max_tokens=64, timeout_sec=5
+    )
+    client = HttpClient(timeout_sec=5)
+    rng = random.Random(0)
+    cells = [
+        tool_matrix_probe.measure_cell(client, args, count, "small", shape, rng)
+        for shape in ("flat", "parallel")
+        for count in (1, 30)
+    ]
+    client.close()
+    flat, flat_30, parallel, _ = cells
+    assert flat["ok"] and flat["passes"] == 2 and flat["reasons"] == []
+    assert 0 < flat["ttft_sec"] < flat["total_sec"]
+    assert flat_30["prompt_tokens"] > 10 * flat["prompt_tokens"]  # mock counts schema words
+    assert not parallel["ok"] and parallel["reasons"] == ["expected 3 tool calls, got 1"]
+    assert tool_matrix_probe.summarize(cells) == [
+        {"shape": "flat", "schema_size": "small", "max_passing_tool_count": 30, "pass_rate": 1.0},
+        {
+            "shape": "parallel",
+            "schema_size": "small",
+            "max_passing_tool_count": None,
+            "pass_rate": 0.0,
+        },
+    ]
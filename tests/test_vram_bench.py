@@ -0,0 +1,49 @@
+"""Tests for in-process vram_bench orchestration against the in-process mock server."""
+
+from __future__ import annotations
+
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+import mock_openai_server  # noqa: E402
+import vram_bench  # noqa: E402
+from probe_common import HttpClient  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def chat_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), mock_openai_server.Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    server.shutdown()
+    server.server_close()
+
+
+def test_in_process_probes_match_cli_payloads(chat_url):
+    client = HttpClient(timeout_sec=5)
+    assert vram_bench.probe_tool(chat_url, "ok", 5, client) == {"ok": True}
+    invalid = vram_bench.probe_tool(chat_url, "invalid_arguments_json", 5, client)
+    assert invalid["ok"] is False and "arguments" in invalid["error"]
+    failed = vram_bench.probe_tool(chat_url, "http_500", 5, client)
+    assert failed["error"].startswith("HTTP 500 (")
+
+    latency = vram_bench.probe_latency(chat_url, "ok", 5, 2, client)
+    assert latency["ok"] is True and latency["iterations"] == 2
+    assert latency["warmup_iterations"] == 1
+    assert latency["latency_stats"]["count"] == 2
+    assert vram_bench.probe_latency(chat_url, "http_500", 5, 2, client)["ok"] is False
+    client.close()
+
+
+def test_missing_gpu_is_reported_not_raised(monkeypatch):
+    monkeypatch.setattr(vram_bench.vram_probe.shutil, "which", lambda _: None)
+    sample = vram_bench.sample_vram()
+    assert sample["ok"] is False and "nvidia-smi" in sample["error"]
@@ -0,0 +1,76 @@
+"""Tests for the background VRAM sampler (no GPU required)."""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parents[1] / "tools" / "local_llm"
+sys.path.insert(0, str(TOOLS_DIR))
+
+from vram_probe import GpuSample  # noqa: E402
+from vram_sampler import (  # noqa: E402
+    BackgroundSampler,
+    NvidiaSmiLoop,
+    PollingBackend,
+    RequestWindow,
+    TimedSample,
+    summarize_series,
+    utilization_sec,
+)
+
+FAKE_NVIDIA_SMI = """#!{python}
+import sys, time
+for n in range(5):
+    for i in range(2):
+        print(f"{{i}}, Fake, 8192, {{1000 + 100 * n}}, 0, 50, 40, P2", flush=True)
+    time.sleep(0.01)
+"""
+
+
+def gpu(used: int, util: int, index: int = 0) -> GpuSample:
+    return GpuSample(index, "fake", 8192, used, 8192 - used, util, 50, "P2")
+
+
+def test_utilization_is_held_between_ticks():
+    samples = [TimedSample(0.0, (gpu(1000, 100),)), TimedSample(2.0, (gpu(3000, 50),))]
+    assert utilization_sec(samples, 0.0, 4.0) == pytest.approx(2.0 + 1.0)
+    assert utilization_sec(samples, 1.0, 3.0) == pytest.approx(1.0 + 0.5)
+
+    summary = summarize_series(samples, 0.0, 4.0, [RequestWindow(1.0, 3.0, 30)])
+    assert summary["peak_used_mib"] == 3000
+    assert summary["gpus"]["0"]["mean_used_mib"] == 2000.0
+    assert summary["tokens_per_utilization_sec"] == pytest.approx(30 / 1.5)
+    assert [point["t"] for point in summary["series"]] == [0.0, 2.0]
+    assert summarize_series([], 0.0, 1.0)["ok"] is False
+
+
+def test_polling_backend_and_window_slicing():
+    ticks = iter(range(1000))
+    sampler = BackgroundSampler(PollingBackend(5, lambda: [gpu(1000 + next(ticks), 10)]))
+    sampler.start()
+    time.sleep(0.05)
+    middle = time.perf_counter()
+    time.sleep(0.05)
+    sampler.stop()
+    later = sampler.samples(middle)
+    assert later[0].t < middle <= later[1].t  # the tick in effect at the window start
+    assert len(sampler.samples()) > len(later) > 2
+
+
+def test_nvidia_smi_loop_groups_lines_into_ticks(tmp_path):
+    exe = tmp_path / "nvidia-smi"
+    exe.write_text(FAKE_NVIDIA_SMI.format(python=sys.executable), encoding="utf-8")
+    exe.chmod(0o755)
+    sampler = BackgroundSampler(NvidiaSmiLoop(10, exe=str(exe)))
+    sampler.start()
+    deadline = time.time() + 5
+    while len(sampler.samples()) < 5 and time.time() < deadline:
+        time.sleep(0.01)
+    sampler.stop()
+    samples = sampler.samples()
+    assert [len(s.gpus) for s in samples] == [2] * 5
+    assert [s.gpus[1].used_mib for s in samples] == [1000, 1100, 1200, 1300, 1400]
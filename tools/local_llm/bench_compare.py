@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""Regression gate: compare a benchmark run against a baseline run.
+
+Inputs are `runtime-probe-v1` or `vram-bench-v1` outputs, and both sides must
+use the same schema. The baseline comes from `--baseline FILE` or, with
+`--baseline-store`, from the latest earlier run of that schema on this host
+in the results store. Results are matched by (runtime, model).
+
+A metric regresses when it moves in the bad direction by more than its
+relative threshold and, where both runs carry count/mean/stddev, a one-sided
+Welch t-test finds the change significant at `--alpha`. The test covers
+`avg_latency_sec` (from the latency stats) and `avg_tokens_per_sec` (from
+`tokens_per_sec_stats`). p90 latency, TTFT and VRAM have no per-sample
+spread, since peak VRAM is one maximum per run. They are judged on the
+threshold alone.
+
+A model that is present in the baseline but missing or failed in the current
+run counts as a regression unless `--allow-missing` is given.
+
+A table is printed on stderr and JSON (`schema_version: bench-compare-v1`)
+on stdout. The exit code is 1 when anything regressed, which makes the tool
+usable as a deploy gate.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from latency_stats import welch_t_test
+from results_store import ResultsStore, default_store_path, host_fingerprint, lookup, number
+
+SCHEMA_VERSION = "bench-compare-v1"
+SUPPORTED_SCHEMAS = ("runtime-probe-v1", "vram-bench-v1")
+
+
+@dataclass(frozen=True)
+class MetricSpec:
+    name: str
+    paths: Tuple[str, ...]  # first present path wins (runtime_probe vs latency_probe layouts)
+    higher_is_better: bool
+    threshold: float  # relative change in the bad direction that counts as a regression
+    stats_paths: Tuple[str, ...] = ()
+
+
+METRICS = (
+    MetricSpec(
+        "avg_latency_sec",
+        ("latency.avg_latency_sec",),
+        False,
+        0.10,
+        ("latency.stats", "latency.latency_stats"),
+    ),
+    MetricSpec(
+        "avg_tokens_per_sec",
+        ("latency.avg_tokens_per_sec",),
+        True,
+        0.10,
+        ("latency.tokens_per_sec_stats",),
+    ),
+    MetricSpec("p90_latency_sec", ("latency.stats.p90", "latency.latency_stats.p90"), False, 0.25),
+    MetricSpec("ttft_sec", ("latency.stream.avg_ttft_sec",), False, 0.15),
+    MetricSpec("peak_vram_used_mib", ("vram_series.peak_used_mib",), False, 0.05),
+    MetricSpec("vram_drop_mib", ("min_free_drop_mib",), False, 0.10),
+)
+
+ResultKey = Tuple[Optional[str], Optional[str]]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--current", required=True, help="Current runtime_probe/vram_bench JSON")
+    baseline = parser.add_mutually_exclusive_group(required=True)
+    baseline.add_argument("--baseline", help="Baseline JSON of the same schema")
+    baseline.add_argument(
+        "--baseline-store",
+        nargs="?",
+        const=str(default_store_path()),
+        help="Use the latest earlier run on this host from the results store",
+    )
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level")
+    parser.add_argument(
+        "--threshold",
+        action="append",
+        default=[],
+        metavar="METRIC=FRACTION",
+        help="Override a metric threshold, e.g. avg_latency_sec=0.2 (repeatable)",
+    )
+    parser.add_argument(
+        "--allow-missing",
+        action="store_true",
+        help="Do not fail when a baseline model is missing or failed in the current run",
+    )
+    parser.add_argument("--output", help="Optional JSON output path")
+    return parser.parse_args()
+
+
+def parse_thresholds(items: List[str]) -> Dict[str, float]:
+    known = {spec.name for spec in METRICS}
+    thresholds: Dict[str, float] = {}
+    for item in items:
+        name, sep, value = item.partition("=")
+        if not sep or name not in known:
+            raise ValueError(f"--threshold expects METRIC=FRACTION with METRIC in {sorted(known)}")
+        thresholds[name] = float(value)
+        if thresholds[name] < 0:
+            raise ValueError(f"threshold for {name} must be >= 0")
+    return thresholds
+
+
+def index_results(payload: Dict[str, Any]) -> Dict[ResultKey, Dict[str, Any]]:
+    return {
+        (result.get("runtime"), result.get("model")): result
+        for result in payload.get("results", [])
+        if isinstance(result, dict)
+    }
+
+
+def first_value(result: Dict[str, Any], paths: Tuple[str, ...]) -> Any:
+    for path in paths:
+        value = lookup(result, path)
+        if value is not None:
+            return value
+    return None
+
+
+def compare_metric(
+    spec: MetricSpec,
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float,
+    alpha: float,
+) -> Optional[Dict[str, Any]]:
+    """One comparison row, or None when the baseline lacks the metric."""
+    base = number(first_value(baseline, spec.paths))
+    if base is None or base <= 0:
+        return None
+    row: Dict[str, Any] = {
+        "metric": spec.name,
+        "baseline": base,
+        "current": None,
+        "change": None,
+        "threshold": threshold,
+        "p_value": None,
+        "test": "threshold",
+    }
+    value = number(first_value(current, spec.paths))
+    if value is None:
+        row["status"] = "missing"
+        return row
+    row["current"] = value
+    change = (value - base) / base
+    worse = -change if spec.higher_is_better else change
+    row["change"] = change
+
+    base_stats = first_value(baseline, spec.stats_paths)
+    cur_stats = first_value(current, spec.stats_paths)
+    significant = True
+    if isinstance(base_stats, dict) and isinstance(cur_stats, dict):
+        try:
+            test = welch_t_test(base_stats, cur_stats)
+        except (KeyError, TypeError):
+            test = None
+        if test is not None:
+            # One-sided p in the direction the metric actually moved.
+            p_greater = test[2]
+            row["p_value"] = p_greater if change >= 0 else 1.0 - p_greater
+            row["test"] = "welch"
+            significant = row["p_value"] < alpha
+    if worse > threshold and significant:
+        row["status"] = "regression"
+    elif -worse > threshold and significant:
+        row["status"] = "improvement"
+    else:
+        row["status"] = "ok"
+    return row
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    thresholds: Optional[Dict[str, float]] = None,
+    alpha: float = 0.05,
+    allow_missing: bool = False,
+) -> Dict[str, Any]:
+    """Compare two outputs of the same schema; ``ok`` is false on any regression."""
+    thresholds = thresholds or {}
+    schema = current.get("schema_version")
+    if schema not in SUPPORTED_SCHEMAS:
+        raise ValueError(f"unsupported schema_version {schema!r}; expected {SUPPORTED_SCHEMAS}")
+    if baseline.get("schema_version") != schema:
+        raise ValueError(
+            f"baseline schema {baseline.get('schema_version')!r} does not match {schema!r}"
+        )
+    current_results = index_results(current)
+    rows: List[Dict[str, Any]] = []
+    for key, base_result in index_results(baseline).items():
+        if not (base_result.get("latency") or {}).get("ok"):
+            continue  # nothing to compare against
+        result = current_results.get(key)
+        label = {"runtime": key[0], "model": key[1]}
+        if result is None or not (result.get("latency") or {}).get("ok"):
+            rows.append({**label, "metric": "result", "status": "missing"})
+            continue
+        for spec in METRICS:
+            row = compare_metric(
+                spec, base_result, result, thresholds.get(spec.name, spec.threshold), alpha
+            )
+            if row is not None:
+                rows.append({**label, **row})
+    failing = {"regression"} if allow_missing else {"regression", "missing"}
+    regressions = [row for row in rows if row["status"] in failing]
+    return {
+        "ok": not regressions,
+        "schema_version": SCHEMA_VERSION,
+        "compared_schema": schema,
+        "alpha": alpha,
+        "regressions": len(regressions),
+        "comparisons": rows,
+    }
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    def fmt(value: Any, pattern: str) -> str:
+        return "-" if value is None else pattern.format(value)
+
+    table = [("runtime", "model", "metric", "baseline", "current", "change", "p", "status")]
+    for row in rows:
+        table.append(
+            (
+                row.get("runtime") or "-",
+                row.get("model") or "-",
+                row["metric"],
+                fmt(row.get("baseline"), "{:.4g}"),
+                fmt(row.get("current"), "{:.4g}"),
+                fmt(row.get("change"), "{:+.1%}"),
+                fmt(row.get("p_value"), "{:.3f}"),
+                row["status"].upper() if row["status"] != "ok" else "ok",
+            )
+        )
+    widths = [max(len(line[col]) for line in table) for col in range(len(table[0]))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(line, widths, strict=True)).rstrip()
+        for line in table
+    )
+
+
+def load_payload(path: Path) -> Dict[str, Any]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object")
+    return data
+
+
+def load_baseline(args: argparse.Namespace, current: Dict[str, Any]) -> Dict[str, Any]:
+    if args.baseline:
+        return load_payload(Path(args.baseline))
+    store = ResultsStore(Path(args.baseline_store))
+    try:
+        payload = store.latest_payload(
+            str(current.get("schema_version")), host=host_fingerprint()[0], exclude=current
+        )
+    finally:
+        store.close()
+    if payload is None:
+        raise ValueError(f"no earlier {current.get('schema_version')} run in {args.baseline_store}")
+    return payload
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        thresholds = parse_thresholds(args.threshold)
+        current = load_payload(Path(args.current))
+        baseline = load_baseline(args, current)
+        report = compare(baseline, current, thresholds, args.alpha, args.allow_missing)
+    except (OSError, ValueError, sqlite3.Error) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    print(format_table(report["comparisons"]), file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
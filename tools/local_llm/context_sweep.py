@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Sweep prompt and output lengths to measure prefill and decode scaling.
+
+For every (prompt tokens, output tokens) cell of the grid this sends one or
+more streamed completions and records:
+- prefill: time to first token and prompt tokens/sec
+- decode: tokens/sec after the first token and the median inter-token gap
+- peak VRAM during the cell (background `vram_sampler`, when nvidia-smi works)
+
+Prompts are filler text of common words, each about one token. The
+words-per-token ratio is re-estimated from the `usage.prompt_tokens` each
+response reports, so later cells land close to their targets; the reported
+`prompt_tokens` is what the server counted. Each request starts with a unique
+nonce, so prefix caching cannot skip the prefill being measured.
+`--ignore-eos` asks runtimes that support it (vLLM, llama.cpp) to generate
+the full `max_tokens`.
+
+Least-squares fits over the grid summarize the scaling per model/runtime:
+- `prefill_sec` vs prompt kilotokens: quadratic, since attention is
+  quadratic in context
+- `decode_sec_per_token` vs context kilotokens at mid-decode: linear, for
+  KV-cache reads
+- `peak_vram_mib` vs context kilotokens: linear, the KV-cache footprint
+
+Output uses `schema_version: context-sweep-v1`; `policy_calibrate.py` accepts
+it as latency/VRAM input for `long_context_threshold_tokens`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import policy_calibrate
+import vram_sampler
+from probe_common import HttpClient, ProbeError, StreamResult
+from results_store import add_store_arg, store_result
+
+SCHEMA_VERSION = "context-sweep-v1"
+DEFAULT_PROMPT_TOKENS = "1024,4096,16384,32768,65536,131072"
+DEFAULT_OUTPUT_TOKENS = "16,128,512,2048"
+WORDS = (
+    "the of and to in is was for on that with as by at from his her they this had "
+    "not are but be have which one were all we when there can an your been would "
+    "their if has more will who some what out so them other about into than then "
+    "time could these two may first only new very any like our over also after "
+    "made did many most way down even because through long little much before"
+).split()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", required=True, help="Chat completions URL")
+    parser.add_argument("--model", required=True, help="Model name")
+    parser.add_argument("--runtime", default="", help="Runtime label recorded in the output")
+    parser.add_argument(
+        "--prompt-tokens", default=DEFAULT_PROMPT_TOKENS, help="Comma-separated prompt lengths"
+    )
+    parser.add_argument(
+        "--output-tokens", default=DEFAULT_OUTPUT_TOKENS, help="Comma-separated max_tokens values"
+    )
+    parser.add_argument(
+        "--context-limit",
+        type=int,
+        default=0,
+        help="Skip cells whose prompt + output exceed this many tokens (0: no limit)",
+    )
+    parser.add_argument("--iterations", type=int, default=1, help="Requests per cell (median kept)")
+    parser.add_argument("--ignore-eos", action="store_true", help="Send ignore_eos: true")
+    parser.add_argument("--timeout-sec", type=float, default=600.0, help="Request timeout")
+    parser.add_argument(
+        "--sample-interval-ms",
+        type=int,
+        default=vram_sampler.DEFAULT_INTERVAL_MS,
+        help="Background VRAM sampling interval (0 disables)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Filler text RNG seed")
+    parser.add_argument("--output", help="Optional JSON output path")
+    add_store_arg(parser)
+    return parser.parse_args()
+
+
+def parse_lengths(text: str) -> List[int]:
+    values = sorted({int(part) for part in text.split(",") if part.strip()})
+    if not values or values[0] <= 0:
+        raise ValueError(f"expected comma-separated positive token counts, got {text!r}")
+    return values
+
+
+class PromptBuilder:
+    """Filler prompts of a target token length, refined from server-reported counts."""
+
+    def __init__(self, seed: int = 0) -> None:
+        self.rng = random.Random(seed)
+        self.tokens_per_word = 1.0
+        self.nonce = 0
+
+    def build(self, target_tokens: int) -> str:
+        self.nonce += 1
+        header = (
+            f"[sweep {self.nonce}-{self.rng.getrandbits(32):08x}] "
+            "Continue the following notes in the same style until told to stop.\n"
+        )
+        words = max(1, int(target_tokens / self.tokens_per_word) - 24)
+        return header + " ".join(self.rng.choice(WORDS) for _ in range(words))
+
+    def observe(self, prompt: str, prompt_tokens: Optional[int]) -> None:
+        words = len(prompt.split())
+        if prompt_tokens and words > 100:
+            self.tokens_per_word = prompt_tokens / words
+
+
+def median(values: Sequence[Optional[float]]) -> Optional[float]:
+    present = [v for v in values if v is not None]
+    return statistics.median(present) if present else None
+
+
+def measure_cell(
+    client: HttpClient,
+    builder: PromptBuilder,
+    args: argparse.Namespace,
+    prompt_target: int,
+    output_target: int,
+    sampler: Optional[vram_sampler.BackgroundSampler],
+) -> Dict[str, Any]:
+    cell: Dict[str, Any] = {
+        "prompt_tokens_target": prompt_target,
+        "output_tokens_target": output_target,
+    }
+    runs: List[StreamResult] = []
+    started = time.perf_counter()
+    try:
+        for _ in range(args.iterations):
+            prompt = builder.build(prompt_target)
+            payload: Dict[str, Any] = {
+                "model": args.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": output_target,
+                "temperature": 0,
+            }
+            if args.ignore_eos:
+                payload["ignore_eos"] = True
+            result = client.stream_chat(args.url, payload, timeout_sec=args.timeout_sec)
+            builder.observe(prompt, result.prompt_tokens)
+            runs.append(result)
+    except ProbeError as exc:
+        cell["error"] = str(exc)
+        return cell
+    ended = time.perf_counter()
+    gaps = [statistics.median(r.inter_token_sec()) for r in runs if len(r.token_times) > 1]
+    cell.update(
+        {
+            "prompt_tokens": median([r.prompt_tokens for r in runs]),
+            "output_tokens": median([r.output_tokens for r in runs]),
+            "ttft_sec": median([r.ttft_sec for r in runs]),
+            "prefill_tokens_per_sec": median([r.prefill_tokens_per_sec() for r in runs]),
+            "decode_tokens_per_sec": median([r.decode_tokens_per_sec() for r in runs]),
+            "itl_p50_sec": median(gaps),
+            "total_sec": median([r.total_sec for r in runs]),
+            "peak_vram_used_mib": None,
+        }
+    )
+    if sampler is not None:
+        series = vram_sampler.summarize_series(sampler.samples(started, ended), started, ended)
+        if series["ok"]:
+            cell["peak_vram_used_mib"] = series["peak_used_mib"]
+    return cell
+
+
+def fit_or_none(xs: List[float], ys: List[float], degree: int) -> Optional[Dict[str, Any]]:
+    """policy_calibrate least squares; lowers the degree when there are too few x values."""
+    degree = min(degree, len(set(xs)) - 1)
+    if degree < 1:
+        return None
+    try:
+        fit = policy_calibrate.fit_polynomial(xs, ys, degree)
+    except ValueError:
+        return None
+    return fit.to_dict()
+
+
+def fit_grid(cells: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Scaling fits over successful cells (x in tokens; coefficients per kilotoken)."""
+    ok = [c for c in cells if "error" not in c and c.get("prompt_tokens")]
+    prefill = [c for c in ok if c.get("ttft_sec") is not None]
+    decode = [c for c in ok if c.get("decode_tokens_per_sec")]
+    vram = [c for c in ok if c.get("peak_vram_used_mib") is not None]
+    return {
+        "prefill_sec": fit_or_none(
+            [float(c["prompt_tokens"]) for c in prefill], [c["ttft_sec"] for c in prefill], 2
+        ),
+        "decode_sec_per_token": fit_or_none(
+            [c["prompt_tokens"] + (c["output_tokens"] or 0) / 2 for c in decode],
+            [1.0 / c["decode_tokens_per_sec"] for c in decode],
+            1,
+        ),
+        "peak_vram_mib": fit_or_none(
+            [c["prompt_tokens"] + (c["output_tokens"] or 0) for c in vram],
+            [float(c["peak_vram_used_mib"]) for c in vram],
+            1,
+        ),
+    }
+
+
+def start_sampler(interval_ms: int) -> Optional[vram_sampler.BackgroundSampler]:
+    if interval_ms <= 0:
+        return None
+    sampler = vram_sampler.BackgroundSampler(vram_sampler.make_backend("loop", interval_ms))
+    try:
+        sampler.start()
+    except Exception as exc:  # VRAM is optional for the sweep
+        print(f"WARN: VRAM sampling disabled ({exc})", file=sys.stderr)
+        return None
+    return sampler
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        prompt_lengths = parse_lengths(args.prompt_tokens)
+        output_lengths = parse_lengths(args.output_tokens)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    client = HttpClient(timeout_sec=args.timeout_sec)
+    builder = PromptBuilder(args.seed)
+    sampler = start_sampler(args.sample_interval_ms)
+    started = time.time()
+    cells: List[Dict[str, Any]] = []
+    skipped: List[Dict[str, int]] = []
+    try:
+        for prompt_target in prompt_lengths:
+            for output_target in output_lengths:
+                if args.context_limit and prompt_target + output_target > args.context_limit:
+                    skipped.append(
+                        {
+                            "prompt_tokens_target": prompt_target,
+                            "output_tokens_target": output_target,
+                        }
+                    )
+                    continue
+                cell = measure_cell(client, builder, args, prompt_target, output_target, sampler)
+                cells.append(cell)
+                print(
+                    f"cell prompt={prompt_target} output={output_target}: "
+                    f"{cell.get('error') or 'ok'}",
+                    file=sys.stderr,
+                )
+    finally:
+        client.close()
+        if sampler is not None:
+            sampler.stop()
+
+    failures = [c for c in cells if "error" in c]
+    payload = {
+        "ok": bool(cells) and not failures,
+        "schema_version": SCHEMA_VERSION,
+        "timestamp": time.time(),
+        "duration_sec": round(time.time() - started, 3),
+        "url": args.url,
+        "model": args.model,
+        "runtime": args.runtime or None,
+        "iterations": args.iterations,
+        "ignore_eos": args.ignore_eos,
+        "grid": cells,
+        "skipped": skipped,
+        "fits": fit_grid(cells),
+    }
+    text = json.dumps(payload, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    store_result(args.store, "context_sweep", payload)
+    return 0 if payload["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -60,6 +60,12 @@ def mtok(tokens: int) -> float:
     return tokens / 1_000_000.0
 
 
+def claude_cost(pricing: Pricing, input_tokens: int, output_tokens: int) -> float:
+    return (mtok(input_tokens) * pricing.input_per_mtok) + (
+        mtok(output_tokens) * pricing.output_per_mtok
+    )
+
+
 def compute_costs(
     pricing: Pricing, local_cost_per_mtok: float, scenario: Scenario
 ) -> Dict[str, float]:
@@ -71,19 +77,15 @@ def compute_costs(
         claude_input + claude_output
     )
 
-    claude_cost = (mtok(claude_input) * pricing.input_per_mtok) + (
-        mtok(claude_output) * pricing.output_per_mtok
-    )
+    claude = claude_cost(pricing, claude_input, claude_output)
     local_cost = mtok(local_tokens) * local_cost_per_mtok
-    total = claude_cost + local_cost
-    baseline = (mtok(scenario.input_tokens) * pricing.input_per_mtok) + (
-        mtok(scenario.output_tokens) * pricing.output_per_mtok
-    )
+    total = claude + local_cost
+    baseline = claude_cost(pricing, scenario.input_tokens, scenario.output_tokens)
     savings = baseline - total
     savings_pct = 0.0 if baseline == 0 else (savings / baseline) * 100.0
 
     return {
-        "claude_cost": claude_cost,
+        "claude_cost": claude,
         "local_cost": local_cost,
         "total_cost": total,
         "baseline_cost": baseline,
@@ -112,6 +112,28 @@ def main() -> int:
                 print(f"ERROR: {msg}", file=sys.stderr)
                 return 1
 
+        # runtime_probe --fail-fast stops parallel probing cleanly and reports cancellations
+        with tempfile.TemporaryDirectory() as tmp:
+            cfg = Path(tmp) / "runtimes.json"
+            runtimes = [
+                {"name": "gpu-runtime", "url": url, "models": ["http_500", "ok"], "gpus": [0]},
+                {"name": "cpu-runtime", "url": url, "models": ["timeout"]},
+            ]
+            cfg.write_text(
+                json.dumps({"runtimes": runtimes, "iterations": 1, "timeout_sec": 10}),
+                encoding="utf-8",
+            )
+            ok, msg = run(
+                [sys.executable, "tools/local_llm/runtime_probe.py", "--config", str(cfg),
+                 "--jobs", "2", "--fail-fast"],
+                expect_ok=False,
+            )
+            if ok and '"cancelled"' not in msg:
+                ok, msg = False, f"runtime_probe --fail-fast did not report cancellations\n{msg}"
+            if not ok:
+                print(f"ERROR: {msg}", file=sys.stderr)
+                return 1
+
         print("OK: failure injection checks passed")
         return 0
     finally:
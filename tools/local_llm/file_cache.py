@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Per-file result cache keyed by path + mtime + size.
+
+Used by routing stages that derive a value from file contents (token
+estimates, secret scans) so repeated routing of the same working tree only
+costs one ``stat`` per file. Entries are invalidated when the file changes or
+when the producer's fingerprint (model/pattern version) changes. The cache
+keeps at most ``max_entries`` files, dropping the least recently written, and
+saves through a unique temp file so concurrent writers never share one.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = 50_000
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "claude-code-localllm"
+
+
+def stat_key(path: str) -> Optional[Tuple[str, int, int]]:
+    """Return (absolute path, mtime_ns, size), or None if the file is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+class StatCache:
+    """JSON-backed cache of per-file values; call ``save()`` to persist."""
+
+    def __init__(
+        self, path: Optional[Path], fingerprint: str, max_entries: int = DEFAULT_MAX_ENTRIES
+    ) -> None:
+        self.path = path
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._entries: Dict[str, Any] = {}
+        if path is not None and path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                data = {}
+            if isinstance(data, dict) and data.get("fingerprint") == fingerprint:
+                entries = data.get("entries", {})
+                self._entries = entries if isinstance(entries, dict) else {}
+
+    def get(self, key: Tuple[str, int, int]) -> Any:
+        abspath, mtime_ns, size = key
+        entry = self._entries.get(abspath)
+        if (
+            isinstance(entry, list)
+            and len(entry) == 3
+            and entry[0] == mtime_ns
+            and entry[1] == size
+        ):
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        return None
+
+    def put(self, key: Tuple[str, int, int], value: Any) -> None:
+        abspath, mtime_ns, size = key
+        self._entries.pop(abspath, None)  # re-insert so dict order is least recently written
+        self._entries[abspath] = [mtime_ns, size, value]
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+        self._dirty = True
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"fingerprint": self.fingerprint, "entries": self._entries}
+        handle = tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=self.path.parent,
+            prefix=self.path.name + ".",
+            suffix=".tmp",
+            delete=False,
+        )
+        try:
+            with handle:
+                json.dump(payload, handle, separators=(",", ":"))
+            os.replace(handle.name, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(handle.name)
+            raise
+        self._dirty = False
@@ -1,42 +1,83 @@
 #!/usr/bin/env python3
-"""Measure latency and tokens/sec for a local model endpoint."""
+"""Measure latency and tokens/sec for a local model endpoint.
+
+Iterations share one keep-alive connection, so only the first pays for TCP
+setup; `--timing` reports the connect/send/TTFB/body split per iteration.
+
+`--stream` requests SSE output and adds time to first token, the inter-token
+latency distribution (pooled across iterations) and decode tokens/sec measured
+from first to last token, separately from prefill (prompt tokens / TTFT).
+
+`--warmup` iterations (default 1) are sent first and discarded; the remaining
+samples are summarized by `latency_stats` (percentiles, stddev, bootstrap CI,
+histogram). `--target-ci 0.05 --max-iterations 30` keeps sampling until the
+95% CI of the mean is within 5%.
+"""
 
 from __future__ import annotations
 
 import argparse
 import json
-import socket
+import sys
 import time
-import urllib.error
-import urllib.request
+from typing import Optional
+
+from latency_stats import (
+    SamplingPlan,
+    add_plan_args,
+    plan_from_args,
+    run_adaptive,
+    summary_stats,
+)
+from probe_common import HttpClient, ProbeError, default_client, stream_summary
+from results_store import add_store_arg, store_result
+
+DEFAULT_PROMPT = "Say hello in one sentence."
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
     parser.add_argument("--url", required=True, help="Chat completions URL")
     parser.add_argument("--model", required=True, help="Model name")
-    parser.add_argument("--prompt", default="Say hello in one sentence.", help="Prompt")
-    parser.add_argument("--iterations", type=int, default=3, help="Iterations")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT, help="Prompt")
+    add_plan_args(parser)
     parser.add_argument("--timeout-sec", type=int, default=60, help="Request timeout")
+    parser.add_argument(
+        "--timing", action="store_true", help="Include a per-iteration request timing breakdown"
+    )
+    parser.add_argument(
+        "--stream", action="store_true", help="Stream the completion and report TTFT/ITL"
+    )
+    add_store_arg(parser)
     return parser.parse_args()
 
 
-def run_once(url: str, model: str, prompt: str, timeout_sec: int) -> dict:
+def run_once(
+    url: str,
+    model: str,
+    prompt: str,
+    timeout_sec: int,
+    client: Optional[HttpClient] = None,
+    stream: bool = False,
+) -> dict:
     payload = {
         "model": model,
         "messages": [{"role": "user", "content": prompt}],
         "max_tokens": 64,
     }
-    request = urllib.request.Request(
-        url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    start = time.time()
-    with urllib.request.urlopen(request, timeout=timeout_sec) as response:
-        data = json.loads(response.read().decode("utf-8"))
-    elapsed = time.time() - start
+    if stream:
+        result = (client or default_client()).stream_chat(url, payload, timeout_sec=timeout_sec)
+        elapsed = result.total_sec
+        tokens = result.completion_tokens
+        return {
+            "elapsed_sec": elapsed,
+            "output_tokens": tokens,
+            "tokens_per_sec": None if tokens is None or elapsed == 0 else tokens / elapsed,
+            "timing": result.timing.to_dict(),
+            "stream": result,
+        }
+    data, timing = (client or default_client()).post_json(url, payload, timeout_sec=timeout_sec)
+    elapsed = timing.total_sec
     usage = data.get("usage", {})
     if not isinstance(usage, dict) or "completion_tokens" not in usage:
         output_tokens = None
@@ -48,42 +89,83 @@ def run_once(url: str, model: str, prompt: str, timeout_sec: int) -> dict:
         "elapsed_sec": elapsed,
         "output_tokens": output_tokens,
         "tokens_per_sec": tokens_per_sec,
+        "timing": timing.to_dict(),
     }
 
 
-def main() -> int:
-    args = parse_args()
+def probe(
+    url: str,
+    model: str,
+    prompt: str = DEFAULT_PROMPT,
+    timeout_sec: int = 60,
+    plan: Optional[SamplingPlan] = None,
+    stream: bool = False,
+    timing: bool = False,
+    client: Optional[HttpClient] = None,
+    record_requests: bool = False,
+) -> dict:
+    """Run the sampling plan and return the CLI's JSON summary (``ok`` false on a failed request).
+
+    ``record_requests`` adds ``requests``: the ``perf_counter()`` start/end and
+    output tokens of each kept iteration, for aligning with other samplers.
+
+    Raises:
+        ValueError: for an invalid ``plan``
+    """
+    plan = plan or SamplingPlan()
+
+    def measure() -> dict:
+        started = time.perf_counter()
+        result = run_once(url, model, prompt, timeout_sec, client=client, stream=stream)
+        result["window"] = (started, time.perf_counter())
+        return result
+
     try:
-        results = [run_once(args.url, args.model, args.prompt, args.timeout_sec) for _ in range(args.iterations)]
-    except urllib.error.HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="replace").strip()
-        detail = body or "no error body"
-        print(json.dumps({"ok": False, "error": f"HTTP {exc.code} ({detail})"}))
-        return 1
-    except urllib.error.URLError as exc:
-        print(json.dumps({"ok": False, "error": f"URL error ({exc})"}))
-        return 1
-    except TimeoutError as exc:
-        print(json.dumps({"ok": False, "error": f"timeout ({exc})"}))
-        return 1
-    except socket.timeout as exc:
-        print(json.dumps({"ok": False, "error": f"timeout ({exc})"}))
-        return 1
-    avg_latency = sum(r["elapsed_sec"] for r in results) / len(results)
+        results, stats = run_adaptive(measure, lambda r: r["elapsed_sec"], plan)
+    except ProbeError as exc:
+        return {"ok": False, "error": str(exc)}
     tps_values = [r["tokens_per_sec"] for r in results if isinstance(r.get("tokens_per_sec"), (int, float))]
     avg_tps = None if not tps_values else sum(tps_values) / len(tps_values)
-    print(
-        json.dumps(
-            {
-                "ok": True,
-                "model": args.model,
-                "iterations": args.iterations,
-                "avg_latency_sec": avg_latency,
-                "avg_tokens_per_sec": avg_tps,
-            }
+    summary = {
+        "ok": True,
+        "model": model,
+        "iterations": len(results),
+        "warmup_iterations": plan.warmup,
+        "avg_latency_sec": stats.mean,
+        "avg_tokens_per_sec": avg_tps,
+        "latency_stats": stats.to_dict(),
+        "tokens_per_sec_stats": summary_stats(tps_values),
+    }
+    if stream:
+        summary["stream"] = stream_summary([r["stream"] for r in results])
+    if timing:
+        summary["timing"] = [r["timing"] for r in results]
+    if record_requests:
+        summary["requests"] = [
+            {"start": r["window"][0], "end": r["window"][1], "output_tokens": r["output_tokens"]}
+            for r in results
+        ]
+    return summary
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        summary = probe(
+            args.url,
+            args.model,
+            args.prompt,
+            args.timeout_sec,
+            plan_from_args(args),
+            stream=args.stream,
+            timing=args.timing,
         )
-    )
-    return 0
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    print(json.dumps(summary))
+    store_result(args.store, "latency_probe", summary)
+    return 0 if summary["ok"] else 1
 
 
 if __name__ == "__main__":
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Latency statistics shared by the probes: warm-up, percentiles and bootstrap CIs.
+
+`run_adaptive` calls a measurement function, discards the first `warmup`
+results (cold caches, model load, connection setup), then keeps measuring
+until it has `min_iterations` samples. After that it stops once the bootstrap
+confidence interval of the mean is narrower than `target_rel_ci` (half-width
+over mean) or `max_iterations` is reached. With the defaults
+(`max_iterations == min_iterations`) it is a fixed-count loop.
+
+`LatencyStats.to_dict` reports mean, stddev, min/max, p50/p90/p99 (linear
+interpolation over the raw samples), the CI and a log-bucketed `Histogram`
+that keeps every sample at about 2% relative resolution, so runs can be
+merged or compared later without storing the raw list.
+
+`welch_t_test` compares two such summaries (count, mean, stddev) without
+assuming equal variances; `bench_compare.py` uses it to decide whether a
+change between runs is more than noise.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from probe_common import percentile
+
+T = TypeVar("T")
+
+DEFAULT_GROWTH = 1.02
+DEFAULT_RESAMPLES = 1000
+
+
+class Histogram:
+    """Counts per log-spaced bucket; bucket ``k`` covers (growth**(k-1), growth**k] seconds."""
+
+    def __init__(self, growth: float = DEFAULT_GROWTH) -> None:
+        if growth <= 1.0:
+            raise ValueError("histogram growth must be > 1")
+        self.growth = growth
+        self.counts: Dict[int, int] = {}
+        self.zeros = 0
+
+    def add(self, value: float) -> None:
+        if value <= 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value) / math.log(self.growth) - 1e-9)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def merge(self, other: Histogram) -> None:
+        if other.growth != self.growth:
+            raise ValueError("cannot merge histograms with different growth")
+        self.zeros += other.zeros
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    @property
+    def count(self) -> int:
+        return self.zeros + sum(self.counts.values())
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the ``pct`` percentile (nearest rank)."""
+        total = self.count
+        if total == 0:
+            raise ValueError("percentile of empty histogram")
+        rank = max(1, math.ceil(total * pct / 100.0))
+        seen = self.zeros
+        if seen >= rank:
+            return 0.0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= rank:
+                return self.growth**key
+        raise AssertionError("unreachable")
+
+    def to_dict(self) -> Dict[str, Any]:
+        buckets = [[round(self.growth**key, 6), self.counts[key]] for key in sorted(self.counts)]
+        if self.zeros:
+            buckets.insert(0, [0.0, self.zeros])
+        return {"growth": self.growth, "buckets": buckets}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Histogram:
+        hist = cls(float(data.get("growth", DEFAULT_GROWTH)))
+        for upper, count in data.get("buckets", []):
+            if upper <= 0:
+                hist.zeros += int(count)
+            else:
+                key = round(math.log(upper) / math.log(hist.growth))
+                hist.counts[key] = hist.counts.get(key, 0) + int(count)
+        return hist
+
+
+@dataclass(frozen=True)
+class SamplingPlan:
+    warmup: int = 1
+    min_iterations: int = 3
+    max_iterations: int = 3
+    target_rel_ci: float = 0.0
+    confidence: float = 0.95
+    resamples: int = DEFAULT_RESAMPLES
+    seed: int = 0
+
+    def validate(self) -> None:
+        if self.warmup < 0 or self.min_iterations < 1:
+            raise ValueError("warmup must be >= 0 and min_iterations >= 1")
+        if self.max_iterations < self.min_iterations:
+            raise ValueError("max_iterations must be >= min_iterations")
+        if not 0 < self.confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+
+
+def mean(values: List[float]) -> float:
+    return sum(values) / len(values)
+
+
+def stddev(values: List[float]) -> float:
+    """Sample standard deviation (0 for fewer than two values)."""
+    if len(values) < 2:
+        return 0.0
+    avg = mean(values)
+    return math.sqrt(sum((v - avg) ** 2 for v in values) / (len(values) - 1))
+
+
+def summary_stats(values: List[float]) -> Optional[Dict[str, float]]:
+    """count/mean/stddev, the inputs ``welch_t_test`` needs (None for no values)."""
+    if not values:
+        return None
+    return {"count": len(values), "mean": mean(values), "stddev": stddev(values)}
+
+
+def _beta_continued_fraction(a: float, b: float, x: float) -> float:
+    """Lentz's method for the continued fraction of the incomplete beta function."""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 300):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.0) < 1e-12:
+            break
+    return result
+
+
+def regularized_beta(a: float, b: float, x: float) -> float:
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    log_front = (
+        math.lgamma(a + b)
+        - math.lgamma(a)
+        - math.lgamma(b)
+        + a * math.log(x)
+        + b * math.log(1.0 - x)
+    )
+    if x < (a + 1) / (a + b + 2):
+        return math.exp(log_front) * _beta_continued_fraction(a, b, x) / a
+    return 1.0 - math.exp(log_front) * _beta_continued_fraction(b, a, 1.0 - x) / b
+
+
+def student_t_sf(t: float, df: float) -> float:
+    """P(T >= t) for Student's t with ``df`` degrees of freedom."""
+    tail = 0.5 * regularized_beta(df / 2, 0.5, df / (df + t * t))
+    return tail if t >= 0 else 1.0 - tail
+
+
+def welch_t_test(
+    baseline: Dict[str, float], current: Dict[str, float]
+) -> Optional[Tuple[float, float, float]]:
+    """Welch's t-test of ``current`` mean > ``baseline`` mean.
+
+    Takes ``summary_stats``-shaped dicts and returns (t, df, one-sided p), or
+    None when either side has fewer than two samples. Identical constant
+    samples give p = 1; different constants give p = 0 (or 1 if lower).
+    """
+    n1, n2 = baseline["count"], current["count"]
+    if n1 < 2 or n2 < 2:
+        return None
+    v1 = baseline["stddev"] ** 2 / n1
+    v2 = current["stddev"] ** 2 / n2
+    diff = current["mean"] - baseline["mean"]
+    if v1 + v2 == 0:
+        if diff == 0:
+            return 0.0, math.inf, 1.0
+        return math.copysign(math.inf, diff), math.inf, 0.0 if diff > 0 else 1.0
+    t = diff / math.sqrt(v1 + v2)
+    df = (v1 + v2) ** 2 / (v1 * v1 / (n1 - 1) + v2 * v2 / (n2 - 1))
+    return t, df, student_t_sf(t, df)
+
+
+def bootstrap_ci(
+    values: List[float],
+    confidence: float = 0.95,
+    resamples: int = DEFAULT_RESAMPLES,
+    rng: Optional[random.Random] = None,
+) -> Tuple[float, float]:
+    """Percentile-bootstrap confidence interval of the mean."""
+    if len(values) < 2:
+        return values[0], values[0]
+    rng = rng or random.Random(0)
+    n = len(values)
+    means = [mean([values[rng.randrange(n)] for _ in range(n)]) for _ in range(resamples)]
+    tail = (1 - confidence) / 2 * 100
+    return percentile(means, tail), percentile(means, 100 - tail)
+
+
+@dataclass(frozen=True)
+class LatencyStats:
+    samples: Tuple[float, ...]
+    warmup_discarded: int
+    ci: Tuple[float, float]
+    confidence: float
+    converged: Optional[bool]  # None when no CI target was set
+
+    @classmethod
+    def from_samples(
+        cls,
+        samples: List[float],
+        warmup_discarded: int = 0,
+        confidence: float = 0.95,
+        resamples: int = DEFAULT_RESAMPLES,
+        seed: int = 0,
+        converged: Optional[bool] = None,
+    ) -> LatencyStats:
+        ci = bootstrap_ci(samples, confidence, resamples, random.Random(seed))
+        return cls(tuple(samples), warmup_discarded, ci, confidence, converged)
+
+    @property
+    def mean(self) -> float:
+        return mean(list(self.samples))
+
+    def rel_ci_half_width(self) -> float:
+        avg = self.mean
+        return 0.0 if avg == 0 else (self.ci[1] - self.ci[0]) / 2 / avg
+
+    def histogram(self, growth: float = DEFAULT_GROWTH) -> Histogram:
+        hist = Histogram(growth)
+        for value in self.samples:
+            hist.add(value)
+        return hist
+
+    def to_dict(self) -> Dict[str, Any]:
+        values = list(self.samples)
+        return {
+            "count": len(values),
+            "warmup_discarded": self.warmup_discarded,
+            "mean": self.mean,
+            "stddev": stddev(values),
+            "min": min(values),
+            "max": max(values),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "ci": {"confidence": self.confidence, "low": self.ci[0], "high": self.ci[1]},
+            "rel_ci_half_width": self.rel_ci_half_width(),
+            "converged": self.converged,
+            "histogram": self.histogram().to_dict(),
+        }
+
+
+def run_adaptive(
+    measure: Callable[[], T], value: Callable[[T], float], plan: SamplingPlan
+) -> Tuple[List[T], LatencyStats]:
+    """Measure per ``plan``; returns the kept results (warm-up dropped) and their stats.
+
+    Exceptions from ``measure`` propagate, so a failing request ends the run.
+    """
+    plan.validate()
+    for _ in range(plan.warmup):
+        measure()
+    kept: List[T] = []
+    values: List[float] = []
+    converged: Optional[bool] = None
+    while len(kept) < plan.max_iterations:
+        result = measure()
+        kept.append(result)
+        values.append(value(result))
+        if plan.target_rel_ci <= 0 or len(values) < max(plan.min_iterations, 2):
+            continue
+        stats = LatencyStats.from_samples(
+            values, plan.warmup, plan.confidence, plan.resamples, plan.seed
+        )
+        if stats.rel_ci_half_width() <= plan.target_rel_ci:
+            converged = True
+            break
+    if plan.target_rel_ci > 0 and converged is None:
+        converged = False
+    stats = LatencyStats.from_samples(
+        values, plan.warmup, plan.confidence, plan.resamples, plan.seed, converged
+    )
+    return kept, stats
+
+
+def add_plan_args(parser: argparse.ArgumentParser, iterations: int = 3) -> None:
+    """The shared sampling flags (``--iterations`` is the minimum kept sample count)."""
+    parser.add_argument("--iterations", type=int, default=iterations, help="Measured iterations")
+    parser.add_argument("--warmup", type=int, default=1, help="Discarded warm-up iterations")
+    parser.add_argument(
+        "--max-iterations",
+        type=int,
+        help="Keep iterating up to this many until --target-ci is met (default: --iterations)",
+    )
+    parser.add_argument(
+        "--target-ci",
+        type=float,
+        default=0.0,
+        help="Stop once the CI half-width is below this fraction of the mean (e.g. 0.05)",
+    )
+    parser.add_argument("--confidence", type=float, default=0.95, help="CI confidence level")
+
+
+def plan_from_args(args: argparse.Namespace) -> SamplingPlan:
+    return SamplingPlan(
+        warmup=args.warmup,
+        min_iterations=args.iterations,
+        max_iterations=max(args.max_iterations or args.iterations, args.iterations),
+        target_rel_ci=args.target_ci,
+        confidence=args.confidence,
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Summarize latency samples (one per line)")
+    parser.add_argument("--input", default="-", help="File of numbers, one per line ('-': stdin)")
+    parser.add_argument("--warmup", type=int, default=0, help="Leading samples to discard")
+    parser.add_argument("--confidence", type=float, default=0.95, help="CI confidence level")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    text = sys.stdin.read() if args.input == "-" else open(args.input, encoding="utf-8").read()
+    try:
+        values = [float(line) for line in text.split() if line.strip()]
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    kept = values[args.warmup :]
+    if not kept:
+        print("ERROR: no samples after warm-up", file=sys.stderr)
+        return 2
+    stats = LatencyStats.from_samples(kept, args.warmup, args.confidence)
+    print(json.dumps({"ok": True, **stats.to_dict()}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
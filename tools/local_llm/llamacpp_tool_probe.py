@@ -8,14 +8,13 @@ uses that model id and then invokes the standard tool-call probe.
 from __future__ import annotations
 
 import argparse
-import json
 import runpy
 import sys
-import urllib.error
 import urllib.parse
-import urllib.request
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Optional
+
+from probe_common import HttpClient, ProbeError
 
 
 def parse_args() -> argparse.Namespace:
@@ -42,20 +41,19 @@ def models_url_from_chat_url(chat_url: str) -> str:
 
 
 def fetch_first_model_id(url: str, timeout_sec: float) -> Optional[str]:
+    client = HttpClient(timeout_sec=timeout_sec)
     try:
-        with urllib.request.urlopen(url, timeout=timeout_sec) as response:
-            raw = response.read()
-    except (urllib.error.HTTPError, urllib.error.URLError, TimeoutError) as exc:
-        print(f"ERROR: failed to fetch models from {url}: {exc}", file=sys.stderr)
-        return None
-    except Exception as exc:
-        print(f"ERROR: unexpected error fetching models from {url}: {exc}", file=sys.stderr)
+        payload = client.get_json(url)
+    except ProbeError as exc:
+        if exc.kind == "json":
+            print(f"ERROR: invalid JSON from models endpoint {url}: {exc}", file=sys.stderr)
+        else:
+            print(f"ERROR: failed to fetch models from {url}: {exc}", file=sys.stderr)
         return None
+    finally:
+        client.close()
 
-    try:
-        payload = json.loads(raw.decode("utf-8"))
-    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
-        print(f"ERROR: invalid JSON from models endpoint {url}: {exc}", file=sys.stderr)
+    if not isinstance(payload, dict):
         return None
     data = payload.get("data", [])
     if not isinstance(data, list) or not data:
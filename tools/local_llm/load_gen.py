@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Concurrency-sweep load generator for OpenAI-compatible chat endpoints.
+
+Closed-loop mode (`--mode closed`) runs N simulated users per step, each
+sending its next streamed request as soon as the previous one finishes; steps
+sweep N over powers of two up to `--max-concurrency` (or an explicit
+`--concurrency 1,2,6` list). Open-loop mode (`--mode open`) sends requests
+with Poisson arrivals at each `--rates` value (requests/sec) regardless of how
+fast the server answers. Arrivals that find `--max-in-flight` requests
+outstanding are counted as `dropped` instead of queueing in the client.
+
+Each step runs for `--duration-sec`. Requests still in flight at the deadline
+are allowed to finish and counted. The step reports request throughput,
+aggregate output tokens/sec, and latency and TTFT percentiles. `knee_index` is
+the last step whose tokens/sec improved on the previous step by at least
+`--knee-gain`, which is the useful concurrency for sizing how many sessions
+one box can serve. Output uses `schema_version: load-sweep-v1`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from probe_common import HttpClient, ProbeError, percentile
+from results_store import add_store_arg, store_result
+
+SCHEMA_VERSION = "load-sweep-v1"
+
+
+@dataclass(frozen=True)
+class Sample:
+    latency_sec: Optional[float]
+    ttft_sec: Optional[float]
+    output_tokens: Optional[int]
+    error: Optional[str] = None
+
+
+SendFn = Callable[[HttpClient], Sample]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", required=True, help="Chat completions URL")
+    parser.add_argument("--model", required=True, help="Model name")
+    parser.add_argument("--runtime", default="", help="Runtime label recorded in the output")
+    parser.add_argument("--prompt", default="Write a short paragraph about GPUs.", help="Prompt")
+    parser.add_argument("--max-tokens", type=int, default=128, help="max_tokens per request")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument(
+        "--max-concurrency", type=int, default=8, help="Closed loop: sweep 1, 2, 4, ... up to N"
+    )
+    parser.add_argument("--concurrency", help="Closed loop: explicit comma-separated user counts")
+    parser.add_argument("--rates", help="Open loop: comma-separated arrival rates (requests/sec)")
+    parser.add_argument("--duration-sec", type=float, default=30.0, help="Duration of each step")
+    parser.add_argument("--timeout-sec", type=float, default=120.0, help="Request timeout")
+    parser.add_argument(
+        "--max-in-flight", type=int, default=256, help="Open loop: cap on outstanding requests"
+    )
+    parser.add_argument(
+        "--knee-gain",
+        type=float,
+        default=0.1,
+        help="Minimum relative tokens/sec gain for a step to count as scaling",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Open loop: arrival RNG seed")
+    parser.add_argument("--output", help="Optional JSON output path")
+    add_store_arg(parser)
+    return parser.parse_args()
+
+
+def concurrency_steps(max_concurrency: int) -> List[int]:
+    steps = [1]
+    while steps[-1] * 2 < max_concurrency:
+        steps.append(steps[-1] * 2)
+    if max_concurrency > 1:
+        steps.append(max_concurrency)
+    return steps
+
+
+def parse_list(text: str, cast: Callable[[str], Any]) -> List[Any]:
+    values = [cast(part) for part in text.split(",") if part.strip()]
+    if not values or any(v <= 0 for v in values):
+        raise ValueError(f"expected a comma-separated list of positive numbers, got {text!r}")
+    return values
+
+
+def make_sender(url: str, model: str, prompt: str, max_tokens: int, timeout_sec: float) -> SendFn:
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+    }
+
+    def send(client: HttpClient) -> Sample:
+        try:
+            result = client.stream_chat(url, payload, timeout_sec=timeout_sec)
+        except ProbeError as exc:
+            return Sample(None, None, None, str(exc))
+        tokens = result.completion_tokens
+        if tokens is None and result.streamed:
+            tokens = len(result.token_times)
+        return Sample(result.total_sec, result.ttft_sec, tokens)
+
+    return send
+
+
+def closed_loop(send: SendFn, users: int, duration_sec: float) -> Tuple[List[Sample], float]:
+    """Run ``users`` back-to-back request loops until the deadline; returns samples and wall."""
+    samples: List[Sample] = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + duration_sec
+
+    def user() -> None:
+        client = HttpClient()
+        try:
+            while time.perf_counter() < deadline:
+                sample = send(client)
+                with lock:
+                    samples.append(sample)
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=user, name=f"user-{n}") for n in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def poisson_arrivals(rate: float, duration_sec: float, rng: random.Random) -> List[float]:
+    """Arrival offsets (seconds) of a Poisson process with ``rate`` per second."""
+    arrivals: List[float] = []
+    at = rng.expovariate(rate)
+    while at < duration_sec:
+        arrivals.append(at)
+        at += rng.expovariate(rate)
+    return arrivals
+
+
+def open_loop(
+    send: SendFn, arrivals: List[float], max_in_flight: int
+) -> Tuple[List[Sample], float, int]:
+    """Send one request at each arrival offset; returns samples, wall time and drops."""
+    samples: List[Sample] = []
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(max_in_flight)
+    client = HttpClient(max_idle_per_host=max_in_flight)
+    threads: List[threading.Thread] = []
+    dropped = 0
+
+    def request() -> None:
+        try:
+            sample = send(client)
+            with lock:
+                samples.append(sample)
+        finally:
+            slots.release()
+
+    started = time.perf_counter()
+    for at in arrivals:
+        delay = started + at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if not slots.acquire(blocking=False):
+            dropped += 1
+            continue
+        thread = threading.Thread(target=request, name="arrival")
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    client.close()
+    return samples, wall, dropped
+
+
+def latency_summary(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    return {
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+def summarize_step(samples: List[Sample], wall_sec: float) -> Dict[str, Any]:
+    ok = [s for s in samples if s.error is None]
+    errors = sorted({s.error for s in samples if s.error is not None})
+    tokens = sum(s.output_tokens or 0 for s in ok)
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "error_samples": errors[:3],
+        "wall_sec": wall_sec,
+        "request_throughput_rps": len(ok) / wall_sec if wall_sec > 0 else None,
+        "output_tokens_per_sec": tokens / wall_sec if wall_sec > 0 else None,
+        "latency_sec": latency_summary([s.latency_sec for s in ok if s.latency_sec is not None]),
+        "ttft_sec": latency_summary([s.ttft_sec for s in ok if s.ttft_sec is not None]),
+    }
+
+
+def knee_index(steps: List[Dict[str, Any]], min_gain: float) -> Optional[int]:
+    """Index of the last step before tokens/sec stops improving by ``min_gain``."""
+    knee: Optional[int] = None
+    best = 0.0
+    for index, step in enumerate(steps):
+        tps = step.get("output_tokens_per_sec") or 0.0
+        if knee is None:
+            if tps > 0:
+                knee, best = index, tps
+            continue
+        if tps < best * (1 + min_gain):
+            break
+        knee, best = index, tps
+    return knee
+
+
+def main() -> int:
+    args = parse_args()
+    send = make_sender(args.url, args.model, args.prompt, args.max_tokens, args.timeout_sec)
+    steps: List[Dict[str, Any]] = []
+    try:
+        if args.mode == "closed":
+            users_list = (
+                parse_list(args.concurrency, int)
+                if args.concurrency
+                else concurrency_steps(args.max_concurrency)
+            )
+            for users in users_list:
+                samples, wall = closed_loop(send, users, args.duration_sec)
+                steps.append({"concurrency": users, **summarize_step(samples, wall)})
+                print(f"step concurrency={users}: {len(samples)} requests", file=sys.stderr)
+        else:
+            if not args.rates:
+                raise ValueError("--mode open requires --rates")
+            rng = random.Random(args.seed)
+            for rate in parse_list(args.rates, float):
+                arrivals = poisson_arrivals(rate, args.duration_sec, rng)
+                samples, wall, dropped = open_loop(send, arrivals, args.max_in_flight)
+                step = {"rate_rps": rate, "dropped": dropped, **summarize_step(samples, wall)}
+                steps.append(step)
+                print(f"step rate={rate}/s: {len(samples)} requests", file=sys.stderr)
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+
+    errors = sum(step["errors"] for step in steps)
+    payload = {
+        "ok": errors == 0,
+        "schema_version": SCHEMA_VERSION,
+        "url": args.url,
+        "model": args.model,
+        "runtime": args.runtime or None,
+        "timestamp": time.time(),
+        "mode": args.mode,
+        "duration_sec": args.duration_sec,
+        "max_tokens": args.max_tokens,
+        "steps": steps,
+        "knee_index": knee_index(steps, args.knee_gain),
+    }
+    text = json.dumps(payload, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    store_result(args.store, "load_gen", payload)
+    return 0 if payload["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Track live load on local runtimes and predict the latency of the next request.
+
+Three signals feed the tracker, per runtime:
+- latency: an EWMA of observed end-to-end request latencies
+- in-flight: requests the caller reported as started but not finished
+- queue: a background poll of the runtime itself; llama.cpp `GET /slots`
+  gives the parallel slot count and busy slots, and Prometheus `GET /metrics`
+  gives waiting/running requests (`vllm:num_requests_waiting`/`_running`,
+  `llamacpp:requests_deferred`/`_processing`)
+
+The prediction treats the runtime as `parallel` servers each taking the EWMA
+latency: a request arriving behind `ahead` others waits for
+`max(0, ahead - parallel + 1) / parallel` service times before its own.
+Without a latency sample there is no prediction (None), so a cold runtime is
+never reported as saturated. Queue samples older than `max_age_sec` are ignored.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from placement import RuntimeSpec, load_runtimes
+from residency import base_url, get_json
+
+DEFAULT_ALPHA = 0.3
+DEFAULT_MAX_AGE_SEC = 30.0
+
+WAITING_METRICS = ("vllm:num_requests_waiting", "llamacpp:requests_deferred")
+RUNNING_METRICS = ("vllm:num_requests_running", "llamacpp:requests_processing")
+
+
+@dataclass(frozen=True)
+class QueueSample:
+    """One poll of a runtime's own queue; None where the runtime does not say."""
+
+    waiting: Optional[int] = None
+    running: Optional[int] = None
+    slots: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class LoadSnapshot:
+    runtime: str
+    ewma_latency_sec: Optional[float]
+    latency_samples: int
+    in_flight: int
+    waiting: Optional[int]
+    running: Optional[int]
+    slots: Optional[int]
+    queue_age_sec: Optional[float]
+    predicted_latency_sec: Optional[float]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def predict_latency(
+    ewma_latency_sec: Optional[float], ahead: int, parallel: int
+) -> Optional[float]:
+    if ewma_latency_sec is None:
+        return None
+    parallel = max(1, parallel)
+    waits = max(0, ahead - parallel + 1) / parallel
+    return ewma_latency_sec * (1.0 + waits)
+
+
+def parse_prometheus(text: str, names: Tuple[str, ...]) -> Optional[float]:
+    """Sum of every sample of the first metric in ``names`` present in ``text``."""
+    totals: Dict[str, float] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        metric, _, rest = line.partition(" ")
+        metric = metric.split("{", 1)[0]
+        if metric not in names:
+            continue
+        if "}" in rest:  # label values may contain spaces
+            rest = rest.rsplit("}", 1)[1]
+        try:
+            value = float(rest.split()[0])
+        except (IndexError, ValueError):
+            continue
+        totals[metric] = totals.get(metric, 0.0) + value
+    for name in names:
+        if name in totals:
+            return totals[name]
+    return None
+
+
+def get_text(url: str, timeout_sec: float) -> Optional[str]:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout_sec) as response:
+            body: bytes = response.read()
+    except (urllib.error.URLError, TimeoutError, ValueError, OSError):
+        return None
+    return body.decode("utf-8", errors="replace")
+
+
+def fetch_queue(runtime: RuntimeSpec, timeout_sec: float = 2.0) -> Optional[QueueSample]:
+    """Queue state reported by the runtime, or None if it exposes neither endpoint."""
+    base = base_url(runtime.url)
+    slots: Optional[int] = None
+    busy: Optional[int] = None
+    data = get_json(f"{base}/slots", timeout_sec)
+    if isinstance(data, list):
+        slots = len(data)
+        busy = sum(
+            1
+            for slot in data
+            if isinstance(slot, dict) and (slot.get("is_processing") or slot.get("state") == 1)
+        )
+    waiting: Optional[float] = None
+    running: Optional[float] = None
+    text = get_text(f"{base}/metrics", timeout_sec)
+    if text is not None:
+        waiting = parse_prometheus(text, WAITING_METRICS)
+        running = parse_prometheus(text, RUNNING_METRICS)
+    if slots is None and waiting is None and running is None:
+        return None
+    if running is None:
+        running = busy
+    return QueueSample(
+        waiting=None if waiting is None else int(waiting),
+        running=None if running is None else int(running),
+        slots=slots,
+    )
+
+
+class LoadTracker:
+    """Thread-safe per-runtime latency EWMA, in-flight count and latest queue sample."""
+
+    def __init__(
+        self, alpha: float = DEFAULT_ALPHA, max_age_sec: float = DEFAULT_MAX_AGE_SEC
+    ) -> None:
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.max_age_sec = max_age_sec
+        self._latency: Dict[str, float] = {}
+        self._samples: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._queue: Dict[str, QueueSample] = {}
+        self._queue_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe_latency(self, runtime: str, latency_sec: float) -> None:
+        with self._lock:
+            previous = self._latency.get(runtime)
+            self._latency[runtime] = (
+                latency_sec
+                if previous is None
+                else self.alpha * latency_sec + (1.0 - self.alpha) * previous
+            )
+            self._samples[runtime] = self._samples.get(runtime, 0) + 1
+
+    def start(self, runtime: str) -> None:
+        with self._lock:
+            self._in_flight[runtime] = self._in_flight.get(runtime, 0) + 1
+
+    def finish(self, runtime: str, latency_sec: Optional[float] = None) -> None:
+        with self._lock:
+            self._in_flight[runtime] = max(0, self._in_flight.get(runtime, 0) - 1)
+        if latency_sec is not None:
+            self.observe_latency(runtime, latency_sec)
+
+    def update_queue(self, runtime: str, sample: QueueSample, now: Optional[float] = None) -> None:
+        with self._lock:
+            self._queue[runtime] = sample
+            self._queue_at[runtime] = time.monotonic() if now is None else now
+
+    def runtimes(self) -> List[str]:
+        with self._lock:
+            return sorted(set(self._latency) | set(self._in_flight) | set(self._queue))
+
+    def snapshot(self, runtime: str, now: Optional[float] = None) -> LoadSnapshot:
+        current = time.monotonic() if now is None else now
+        with self._lock:
+            ewma = self._latency.get(runtime)
+            samples = self._samples.get(runtime, 0)
+            in_flight = self._in_flight.get(runtime, 0)
+            queue = self._queue.get(runtime)
+            queued_at = self._queue_at.get(runtime)
+        age = None if queued_at is None else current - queued_at
+        if age is not None and age > self.max_age_sec:
+            queue = None
+        queue = queue or QueueSample()
+        reported = (queue.waiting or 0) + (queue.running or 0)
+        parallel = queue.slots or queue.running or 1
+        return LoadSnapshot(
+            runtime=runtime,
+            ewma_latency_sec=None if ewma is None else round(ewma, 4),
+            latency_samples=samples,
+            in_flight=in_flight,
+            waiting=queue.waiting,
+            running=queue.running,
+            slots=queue.slots,
+            queue_age_sec=None if age is None else round(age, 3),
+            predicted_latency_sec=predict_latency(ewma, max(in_flight, reported), parallel),
+        )
+
+    def predicted_latency(self, runtime: str) -> Optional[float]:
+        return self.snapshot(runtime).predicted_latency_sec
+
+    def poll(self, runtimes: List[RuntimeSpec], timeout_sec: float = 2.0) -> None:
+        for runtime in runtimes:
+            sample = fetch_queue(runtime, timeout_sec)
+            if sample is not None:
+                self.update_queue(runtime.name, sample)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", required=True, help="Runtime matrix JSON")
+    parser.add_argument("--timeout-sec", type=float, default=2.0)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    runtimes = load_runtimes(Path(args.config))
+    payload: Dict[str, Any] = {}
+    for runtime in runtimes:
+        sample = fetch_queue(runtime, args.timeout_sec)
+        if sample is None:
+            print(f"WARN: runtime {runtime.name} exposes no /slots or /metrics", file=sys.stderr)
+            continue
+        payload[runtime.name] = asdict(sample)
+    print(json.dumps(payload, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,7 +5,13 @@ Implements:
 - POST /v1/chat/completions
 - GET  /v1/models
 
-Behavior is controlled by the requested "model" string.
+Behavior is controlled by the requested "model" string. Requests with
+`"stream": true` (non-error models) get an SSE response: up to STREAM_TOKENS
+content deltas (fewer if `max_tokens` is smaller) STREAM_DELAY_SEC apart, a
+usage chunk when `stream_options.include_usage` is set (prompt tokens = words
+in the messages and tool definitions), then `data: [DONE]`. A streamed request
+that carries `tools` gets the default `add(a=2, b=3)` tool call instead
+(except for `missing_tool_calls`), with its arguments split across deltas.
 """
 
 from __future__ import annotations
@@ -13,9 +19,12 @@ from __future__ import annotations
 import argparse
 import json
 import time
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Any, Dict, Optional, Tuple
 
+STREAM_TOKENS = 8
+STREAM_DELAY_SEC = 0.005
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
@@ -45,8 +54,59 @@ def send_json(handler: BaseHTTPRequestHandler, status: int, payload: Dict[str, A
     handler.wfile.write(body)
 
 
+def send_stream(handler: BaseHTTPRequestHandler, data: Dict[str, Any]) -> None:
+    def write_chunk(payload: Any) -> None:
+        text = payload if isinstance(payload, str) else json.dumps(payload)
+        event = f"data: {text}\n\n".encode()
+        handler.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+        handler.wfile.flush()
+
+    handler.send_response(200)
+    handler.send_header("Content-Type", "text/event-stream")
+    handler.send_header("Transfer-Encoding", "chunked")
+    handler.end_headers()
+    write_chunk({"choices": [{"index": 0, "delta": {"role": "assistant"}}]})
+    max_tokens = data.get("max_tokens")
+    tokens = min(max_tokens, STREAM_TOKENS) if isinstance(max_tokens, int) else STREAM_TOKENS
+    if data.get("tools") and data.get("model") != "missing_tool_calls":
+        pieces = [
+            {
+                "index": 0,
+                "id": "call_0",
+                "type": "function",
+                "function": {"name": "add", "arguments": ""},
+            },
+            {"index": 0, "function": {"arguments": '{"a": 2, '}},
+            {"index": 0, "function": {"arguments": '"b": 3}'}},
+        ]
+        for piece in pieces:
+            time.sleep(STREAM_DELAY_SEC)
+            write_chunk({"choices": [{"index": 0, "delta": {"tool_calls": [piece]}}]})
+        tokens, finish = len(pieces), "tool_calls"
+    else:
+        for n in range(tokens):
+            time.sleep(STREAM_DELAY_SEC)
+            write_chunk({"choices": [{"index": 0, "delta": {"content": f"tok{n} "}}]})
+        finish = "stop"
+    write_chunk({"choices": [{"index": 0, "delta": {}, "finish_reason": finish}]})
+    options = data.get("stream_options")
+    if isinstance(options, dict) and options.get("include_usage"):
+        messages = data.get("messages")
+        if not isinstance(messages, list):
+            messages = []
+        words = sum(len(str(m.get("content", "")).split()) for m in messages if isinstance(m, dict))
+        if data.get("tools"):
+            words += len(json.dumps(data["tools"]).split())
+        usage = {"prompt_tokens": words, "completion_tokens": tokens}
+        write_chunk({"choices": [], "usage": usage})
+    write_chunk("[DONE]")
+    handler.wfile.write(b"0\r\n\r\n")
+
+
 class Handler(BaseHTTPRequestHandler):
     server_version = "mock-openai/0.1"
+    protocol_version = "HTTP/1.1"  # keep-alive, like real runtimes
+    disable_nagle_algorithm = True  # headers and body are separate writes
 
     def log_message(self, format: str, *args: object) -> None:  # noqa: A003
         # Silence default logging (tests assert on clean output).
@@ -55,6 +115,7 @@ class Handler(BaseHTTPRequestHandler):
     def do_GET(self) -> None:  # noqa: N802
         if self.path != "/v1/models":
             self.send_response(404)
+            self.send_header("Content-Length", "0")
             self.end_headers()
             return
         send_json(
@@ -72,6 +133,7 @@ class Handler(BaseHTTPRequestHandler):
     def do_POST(self) -> None:  # noqa: N802
         if self.path != "/v1/chat/completions":
             self.send_response(404)
+            self.send_header("Content-Length", "0")
             self.end_headers()
             return
 
@@ -90,6 +152,10 @@ class Handler(BaseHTTPRequestHandler):
             send_json(self, 500, {"error": {"message": "simulated server error"}})
             return
 
+        if (data or {}).get("stream") is True:
+            send_stream(self, data or {})
+            return
+
         if model == "missing_tool_calls":
             send_json(
                 self,
@@ -139,7 +205,7 @@ class Handler(BaseHTTPRequestHandler):
 
 def main() -> int:
     args = parse_args()
-    server = HTTPServer((args.host, args.port), Handler)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
     print(f"listening on http://{args.host}:{args.port}", flush=True)
     try:
         server.serve_forever()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Choose a local runtime, model and GPU for a task from per-GPU free VRAM.
+
+Inputs:
+- runtimes from `runtime_matrix.json` (enabled runtimes, in preference order;
+  optional per-runtime `gpus: [index, ...]` and `model_vram_mib: {model: MiB}`)
+- model footprints from `model_catalog.json`: `model_metadata[model].vram_mib`
+  if present, otherwise the smallest VRAM tier whose `ollama_candidates` list
+  the model (a conservative upper bound)
+- GPUs as reported by `vram_probe.py` (`gpus[]`)
+
+Models with no known footprint are never placed unless already resident.
+
+Affinity: given the models resident per runtime (see `residency.py`), each
+candidate costs its preference rank plus `swap_cost_weight` if it would have
+to be loaded, so a resident model can win over a marginally better one.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+DEFAULT_CATALOG_PATH = Path(__file__).resolve().parent / "model_catalog.json"
+
+Residency = Dict[str, Set[str]]
+
+
+@dataclass(frozen=True)
+class RuntimeSpec:
+    name: str
+    url: str
+    models: List[str]
+    gpus: Optional[List[int]] = None
+    model_vram_mib: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class PlacementConfig:
+    runtimes: List[RuntimeSpec]
+    footprints: Dict[str, int]
+
+    def footprint_mib(self, runtime: RuntimeSpec, model: str) -> Optional[int]:
+        if model in runtime.model_vram_mib:
+            return runtime.model_vram_mib[model]
+        return self.footprints.get(model)
+
+
+@dataclass(frozen=True)
+class Placement:
+    runtime: str
+    model: str
+    gpu_index: int
+    free_mib: int
+    footprint_mib: Optional[int]
+    resident: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def load_runtimes(path: Path) -> List[RuntimeSpec]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    runtimes: List[RuntimeSpec] = []
+    for item in data.get("runtimes", []):
+        if not isinstance(item, dict) or item.get("enabled") is False:
+            continue
+        gpus = item.get("gpus")
+        runtimes.append(
+            RuntimeSpec(
+                name=str(item.get("name", "unknown")),
+                url=str(item.get("url", "")),
+                models=[str(m) for m in item.get("models", [])],
+                gpus=[int(g) for g in gpus] if isinstance(gpus, list) else None,
+                model_vram_mib={
+                    str(k): int(v) for k, v in (item.get("model_vram_mib") or {}).items()
+                },
+            )
+        )
+    return runtimes
+
+
+def tier_mib(tier: Dict[str, Any]) -> Optional[int]:
+    value = tier.get("vram_max_gib")
+    if not isinstance(value, (int, float)):
+        return None
+    return int(value * 1024)
+
+
+def load_footprints(path: Path = DEFAULT_CATALOG_PATH) -> Dict[str, int]:
+    catalog = json.loads(path.read_text(encoding="utf-8"))
+    footprints: Dict[str, int] = {}
+    tiers = {t.get("tier"): tier_mib(t) for t in catalog.get("tiers", [])}
+    for tier_name, models in catalog.get("ollama_candidates", {}).items():
+        limit = tiers.get(tier_name)
+        if limit is None:
+            continue
+        for model in models:
+            footprints[model] = min(limit, footprints.get(model, limit))
+    for model, meta in catalog.get("model_metadata", {}).items():
+        if isinstance(meta, dict) and isinstance(meta.get("vram_mib"), (int, float)):
+            footprints[model] = int(meta["vram_mib"])
+    return footprints
+
+
+def load_config(runtime_matrix: Path, catalog: Path = DEFAULT_CATALOG_PATH) -> PlacementConfig:
+    return PlacementConfig(
+        runtimes=load_runtimes(runtime_matrix), footprints=load_footprints(catalog)
+    )
+
+
+def eligible_gpus(
+    gpus: List[Dict[str, Any]],
+    runtime: RuntimeSpec,
+    footprint: int,
+    min_free_mib: int,
+    min_free_ratio: float,
+) -> List[Dict[str, Any]]:
+    out = []
+    for gpu in gpus:
+        index = gpu.get("index")
+        free = gpu.get("free_mib")
+        total = gpu.get("total_mib")
+        if not isinstance(index, int) or not isinstance(free, (int, float)):
+            continue
+        if runtime.gpus is not None and index not in runtime.gpus:
+            continue
+        if free < footprint or (min_free_mib and free < min_free_mib):
+            continue
+        if min_free_ratio and (not total or free / total < min_free_ratio):
+            continue
+        out.append(gpu)
+    return out
+
+
+def choose_placement(
+    gpus: List[Dict[str, Any]],
+    config: PlacementConfig,
+    min_free_mib: int = 0,
+    min_free_ratio: float = 0.0,
+    resident: Optional[Residency] = None,
+    swap_cost_weight: float = 0.0,
+) -> Optional[Placement]:
+    """Lowest-cost runtime/model that fits; the GPU with most free VRAM wins.
+
+    Cost is the model's rank in config order plus ``swap_cost_weight`` when the
+    model is not resident on its runtime. Resident models need no free VRAM for
+    their weights (thresholds still apply). With weight 0 this is first-fit.
+    """
+    best: Optional[Placement] = None
+    best_cost = 0.0
+    rank = -1
+    for runtime in config.runtimes:
+        loaded = (resident or {}).get(runtime.name, set())
+        for model in runtime.models:
+            rank += 1
+            is_resident = model in loaded
+            cost = rank + (0.0 if is_resident else swap_cost_weight)
+            if best is not None and cost >= best_cost:
+                continue
+            footprint = config.footprint_mib(runtime, model)
+            if footprint is None and not is_resident:
+                continue
+            needed = 0 if is_resident else int(footprint or 0)
+            candidates = eligible_gpus(gpus, runtime, needed, min_free_mib, min_free_ratio)
+            if not candidates:
+                continue
+            gpu = max(candidates, key=lambda g: (g["free_mib"], -g["index"]))
+            best_cost = cost
+            best = Placement(
+                runtime=runtime.name,
+                model=model,
+                gpu_index=int(gpu["index"]),
+                free_mib=int(gpu["free_mib"]),
+                footprint_mib=footprint,
+                resident=is_resident,
+            )
+    return best
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""Propose policy thresholds from benchmark results and a latency SLO.
+
+Inputs (any mix, JSON or JSONL):
+- latency points: `{"prompt_tokens": N, "latency_sec": s, "samples"?: [s, ...],
+  "vram_used_mib"?: MiB, "model"?: name}` (one object per line, or `points[]`)
+- `runtime_probe.py` output (`runtime-probe-v1`): each result's highest
+  latency percentile (`latency.stats.p99`/`p90`, else `avg_latency_sec`)
+  becomes a point at `--probe-prompt-tokens`
+- `vram_bench.py` output (`vram-bench-v1`): latency points as above, plus the
+  VRAM drop per model as a fallback VRAM requirement
+- `context_sweep.py` output (`context-sweep-v1`): one point per grid cell at
+  `--sweep-output-tokens` (default: the file's largest output length), with
+  the cell's total latency and peak VRAM
+
+Fits p95 latency vs prompt tokens (quadratic with 4+ distinct lengths, else
+linear) and VRAM vs prompt tokens (linear KV-cache growth), then proposes:
+- `long_context_threshold_tokens`: the largest prompt whose fitted p95 stays
+  under `--slo-p95-sec` (capped at `--max-extrapolation` x the longest measured).
+  When even an empty prompt misses the SLO no candidate is written (exit 1):
+  the engine reads a threshold of 0 as "disabled" and would keep all prompts local
+- `min_free_vram_mib`: VRAM growth at that threshold plus `--headroom-mib`
+
+Writes a candidate rules file with the fitted numbers and supporting data in a
+`calibration` block; review it (e.g. with `policy_replay.py`) before adopting.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent / "policy_rules.json"
+# Highest percentile first; runtime_probe nests stats under `stats`, latency_probe
+# (vram_bench) under `latency_stats`.
+PERCENTILE_KEYS = (
+    ("stats", "p99"),
+    ("latency_stats", "p99"),
+    ("stats", "p90"),
+    ("latency_stats", "p90"),
+)
+TOKEN_SCALE = 1000.0  # fit in kilotokens to keep the normal equations well conditioned
+
+
+@dataclass(frozen=True)
+class Point:
+    prompt_tokens: int
+    latency_p95_sec: float
+    vram_used_mib: Optional[float] = None
+    model: Optional[str] = None
+    source: str = ""
+    statistic: str = "p95"  # what latency_p95_sec actually holds
+
+
+@dataclass(frozen=True)
+class Fit:
+    coefficients: Tuple[float, ...]  # ascending powers of kilotokens
+    r2: Optional[float]
+    points: int
+
+    def predict(self, tokens: float) -> float:
+        x = tokens / TOKEN_SCALE
+        return sum(c * x**power for power, c in enumerate(self.coefficients))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "coefficients_per_ktok": [round(c, 6) for c in self.coefficients],
+            "degree": len(self.coefficients) - 1,
+            "r2": None if self.r2 is None else round(self.r2, 4),
+            "points": self.points,
+        }
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        raise ValueError("percentile of empty sequence")
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def solve(matrix: List[List[float]], rhs: List[float]) -> List[float]:
+    """Gaussian elimination with partial pivoting."""
+    size = len(rhs)
+    rows = [[*row, value] for row, value in zip(matrix, rhs, strict=True)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            raise ValueError("singular system (not enough distinct prompt lengths)")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, size):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, size + 1):
+                rows[r][c] -= factor * rows[col][c]
+    solution = [0.0] * size
+    for r in range(size - 1, -1, -1):
+        tail = sum(rows[r][c] * solution[c] for c in range(r + 1, size))
+        solution[r] = (rows[r][size] - tail) / rows[r][r]
+    return solution
+
+
+def fit_polynomial(xs: Sequence[float], ys: Sequence[float], degree: int) -> Fit:
+    """Least-squares fit of ys against tokens xs (degree 1 or 2)."""
+    scaled = [x / TOKEN_SCALE for x in xs]
+    terms = degree + 1
+    matrix = [[sum(x ** (i + j) for x in scaled) for j in range(terms)] for i in range(terms)]
+    rhs = [sum(y * x**i for x, y in zip(scaled, ys, strict=True)) for i in range(terms)]
+    fit = Fit(coefficients=tuple(solve(matrix, rhs)), r2=None, points=len(xs))
+    mean = sum(ys) / len(ys)
+    total = sum((y - mean) ** 2 for y in ys)
+    residual = sum((y - fit.predict(x)) ** 2 for x, y in zip(xs, ys, strict=True))
+    return Fit(fit.coefficients, None if total == 0 else 1.0 - residual / total, len(xs))
+
+
+def fit_latency(points: List[Point]) -> Fit:
+    distinct = {p.prompt_tokens for p in points}
+    if len(distinct) < 2:
+        raise ValueError("need latency points at 2+ distinct prompt lengths")
+    degree = 2 if len(distinct) >= 4 else 1
+    return fit_polynomial(
+        [p.prompt_tokens for p in points], [p.latency_p95_sec for p in points], degree
+    )
+
+
+def max_tokens_under(fit: Fit, slo_sec: float, upper: int, steps: int = 512) -> Optional[int]:
+    """Largest T in [0, upper] with predicted latency <= slo for every prompt up to T.
+
+    Scans a coarse grid for the first crossing (a quadratic fit need not be
+    monotonic), then bisects inside that step. None if even an empty prompt
+    misses the SLO.
+    """
+    if fit.predict(0) > slo_sec:
+        return None
+    low = 0
+    high = None
+    for i in range(1, steps + 1):
+        tokens = upper * i // steps
+        if fit.predict(tokens) > slo_sec:
+            high = tokens
+            break
+        low = tokens
+    if high is None:
+        return upper
+    while high - low > 1:
+        mid = (low + high) // 2
+        if fit.predict(mid) <= slo_sec:
+            low = mid
+        else:
+            high = mid
+    return low
+
+
+def point_from_record(item: Dict[str, Any], source: str) -> Optional[Point]:
+    tokens = item.get("prompt_tokens")
+    if not isinstance(tokens, (int, float)) or isinstance(tokens, bool):
+        return None
+    samples = item.get("samples")
+    if isinstance(samples, list) and samples:
+        latency = percentile([float(s) for s in samples], 95)
+    elif isinstance(item.get("latency_p95_sec"), (int, float)):
+        latency = float(item["latency_p95_sec"])
+    elif isinstance(item.get("latency_sec"), (int, float)):
+        latency = float(item["latency_sec"])
+    else:
+        return None
+    vram = item.get("vram_used_mib")
+    return Point(
+        prompt_tokens=int(tokens),
+        latency_p95_sec=latency,
+        vram_used_mib=float(vram) if isinstance(vram, (int, float)) else None,
+        model=item.get("model"),
+        source=source,
+    )
+
+
+def load_records(path: Path) -> List[Any]:
+    text = path.read_text(encoding="utf-8")
+    try:
+        return [json.loads(text)]
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def sweep_points(record: Dict[str, Any], source: str, output_tokens: Optional[int]) -> List[Point]:
+    """Points from a context-sweep-v1 grid at one output length."""
+    cells = [c for c in record.get("grid", []) if isinstance(c, dict) and "error" not in c]
+    targets = [c.get("output_tokens_target") for c in cells]
+    wanted = (
+        output_tokens
+        if output_tokens is not None
+        else max((t for t in targets if isinstance(t, int)), default=None)
+    )
+    points: List[Point] = []
+    for cell in cells:
+        tokens = cell.get("prompt_tokens") or cell.get("prompt_tokens_target")
+        latency = cell.get("total_sec")
+        if cell.get("output_tokens_target") != wanted or not isinstance(latency, (int, float)):
+            continue
+        if not isinstance(tokens, (int, float)):
+            continue
+        vram = cell.get("peak_vram_used_mib")
+        points.append(
+            Point(
+                prompt_tokens=int(tokens),
+                latency_p95_sec=float(latency),
+                vram_used_mib=float(vram) if isinstance(vram, (int, float)) else None,
+                model=record.get("model"),
+                source=source,
+            )
+        )
+    return points
+
+
+def probe_latency(latency: Dict[str, Any]) -> Optional[Tuple[float, str]]:
+    """(seconds, statistic) from a probe latency block, highest percentile first."""
+    for block, key in PERCENTILE_KEYS:
+        value = (latency.get(block) or {}).get(key)
+        if isinstance(value, (int, float)):
+            return float(value), key
+    avg = latency.get("avg_latency_sec")
+    if isinstance(avg, (int, float)):
+        return float(avg), "mean"
+    return None
+
+
+def collect_inputs(
+    paths: List[Path], probe_prompt_tokens: int, sweep_output_tokens: Optional[int] = None
+) -> Tuple[List[Point], List[Dict[str, Any]]]:
+    """Latency points plus per-model VRAM drops (from vram-bench-v1)."""
+    points: List[Point] = []
+    drops: List[Dict[str, Any]] = []
+    for path in paths:
+        for record in load_records(path):
+            if not isinstance(record, dict):
+                continue
+            schema = record.get("schema_version")
+            if schema == "context-sweep-v1":
+                points.extend(sweep_points(record, f"{path.name}:{schema}", sweep_output_tokens))
+                continue
+            if schema in ("runtime-probe-v1", "vram-bench-v1"):
+                for result in record.get("results", []):
+                    latency = result.get("latency") or {}
+                    measured = probe_latency(latency) if latency.get("ok") else None
+                    if measured is not None:
+                        points.append(
+                            Point(
+                                prompt_tokens=probe_prompt_tokens,
+                                latency_p95_sec=measured[0],
+                                model=result.get("model"),
+                                source=f"{path.name}:{schema}",
+                                statistic=measured[1],
+                            )
+                        )
+                    drop = result.get("min_free_drop_mib")
+                    if isinstance(drop, (int, float)):
+                        drops.append({"model": result.get("model"), "drop_mib": int(drop)})
+                continue
+            listed = record.get("points")
+            items: List[Any] = listed if isinstance(listed, list) else [record]
+            for item in items:
+                point = point_from_record(item, path.name) if isinstance(item, dict) else None
+                if point is not None:
+                    points.append(point)
+    return points, drops
+
+
+def calibrate(
+    points: List[Point],
+    drops: List[Dict[str, Any]],
+    slo_p95_sec: float,
+    headroom_mib: int,
+    max_extrapolation: float,
+) -> Dict[str, Any]:
+    latency_fit = fit_latency(points)
+    longest = max(p.prompt_tokens for p in points)
+    upper = int(longest * max_extrapolation)
+    threshold = max_tokens_under(latency_fit, slo_p95_sec, upper)
+    notes: List[str] = []
+    mean_points = sum(1 for p in points if p.statistic == "mean")
+    if mean_points:
+        notes.append(
+            f"{mean_points} point(s) carry only mean latency (no percentile stats); "
+            "the fitted p95 is optimistic there"
+        )
+    if threshold is None:
+        notes.append(
+            "SLO is below the fitted latency of an empty prompt; local never meets it, "
+            "so no threshold is proposed"
+        )
+    elif threshold == upper:
+        notes.append(f"SLO holds up to the extrapolation cap ({upper} tokens); measure longer")
+    elif threshold > longest:
+        notes.append("threshold is extrapolated beyond the longest measured prompt")
+
+    vram_points = [p for p in points if p.vram_used_mib is not None]
+    vram_fit: Optional[Fit] = None
+    min_free: Optional[int] = None
+    if threshold is None:
+        notes.append("min_free_vram_mib left unchanged")
+    elif len({p.prompt_tokens for p in vram_points}) >= 2:
+        vram_fit = fit_polynomial(
+            [p.prompt_tokens for p in vram_points],
+            [float(p.vram_used_mib or 0) for p in vram_points],
+            1,
+        )
+        growth = max(0.0, vram_fit.predict(threshold) - vram_fit.predict(0))
+        min_free = math.ceil(growth) + headroom_mib
+    elif drops:
+        min_free = max(d["drop_mib"] for d in drops) + headroom_mib
+        notes.append("no VRAM-vs-prompt points; min_free_vram_mib uses the largest vram_bench drop")
+    else:
+        notes.append("no VRAM data; min_free_vram_mib left unchanged")
+
+    return {
+        "slo_p95_sec": slo_p95_sec,
+        "headroom_mib": headroom_mib,
+        "proposed": {"long_context_threshold_tokens": threshold, "min_free_vram_mib": min_free},
+        "latency_fit": latency_fit.to_dict(),
+        "predicted_p95_at_threshold_sec": (
+            round(latency_fit.predict(threshold), 3) if threshold is not None else None
+        ),
+        "vram_fit": vram_fit.to_dict() if vram_fit is not None else None,
+        "vram_bench_drops": drops,
+        "measured_prompt_tokens": sorted({p.prompt_tokens for p in points}),
+        "points": [
+            {
+                "prompt_tokens": p.prompt_tokens,
+                "latency_p95_sec": round(p.latency_p95_sec, 4),
+                "statistic": p.statistic,
+                "vram_used_mib": p.vram_used_mib,
+                "model": p.model,
+                "source": p.source,
+            }
+            for p in sorted(points, key=lambda p: p.prompt_tokens)
+        ],
+        "notes": notes,
+    }
+
+
+def candidate_rules(
+    rules: Dict[str, Any], result: Dict[str, Any], inputs: List[str]
+) -> Dict[str, Any]:
+    proposed = result["proposed"]
+    if proposed["long_context_threshold_tokens"] is None:
+        # 0 would read as "disabled" in the engine and route every prompt locally.
+        raise ValueError("no long_context_threshold_tokens proposed; local never meets the SLO")
+    candidate = dict(rules)
+    candidate["long_context_threshold_tokens"] = proposed["long_context_threshold_tokens"]
+    if proposed["min_free_vram_mib"] is not None:
+        candidate["min_free_vram_mib"] = proposed["min_free_vram_mib"]
+    candidate["calibration"] = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "inputs": inputs,
+        "previous": {
+            "long_context_threshold_tokens": rules.get("long_context_threshold_tokens"),
+            "min_free_vram_mib": rules.get("min_free_vram_mib"),
+        },
+        **result,
+    }
+    return candidate
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--inputs", nargs="+", required=True, help="Benchmark/measurement files")
+    parser.add_argument("--rules", default=str(DEFAULT_RULES_PATH), help="Base policy rules JSON")
+    parser.add_argument("--slo-p95-sec", type=float, required=True, help="Local p95 latency target")
+    parser.add_argument("--model", help="Only use points for this model")
+    parser.add_argument("--headroom-mib", type=int, default=512, help="Added to VRAM growth")
+    parser.add_argument(
+        "--probe-prompt-tokens",
+        type=int,
+        default=16,
+        help="Prompt tokens assumed for runtime_probe/vram_bench latency results",
+    )
+    parser.add_argument(
+        "--sweep-output-tokens",
+        type=int,
+        help="context_sweep cells to use (output length; default: the largest in each file)",
+    )
+    parser.add_argument(
+        "--max-extrapolation",
+        type=float,
+        default=1.5,
+        help="Cap the threshold at this multiple of the longest measured prompt",
+    )
+    parser.add_argument("--output", help="Write the candidate rules JSON here (default: stdout)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        points, drops = collect_inputs(
+            [Path(p) for p in args.inputs], args.probe_prompt_tokens, args.sweep_output_tokens
+        )
+    except (OSError, json.JSONDecodeError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    if args.model:
+        points = [p for p in points if p.model in (None, args.model)]
+        drops = [d for d in drops if d["model"] == args.model]
+    try:
+        result = calibrate(
+            points, drops, args.slo_p95_sec, args.headroom_mib, args.max_extrapolation
+        )
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 1
+    if result["proposed"]["long_context_threshold_tokens"] is None:
+        print(json.dumps({"ok": False, **result["proposed"], "notes": result["notes"]}, indent=2))
+        print("ERROR: SLO unreachable locally; no candidate written", file=sys.stderr)
+        return 1
+    rules = json.loads(Path(args.rules).read_text(encoding="utf-8"))
+    candidate = candidate_rules(rules, result, args.inputs)
+    output = json.dumps(candidate, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+        print(
+            json.dumps(
+                {"ok": True, "output": args.output, **result["proposed"], "notes": result["notes"]},
+                indent=2,
+            )
+        )
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
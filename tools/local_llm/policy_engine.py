@@ -5,9 +5,33 @@ from __future__ import annotations
 
 import argparse
 import fnmatch
+import functools
 import json
+import math
+import os
+import re
+import sys
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import IO, Any, Callable, Dict, List, Optional, Pattern, Tuple, Union
+
+import placement
+import residency
+import secret_scan
+import spend_governor
+import task_classifier
+import token_estimator
+from file_cache import StatCache
+
+TokenCounter = Callable[[List[str]], int]
+ContentScanner = Callable[[List[str]], Optional[Dict[str, Any]]]
+# Live-load stage override: (saturation decision, placement config left to use).
+LoadStage = Callable[[], Tuple[Optional[Dict[str, Any]], Optional[placement.PlacementConfig]]]
+
+TIER_DECISIONS: Dict[str, Dict[str, str]] = {
+    "L3": {"route": "claude_only", "reason": "task_tier_l3"},
+    "L2": {"route": "claude_first", "reason": "task_tier_l2"},
+}
 
 
 def load_rules(path: Path) -> Dict[str, Any]:
@@ -25,29 +49,159 @@ def match_any(path: str, patterns: List[str]) -> bool:
     return any(fnmatch.fnmatch(normalized, normalize_path(pattern)) for pattern in patterns)
 
 
-def evaluate(
-    paths: List[str],
-    token_count: int,
-    rules: Dict[str, Any],
-    vram_free_mib: Optional[int] = None,
-    vram_free_ratio: Optional[float] = None,
-) -> Dict[str, str]:
-    denylist = rules.get("denylist_paths", [])
-    sensitive = rules.get("sensitive_paths", [])
-    threshold = int(rules.get("long_context_threshold_tokens", 0))
-    min_free_mib = int(rules.get("min_free_vram_mib", 0) or 0)
-    min_free_ratio = float(rules.get("min_free_vram_ratio", 0) or 0)
+@dataclass(frozen=True)
+class PathMatcher:
+    """A glob list compiled into one anchored alternation regex.
+
+    Semantics are identical to ``match_any``: both sides are normalized with
+    ``normalize_path`` and ``os.path.normcase`` (as ``fnmatch.fnmatch`` does),
+    and each pattern is translated with ``fnmatch.translate``.
+    """
+
+    regex: Optional[Pattern[str]]
+
+    def matches(self, path: str) -> bool:
+        return self.matches_key(path_key(path))
+
+    def matches_key(self, key: str) -> bool:
+        """Match a path already passed through ``path_key`` (normalize once, match many)."""
+        if self.regex is None:
+            return False
+        return self.regex.match(key) is not None
+
 
-    for path in paths:
-        if match_any(path, denylist):
-            return {"route": "claude_only", "reason": "denylist_path"}
+def path_key(path: str) -> str:
+    return os.path.normcase(normalize_path(path))
 
-    for path in paths:
-        if match_any(path, sensitive):
-            return {"route": "claude_first", "reason": "sensitive_path"}
 
+@functools.lru_cache(maxsize=64)
+def compile_patterns(patterns: Tuple[str, ...]) -> PathMatcher:
+    if not patterns:
+        return PathMatcher(regex=None)
+    translated = [fnmatch.translate(path_key(p)) for p in patterns]
+    return PathMatcher(regex=re.compile("|".join(translated)))
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    denylist: PathMatcher
+    sensitive: PathMatcher
+    long_context_threshold_tokens: int
+    min_free_vram_mib: int
+    min_free_vram_ratio: float
+    swap_cost_weight: float
+    local_latency_slo_sec: float
+    budget: Optional[spend_governor.BudgetConfig]
+    source: Dict[str, Any]
+
+
+def compile_rules(rules: Dict[str, Any]) -> CompiledRules:
+    """Compile a rules dict once so per-path cost is a single regex match."""
+    return CompiledRules(
+        denylist=compile_patterns(tuple(rules.get("denylist_paths", []))),
+        sensitive=compile_patterns(tuple(rules.get("sensitive_paths", []))),
+        long_context_threshold_tokens=int(rules.get("long_context_threshold_tokens", 0)),
+        min_free_vram_mib=int(rules.get("min_free_vram_mib", 0) or 0),
+        min_free_vram_ratio=float(rules.get("min_free_vram_ratio", 0) or 0),
+        swap_cost_weight=float(rules.get("swap_cost_weight", 0) or 0),
+        local_latency_slo_sec=float(rules.get("local_latency_slo_sec", 0) or 0),
+        budget=spend_governor.parse_budget(rules.get("budget")),
+        source=rules,
+    )
+
+
+def static_decision(
+    paths: List[str], token_count: int, compiled: CompiledRules
+) -> Optional[Dict[str, str]]:
+    """Checks that depend only on paths and token count (cacheable per rules set)."""
+    denied = compiled.denylist.matches
+    if any(denied(path) for path in paths):
+        return {"route": "claude_only", "reason": "denylist_path"}
+
+    sensitive = compiled.sensitive.matches
+    if any(sensitive(path) for path in paths):
+        return {"route": "claude_first", "reason": "sensitive_path"}
+
+    threshold = compiled.long_context_threshold_tokens
     if threshold and token_count > threshold:
         return {"route": "claude_first", "reason": "long_context"}
+    return None
+
+
+def tier_decision(
+    static: Optional[Dict[str, str]], tier: Optional[str]
+) -> Optional[Dict[str, str]]:
+    """Merge a task tier into the static stage: L3 outranks everything but the denylist."""
+    if static is not None and static["route"] == "claude_only":
+        return static
+    if tier == "L3":
+        return TIER_DECISIONS["L3"]
+    if static is not None:
+        return static
+    return TIER_DECISIONS.get(tier or "")
+
+
+def content_decision(paths: List[str], scan: ContentScanner) -> Optional[Dict[str, Any]]:
+    finding = scan(paths)
+    if finding is None:
+        return None
+    return {"route": "claude_only", "reason": "secret_content", "secret": finding}
+
+
+def load_decision(
+    compiled: CompiledRules, predicted_latency_sec: Optional[float]
+) -> Optional[Dict[str, Any]]:
+    """Live-load stage: a runtime predicted to miss the latency SLO is saturated.
+
+    No prediction (no latency samples yet) never blocks local routing.
+    """
+    slo = compiled.local_latency_slo_sec
+    if not slo or predicted_latency_sec is None or predicted_latency_sec <= slo:
+        return None
+    return {
+        "route": "claude_first",
+        "reason": "local_saturated",
+        "predicted_latency_sec": round(predicted_latency_sec, 3),
+    }
+
+
+def budget_relaxation(
+    compiled: CompiledRules,
+    decision: Optional[Dict[str, Any]],
+    budget_pressure: Optional[float],
+) -> Optional[str]:
+    """Reason of a claude_first decision that budget pressure lets through, else None."""
+    if compiled.budget is None or decision is None:
+        return None
+    if not compiled.budget.relaxes(decision, budget_pressure):
+        return None
+    return str(decision["reason"])
+
+
+def apply_relaxation(
+    decision: Dict[str, Any], relaxed: Optional[str], budget_pressure: Optional[float]
+) -> Dict[str, Any]:
+    """Relabel a local decision reached only because budget pressure relaxed ``relaxed``.
+
+    Capacity stages still run first, so a relaxed task that cannot fit locally
+    keeps their claude_first decision.
+    """
+    if relaxed is None or decision["route"] != "local":
+        return decision
+    output = dict(decision)
+    output["reason"] = "budget_pressure"
+    output["relaxed_reason"] = relaxed
+    output["budget_pressure"] = round(budget_pressure or 0.0, 4)
+    return output
+
+
+def vram_decision(
+    compiled: CompiledRules,
+    vram_free_mib: Optional[int] = None,
+    vram_free_ratio: Optional[float] = None,
+) -> Optional[Dict[str, str]]:
+    min_free_mib = compiled.min_free_vram_mib
+    min_free_ratio = compiled.min_free_vram_ratio
 
     if (min_free_mib or min_free_ratio) and (vram_free_mib is None and vram_free_ratio is None):
         return {"route": "claude_first", "reason": "missing_vram_signal"}
@@ -57,23 +211,209 @@ def evaluate(
 
     if min_free_ratio and vram_free_ratio is not None and vram_free_ratio < min_free_ratio:
         return {"route": "claude_first", "reason": "low_vram"}
+    return None
+
 
-    return {"route": "local", "reason": "default_safe"}
+def placement_decision(
+    compiled: CompiledRules,
+    gpus: Optional[List[Dict[str, Any]]],
+    config: placement.PlacementConfig,
+    resident: Optional[placement.Residency] = None,
+) -> Dict[str, Any]:
+    """Per-GPU VRAM stage: pick a runtime/model/GPU instead of using the min-free signal."""
+    if not gpus:
+        return {"route": "claude_first", "reason": "missing_vram_signal"}
+    chosen = placement.choose_placement(
+        gpus,
+        config,
+        compiled.min_free_vram_mib,
+        compiled.min_free_vram_ratio,
+        resident=resident,
+        swap_cost_weight=compiled.swap_cost_weight,
+    )
+    if chosen is None:
+        return {"route": "claude_first", "reason": "no_local_capacity"}
+    return {"route": "local", "reason": "default_safe", "placement": chosen.to_dict()}
+
+
+def evaluate(
+    paths: List[str],
+    token_count: int,
+    rules: Union[Dict[str, Any], CompiledRules],
+    vram_free_mib: Optional[int] = None,
+    vram_free_ratio: Optional[float] = None,
+    gpus: Optional[List[Dict[str, Any]]] = None,
+    placement_config: Optional[placement.PlacementConfig] = None,
+    resident: Optional[placement.Residency] = None,
+    tier: Optional[str] = None,
+    content_scan: Optional[ContentScanner] = None,
+    predicted_latency_sec: Optional[float] = None,
+    budget_pressure: Optional[float] = None,
+) -> Dict[str, Any]:
+    compiled = rules if isinstance(rules, CompiledRules) else compile_rules(rules)
+    return evaluate_stages(
+        static_decision(paths, token_count, compiled),
+        paths,
+        compiled,
+        vram_free_mib=vram_free_mib,
+        vram_free_ratio=vram_free_ratio,
+        gpus=gpus,
+        placement_config=placement_config,
+        resident=resident,
+        tier=tier,
+        content_scan=content_scan,
+        predicted_latency_sec=predicted_latency_sec,
+        budget_pressure=budget_pressure,
+    )
+
+
+def evaluate_stages(
+    static: Optional[Dict[str, Any]],
+    paths: List[str],
+    compiled: CompiledRules,
+    *,
+    vram_free_mib: Optional[int] = None,
+    vram_free_ratio: Optional[float] = None,
+    gpus: Optional[List[Dict[str, Any]]] = None,
+    placement_config: Optional[placement.PlacementConfig] = None,
+    resident: Optional[placement.Residency] = None,
+    tier: Optional[str] = None,
+    content_scan: Optional[ContentScanner] = None,
+    predicted_latency_sec: Optional[float] = None,
+    budget_pressure: Optional[float] = None,
+    load_stage: Optional[LoadStage] = None,
+) -> Dict[str, Any]:
+    """Run every stage after ``static_decision``, whose result may come from a cache.
+
+    Order: tier, content, budget relaxation, load, placement, VRAM, default.
+    ``load_stage`` replaces the ``predicted_latency_sec`` check and may narrow
+    the placement config (the service drops saturated runtimes).
+    """
+    decision = static
+    if tier is not None:
+        decision = tier_decision(decision, tier)
+    if content_scan is not None and (decision is None or decision["route"] != "claude_only"):
+        decision = content_decision(paths, content_scan) or decision
+    relaxed = budget_relaxation(compiled, decision, budget_pressure)
+    if relaxed is not None:
+        decision = None
+    if decision is None:
+        if load_stage is not None:
+            decision, placement_config = load_stage()
+        else:
+            decision = load_decision(compiled, predicted_latency_sec)
+    if decision is None and placement_config is not None:
+        decision = placement_decision(compiled, gpus, placement_config, resident)
+    if decision is None:
+        decision = vram_decision(compiled, vram_free_mib, vram_free_ratio)
+    if decision is None:
+        decision = {"route": "local", "reason": "default_safe"}
+    return apply_relaxation(decision, relaxed, budget_pressure)
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
     parser.add_argument("--rules", required=True, help="Path to policy rules JSON")
-    parser.add_argument("--paths", nargs="+", required=True, help="File paths")
+    parser.add_argument("--paths", nargs="+", help="File paths (required unless --batch)")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Read JSONL task records from stdin and write one decision per line",
+    )
     parser.add_argument("--tokens", type=int, default=0, help="Total tokens")
-    parser.add_argument("--vram-sample", help="Optional JSON file from tools/local_llm/vram_probe.py")
+    parser.add_argument(
+        "--estimate-tokens",
+        action="store_true",
+        help="Add a file-content token estimate for --paths to --tokens (see token_estimator.py)",
+    )
+    parser.add_argument(
+        "--token-model", default=str(token_estimator.DEFAULT_MODEL_PATH), help="Token model JSON"
+    )
+    parser.add_argument(
+        "--token-cache",
+        default=str(token_estimator.default_cache_path()),
+        help="Per-file token estimate cache ('' disables)",
+    )
+    parser.add_argument(
+        "--vram-sample", help="Optional JSON file from tools/local_llm/vram_probe.py"
+    )
     parser.add_argument("--vram-free-mib", type=int, help="Override: free VRAM (MiB)")
     parser.add_argument("--vram-free-ratio", type=float, help="Override: free VRAM ratio (0-1)")
-    return parser.parse_args()
+    parser.add_argument(
+        "--runtime-matrix",
+        help="Runtime matrix JSON; enables per-GPU placement (requires gpus[] in --vram-sample)",
+    )
+    parser.add_argument(
+        "--model-catalog",
+        default=str(placement.DEFAULT_CATALOG_PATH),
+        help="Model catalog JSON used for model VRAM footprints",
+    )
+    parser.add_argument(
+        "--resident-models",
+        help="JSON {runtime: [models]} of loaded models for affinity (see residency.py)",
+    )
+    parser.add_argument(
+        "--probe-residency",
+        action="store_true",
+        help="Query each runtime (/api/ps or /v1/models) for loaded models before deciding",
+    )
+    parser.add_argument(
+        "--classify",
+        action="store_true",
+        help="Assign an L0-L3 task tier from prompt/paths/tools (see task_classifier.py)",
+    )
+    parser.add_argument(
+        "--classifier-weights",
+        default=str(task_classifier.DEFAULT_WEIGHTS_PATH),
+        help="Task classifier features and weights JSON",
+    )
+    parser.add_argument(
+        "--scan-content",
+        action="store_true",
+        help="Scan file contents for secrets; a hit routes claude_only (see secret_scan.py)",
+    )
+    parser.add_argument(
+        "--secret-cache",
+        default=str(secret_scan.default_cache_path()),
+        help="Per-file secret scan cache ('' disables)",
+    )
+    parser.add_argument(
+        "--predicted-latency-sec",
+        type=float,
+        help="Predicted local latency (see load_signals.py); over local_latency_slo_sec "
+        "routes claude_first",
+    )
+    parser.add_argument(
+        "--usage-log",
+        help="JSONL usage records; with a rules budget block, spend over budget relaxes "
+        "claude_first (see spend_governor.py)",
+    )
+    parser.add_argument(
+        "--pricing",
+        default=str(spend_governor.DEFAULT_PRICING_PATH),
+        help="JSON with claude_pricing and local_cost_per_mtok for --usage-log",
+    )
+    parser.add_argument("--budget-pressure", type=float, help="Override: spend / budget")
+    parser.add_argument("--prompt", default="", help="Task prompt text (with --classify)")
+    parser.add_argument("--tools", nargs="*", help="Tool names available to the task")
+    args = parser.parse_args()
+    if args.batch and args.paths:
+        parser.error("--paths cannot be combined with --batch (records carry their own paths)")
+    if not args.batch and not args.paths:
+        parser.error("--paths is required unless --batch is set")
+    return args
 
 
-def load_vram_signal(path: Path) -> Tuple[Optional[int], Optional[float]]:
+def load_vram_sample(path: Path) -> Dict[str, Any]:
     data = json.loads(path.read_text(encoding="utf-8"))
+    return data if isinstance(data, dict) else {}
+
+
+def load_vram_signal(path: Path) -> Tuple[Optional[int], Optional[float]]:
+    return vram_signal(load_vram_sample(path))
+
+
+def vram_signal(data: Dict[str, Any]) -> Tuple[Optional[int], Optional[float]]:
     free_mib = data.get("min_free_mib")
     free_ratio = data.get("min_free_ratio")
     free_mib_int = int(free_mib) if isinstance(free_mib, (int, float)) else None
@@ -81,27 +421,249 @@ def load_vram_signal(path: Path) -> Tuple[Optional[int], Optional[float]]:
     return free_mib_int, free_ratio_float
 
 
+def optional_number(record: Dict[str, Any], key: str) -> Optional[float]:
+    value = record.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key} must be a number")
+    if not math.isfinite(value):
+        raise ValueError(f"{key} must be a finite number")
+    return value
+
+
+@dataclass(frozen=True)
+class TaskRecord:
+    paths: List[str]
+    tokens: int
+    vram_free_mib: Optional[int]
+    vram_free_ratio: Optional[float]
+    gpus: Optional[List[Dict[str, Any]]] = None
+    resident: Optional[placement.Residency] = None
+    prompt: str = ""
+    tools: Optional[List[str]] = None
+    predicted_latency_sec: Optional[float] = None
+    budget_pressure: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class RoutingContext:
+    """Process-wide signals and optional stages; per-record signals take precedence."""
+
+    vram_free_mib: Optional[int] = None
+    vram_free_ratio: Optional[float] = None
+    gpus: Optional[List[Dict[str, Any]]] = None
+    estimate: Optional[TokenCounter] = None
+    placement_config: Optional[placement.PlacementConfig] = None
+    resident: Optional[placement.Residency] = None
+    classifier: Optional[task_classifier.TaskClassifier] = None
+    content_scan: Optional[ContentScanner] = None
+    predicted_latency_sec: Optional[float] = None
+    budget_pressure: Optional[float] = None
+
+
+def parse_record(record: Any) -> TaskRecord:
+    """Validate a JSON task record (as used by --batch and the policy service)."""
+    if not isinstance(record, dict):
+        raise ValueError("record must be an object")
+    paths = record.get("paths", [])
+    if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+        raise ValueError("paths must be string array")
+    tokens = optional_number(record, "tokens")
+    free_mib = optional_number(record, "vram_free_mib")
+    free_ratio = optional_number(record, "vram_free_ratio")
+    predicted = optional_number(record, "predicted_latency_sec")
+    pressure = optional_number(record, "budget_pressure")
+    gpus = record.get("gpus")
+    if gpus is not None and (
+        not isinstance(gpus, list) or not all(isinstance(g, dict) for g in gpus)
+    ):
+        raise ValueError("gpus must be an array of objects")
+    resident = record.get("resident")
+    prompt = record.get("prompt", "")
+    if not isinstance(prompt, str):
+        raise ValueError("prompt must be a string")
+    tools = record.get("tools")
+    if tools is not None and (
+        not isinstance(tools, list) or not all(isinstance(t, str) for t in tools)
+    ):
+        raise ValueError("tools must be string array")
+    return TaskRecord(
+        paths=paths,
+        tokens=int(tokens or 0),
+        vram_free_mib=None if free_mib is None else int(free_mib),
+        vram_free_ratio=None if free_ratio is None else float(free_ratio),
+        gpus=gpus,
+        resident=None if resident is None else residency.parse_residency(resident),
+        prompt=prompt,
+        tools=tools,
+        predicted_latency_sec=None if predicted is None else float(predicted),
+        budget_pressure=None if pressure is None else float(pressure),
+    )
+
+
+def decide_record(
+    record: Any, rules: CompiledRules, context: Optional[RoutingContext] = None
+) -> Dict[str, Any]:
+    """Evaluate one batch record; per-record VRAM fields override the context defaults.
+
+    With ``context.estimate``, the file token estimate for the record's paths is
+    added to its ``tokens`` and reported as ``estimated_tokens``. With
+    ``context.classifier``, the record's ``prompt``, paths and ``tools`` pick a
+    task tier (reported as ``tier``) that feeds the decision.
+    """
+    ctx = context or RoutingContext()
+    task = parse_record(record)
+    estimated = ctx.estimate(task.paths) if ctx.estimate is not None else None
+    tier = None
+    if ctx.classifier is not None:
+        tier = ctx.classifier.classify(task.prompt, task.paths, task.tools).tier
+    decision = dict(
+        evaluate(
+            task.paths,
+            task.tokens + (estimated or 0),
+            rules,
+            vram_free_mib=ctx.vram_free_mib if task.vram_free_mib is None else task.vram_free_mib,
+            vram_free_ratio=(
+                ctx.vram_free_ratio if task.vram_free_ratio is None else task.vram_free_ratio
+            ),
+            gpus=ctx.gpus if task.gpus is None else task.gpus,
+            placement_config=ctx.placement_config,
+            resident=ctx.resident if task.resident is None else task.resident,
+            tier=tier,
+            content_scan=ctx.content_scan,
+            predicted_latency_sec=(
+                ctx.predicted_latency_sec
+                if task.predicted_latency_sec is None
+                else task.predicted_latency_sec
+            ),
+            budget_pressure=(
+                ctx.budget_pressure if task.budget_pressure is None else task.budget_pressure
+            ),
+        )
+    )
+    if estimated is not None:
+        decision["estimated_tokens"] = estimated
+    if tier is not None:
+        decision["tier"] = tier
+    if "id" in record:
+        decision["id"] = record["id"]
+    return decision
+
+
+def run_batch(
+    source: IO[str],
+    sink: IO[str],
+    rules: CompiledRules,
+    context: Optional[RoutingContext] = None,
+) -> int:
+    """Stream JSONL records from source to decisions on sink, flushing per line.
+
+    Invalid records produce an ``{"error": ...}`` line (with ``line`` and, when
+    available, ``id``) instead of aborting the stream. Returns the error count.
+    """
+    errors = 0
+    for line_no, raw_line in enumerate(source, start=1):
+        line = raw_line.strip()
+        if not line:
+            continue
+        record: Any = None
+        try:
+            record = json.loads(line)
+            output = decide_record(record, rules, context)
+        except (json.JSONDecodeError, ValueError, TypeError, OverflowError) as exc:
+            errors += 1
+            output = {"error": str(exc), "line": line_no}
+            if isinstance(record, dict) and "id" in record:
+                output["id"] = record["id"]
+        sink.write(json.dumps(output) + "\n")
+        sink.flush()
+    return errors
+
+
 def main() -> int:
     args = parse_args()
-    rules = load_rules(Path(args.rules))
+    rules = compile_rules(load_rules(Path(args.rules)))
     vram_free_mib = args.vram_free_mib
     vram_free_ratio = args.vram_free_ratio
+    gpus: Optional[List[Dict[str, Any]]] = None
     if args.vram_sample:
-        sample_free_mib, sample_free_ratio = load_vram_signal(Path(args.vram_sample))
+        sample = load_vram_sample(Path(args.vram_sample))
+        sample_free_mib, sample_free_ratio = vram_signal(sample)
         if vram_free_mib is None:
             vram_free_mib = sample_free_mib
         if vram_free_ratio is None:
             vram_free_ratio = sample_free_ratio
+        if isinstance(sample.get("gpus"), list):
+            gpus = sample["gpus"]
+
+    estimate: Optional[TokenCounter] = None
+    cache: Optional[StatCache] = None
+    if args.estimate_tokens:
+        model = token_estimator.load_model(Path(args.token_model))
+        cache_path = Path(args.token_cache) if args.token_cache else None
+        cache = token_estimator.open_cache(cache_path, model)
+        estimate = functools.partial(token_estimator.total_tokens, model=model, cache=cache)
+
+    scanner: Optional[secret_scan.SecretScanner] = None
+    if args.scan_content:
+        secret_cache_path = Path(args.secret_cache) if args.secret_cache else None
+        scanner = secret_scan.SecretScanner(secret_scan.open_cache(secret_cache_path))
 
-    decision = evaluate(
-        args.paths,
-        args.tokens,
-        rules,
+    budget_pressure = args.budget_pressure
+    if budget_pressure is None and args.usage_log and rules.budget is not None:
+        governor = spend_governor.load_governor(rules.budget, Path(args.pricing))
+        usage = Path(args.usage_log).read_text(encoding="utf-8").splitlines()
+        spend_governor.replay_usage(governor, usage)
+        budget_pressure = governor.pressure()
+
+    placement_config = None
+    resident: Optional[placement.Residency] = None
+    if args.runtime_matrix:
+        placement_config = placement.load_config(
+            Path(args.runtime_matrix), Path(args.model_catalog)
+        )
+        if args.probe_residency:
+            tracker = residency.ResidencyTracker()
+            tracker.poll(placement_config.runtimes)
+            resident = tracker.snapshot()
+    if args.resident_models:
+        resident = residency.load_resident_file(Path(args.resident_models))
+
+    context = RoutingContext(
         vram_free_mib=vram_free_mib,
         vram_free_ratio=vram_free_ratio,
+        gpus=gpus,
+        estimate=estimate,
+        placement_config=placement_config,
+        resident=resident,
+        classifier=(
+            task_classifier.load_classifier(Path(args.classifier_weights))
+            if args.classify
+            else None
+        ),
+        content_scan=scanner.first_finding if scanner is not None else None,
+        predicted_latency_sec=args.predicted_latency_sec,
+        budget_pressure=budget_pressure,
     )
-    print(json.dumps(decision))
-    return 0
+    try:
+        if args.batch:
+            errors = run_batch(sys.stdin, sys.stdout, rules, context)
+            return 1 if errors else 0
+
+        record = {
+            "paths": args.paths,
+            "tokens": args.tokens,
+            "prompt": args.prompt,
+            "tools": args.tools,
+        }
+        print(json.dumps(decide_record(record, rules, context)))
+        return 0
+    finally:
+        if cache is not None:
+            cache.save()
+        if scanner is not None and scanner.cache is not None:
+            scanner.cache.save()
 
 
 if __name__ == "__main__":
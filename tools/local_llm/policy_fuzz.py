@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Differential fuzzer and throughput benchmark for the policy engine.
+
+Generates realistic and adversarial task records (backslashes, repeated
+slashes, dotfiles, glob metacharacters, case changes, token counts around the
+threshold) and compares a candidate evaluator against the reference fnmatch
+implementation decision by decision.
+
+Treat any divergence as a blocking error: an optimization that changes a
+route is a policy change, not a speedup.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import policy_engine
+
+Evaluator = Callable[..., Dict[str, str]]
+
+BENIGN_DIRS = [
+    "src",
+    "lib",
+    "docs",
+    "tests",
+    "app",
+    "pkg",
+    "node_modules",
+    "home",
+    "user",
+    "C:",
+    "Users",
+    "Auth",
+    "keys",
+    "deploy",
+    "config",
+    "authz",
+    "infra-tools",
+    "sub.dir",
+    ".github",
+    ".vscode",
+    "ключ",
+    "a b",
+]
+RISKY_DIRS = [
+    "auth",
+    "security",
+    "infra",
+    "secrets",
+    "credentials",
+    ".git",
+    ".ssh",
+    ".gnupg",
+    ".aws",
+    ".kube",
+    ".config",
+    "gh",
+    "gcloud",
+    ".docker",
+]
+DIRS = BENIGN_DIRS + RISKY_DIRS
+FILES = [
+    "README.md",
+    "main.py",
+    "index.ts",
+    "config.json",
+    ".env",
+    ".env.local",
+    ".env.",
+    "env",
+    ".envrc",
+    "id_rsa",
+    "id_rsa.pub",
+    "id_ed25519",
+    "server.pem",
+    "tls.key",
+    "key",
+    ".netrc",
+    ".npmrc",
+    ".pypirc",
+    "Makefile",
+    ".gitignore",
+    "notes.PEM",
+    "[abc].key",
+    "*.pem",
+    "?",
+    "file.key.bak",
+    "",
+]
+
+
+@dataclass(frozen=True)
+class Task:
+    paths: List[str]
+    tokens: int
+    vram_free_mib: Optional[int]
+    vram_free_ratio: Optional[float]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", default="tools/local_llm/policy_rules.json")
+    parser.add_argument("--cases", type=int, default=1_000_000, help="Number of task records")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="Records per timed chunk")
+    parser.add_argument("--max-report", type=int, default=10, help="Divergences to print")
+    parser.add_argument(
+        "--candidate",
+        default="policy_engine:evaluate",
+        help="module:function evaluator to compare against the reference",
+    )
+    parser.add_argument(
+        "--prepare",
+        default="policy_engine:compile_rules",
+        help="module:function applied once to the rules dict before calling the candidate",
+    )
+    return parser.parse_args()
+
+
+def reference_evaluate(
+    paths: List[str],
+    token_count: int,
+    rules: Dict[str, Any],
+    vram_free_mib: Optional[int] = None,
+    vram_free_ratio: Optional[float] = None,
+) -> Dict[str, str]:
+    """The original per-pattern fnmatch evaluator; do not optimize."""
+    denylist = rules.get("denylist_paths", [])
+    sensitive = rules.get("sensitive_paths", [])
+    threshold = int(rules.get("long_context_threshold_tokens", 0))
+    min_free_mib = int(rules.get("min_free_vram_mib", 0) or 0)
+    min_free_ratio = float(rules.get("min_free_vram_ratio", 0) or 0)
+
+    for path in paths:
+        if policy_engine.match_any(path, denylist):
+            return {"route": "claude_only", "reason": "denylist_path"}
+
+    for path in paths:
+        if policy_engine.match_any(path, sensitive):
+            return {"route": "claude_first", "reason": "sensitive_path"}
+
+    if threshold and token_count > threshold:
+        return {"route": "claude_first", "reason": "long_context"}
+
+    if (min_free_mib or min_free_ratio) and (vram_free_mib is None and vram_free_ratio is None):
+        return {"route": "claude_first", "reason": "missing_vram_signal"}
+
+    if min_free_mib and vram_free_mib is not None and vram_free_mib < min_free_mib:
+        return {"route": "claude_first", "reason": "low_vram"}
+
+    if min_free_ratio and vram_free_ratio is not None and vram_free_ratio < min_free_ratio:
+        return {"route": "claude_first", "reason": "low_vram"}
+
+    return {"route": "local", "reason": "default_safe"}
+
+
+def load_callable(spec: str) -> Callable[..., Any]:
+    module_name, _, attr = spec.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"expected module:function, got {spec!r}")
+    candidate: Callable[..., Any] = getattr(importlib.import_module(module_name), attr)
+    if not callable(candidate):
+        raise ValueError(f"{spec} is not callable")
+    return candidate
+
+
+def pattern_literal(rng: random.Random, pattern: str) -> str:
+    """Expand a glob into a near-miss or matching literal path."""
+    out = pattern
+    while "**" in out:
+        out = out.replace("**", "/".join(rng.choices(DIRS, k=rng.randint(0, 3))), 1)
+    out = out.replace("*", rng.choice(["", "x", "a.b", "/", "."]))
+    return out.replace("?", rng.choice(["", "q", "/"]))
+
+
+def mutate(rng: random.Random, path: str) -> str:
+    roll = rng.random()
+    if roll < 0.15:
+        path = path.replace("/", rng.choice(["\\", "\\\\", "/\\"]))
+    elif roll < 0.30:
+        path = path.replace("/", rng.choice(["//", "///", "/./"]))
+    elif roll < 0.38:
+        path = rng.choice(["/", "./", "../", "~/", "C:\\\\"]) + path
+    elif roll < 0.45:
+        path = path + rng.choice(["/", "\\", " ", "~", ".bak"])
+    elif roll < 0.50:
+        path = path.upper() if rng.random() < 0.5 else path.swapcase()
+    return path
+
+
+def generate_path(rng: random.Random, patterns: List[str]) -> str:
+    if patterns and rng.random() < 0.35:
+        path = pattern_literal(rng, rng.choice(patterns))
+    else:
+        pool = DIRS if rng.random() < 0.2 else BENIGN_DIRS
+        parts = rng.choices(pool, k=rng.randint(0, 5))
+        parts.append(rng.choice(FILES))
+        path = "/".join(parts)
+    return mutate(rng, path)
+
+
+def generate_tasks(rng: random.Random, rules: Dict[str, Any], count: int) -> Iterator[Task]:
+    patterns = list(rules.get("denylist_paths", [])) + list(rules.get("sensitive_paths", []))
+    threshold = int(rules.get("long_context_threshold_tokens", 0) or 0)
+    min_mib = int(rules.get("min_free_vram_mib", 0) or 0) or 2048
+    token_choices = [0, 1, threshold - 1, threshold, threshold + 1]
+    for _ in range(count):
+        paths = [generate_path(rng, patterns) for _ in range(rng.choice([0, 1, 1, 1, 2, 3, 5]))]
+        tokens = rng.choice(token_choices) if rng.random() < 0.5 else rng.randint(0, threshold * 2)
+        free_mib = None if rng.random() < 0.3 else rng.randint(0, min_mib * 2)
+        free_ratio = None if rng.random() < 0.3 else round(rng.random(), 4)
+        yield Task(paths, tokens, free_mib, free_ratio)
+
+
+def run_evaluator(evaluate: Evaluator, rules: Any, tasks: List[Task]) -> Tuple[List[Any], float]:
+    started = time.perf_counter()
+    decisions = [
+        evaluate(
+            t.paths,
+            t.tokens,
+            rules,
+            vram_free_mib=t.vram_free_mib,
+            vram_free_ratio=t.vram_free_ratio,
+        )
+        for t in tasks
+    ]
+    return decisions, time.perf_counter() - started
+
+
+def fuzz(
+    rules: Dict[str, Any],
+    candidate: Evaluator,
+    candidate_rules: Any,
+    cases: int,
+    seed: int = 0,
+    chunk_size: int = 10_000,
+    max_report: int = 10,
+) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    tasks_iter = generate_tasks(rng, rules, cases)
+    divergences: List[Dict[str, Any]] = []
+    divergence_count = 0
+    ref_sec = 0.0
+    cand_sec = 0.0
+    done = 0
+    while done < cases:
+        chunk = list(itertools.islice(tasks_iter, chunk_size))
+        if not chunk:
+            break
+        expected, elapsed_ref = run_evaluator(reference_evaluate, rules, chunk)
+        actual, elapsed_cand = run_evaluator(candidate, candidate_rules, chunk)
+        ref_sec += elapsed_ref
+        cand_sec += elapsed_cand
+        for offset, (task, want, got) in enumerate(zip(chunk, expected, actual, strict=True)):
+            if want == got:
+                continue
+            divergence_count += 1
+            if len(divergences) < max_report:
+                divergences.append(
+                    {
+                        "case": done + offset,
+                        "paths": task.paths,
+                        "tokens": task.tokens,
+                        "vram_free_mib": task.vram_free_mib,
+                        "vram_free_ratio": task.vram_free_ratio,
+                        "expected": want,
+                        "got": got,
+                    }
+                )
+        done += len(chunk)
+
+    return {
+        "ok": divergence_count == 0,
+        "cases": done,
+        "seed": seed,
+        "divergences": divergence_count,
+        "first_divergences": divergences,
+        "reference": {
+            "elapsed_sec": round(ref_sec, 3),
+            "decisions_per_sec": round(done / ref_sec) if ref_sec else None,
+        },
+        "candidate": {
+            "elapsed_sec": round(cand_sec, 3),
+            "decisions_per_sec": round(done / cand_sec) if cand_sec else None,
+        },
+        "speedup": round(ref_sec / cand_sec, 2) if cand_sec else None,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    rules = policy_engine.load_rules(Path(args.rules))
+    candidate = load_callable(args.candidate)
+    prepare = load_callable(args.prepare) if args.prepare else None
+    candidate_rules = prepare(rules) if prepare else rules
+    report = fuzz(
+        rules,
+        candidate,
+        candidate_rules,
+        args.cases,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        max_report=args.max_report,
+    )
+    report["candidate"]["name"] = args.candidate
+    print(json.dumps(report, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -12,6 +12,7 @@ from pathlib import Path
 from typing import Any, Dict, List
 
 import policy_engine
+import policy_fuzz
 
 
 def parse_args() -> argparse.Namespace:
@@ -21,6 +22,13 @@ def parse_args() -> argparse.Namespace:
         default="tools/local_llm/policy_fixtures.json",
         help="Path to fixture JSON",
     )
+    parser.add_argument(
+        "--fuzz-cases",
+        type=int,
+        default=0,
+        help="Also compare evaluate() against the reference on N generated records",
+    )
+    parser.add_argument("--fuzz-seed", type=int, default=0)
     return parser.parse_args()
 
 
@@ -62,12 +70,33 @@ def main() -> int:
         if decision != expected:
             failures.append(f"{name}: expected {expected} got {decision}")
 
+    if args.fuzz_cases > 0:
+        report = policy_fuzz.fuzz(
+            rules,
+            policy_engine.evaluate,
+            policy_engine.compile_rules(rules),
+            args.fuzz_cases,
+            seed=args.fuzz_seed,
+        )
+        for divergence in report["first_divergences"]:
+            failures.append(f"fuzz divergence: {json.dumps(divergence)}")
+        if not report["ok"]:
+            failures.append(
+                f"fuzz: {report['divergences']} of {report['cases']} decisions diverged"
+            )
+
     if failures:
         for failure in failures:
             print(f"ERROR: {failure}")
         return 1
 
     print(f"OK: {len(cases)} policy fixtures passed")
+    if args.fuzz_cases > 0:
+        print(
+            f"OK: {report['cases']} fuzzed decisions match the reference "
+            f"({report['candidate']['decisions_per_sec']}/s vs "
+            f"{report['reference']['decisions_per_sec']}/s reference)"
+        )
     return 0
 
 
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Replay logged routing inputs through two policy rule sets (A/B).
+
+Streams a JSONL log of task records (the `policy_engine.py --batch` input
+format; extra fields are ignored) in chunks to worker processes. Each worker
+compiles both rule sets once, decides every record under A and B, and returns
+only aggregate counters, so the parent never holds the log in memory.
+
+Reports how many decisions change (by `route/reason` transition), local_share
+for A and B (by request and token-weighted), and the cost of each rule set via
+`cost_model.compute_costs` with the pricing from `scenarios.json`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Tuple
+
+import cost_model
+import policy_engine
+
+DEFAULT_PRICING_PATH = Path(__file__).resolve().parent / "scenarios.json"
+DEFAULT_OUTPUT_RATIO = 0.2
+
+Chunk = List[Tuple[int, str]]
+
+# Per-process state filled by init_worker (the Pool initializer): "rules" holds the
+# compiled (A, B) pair, "output_ratio" the assumed output tokens per input token.
+_WORKER: Dict[str, Any] = {}
+
+
+def init_worker(rules_a: Dict[str, Any], rules_b: Dict[str, Any], output_ratio: float) -> None:
+    _WORKER["rules"] = (policy_engine.compile_rules(rules_a), policy_engine.compile_rules(rules_b))
+    _WORKER["output_ratio"] = output_ratio
+
+
+def empty_stats() -> Dict[str, Any]:
+    return {
+        "records": 0,
+        "errors": 0,
+        "changed": 0,
+        "transitions": Counter(),
+        "reasons_a": Counter(),
+        "reasons_b": Counter(),
+        "local_a": 0,
+        "local_b": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "local_tokens_a": 0,
+        "local_tokens_b": 0,
+        "error_examples": [],
+        "changed_examples": [],
+    }
+
+
+def record_tokens(record: Dict[str, Any], output_ratio: float) -> Tuple[int, int]:
+    task_tokens = record.get("tokens")
+    tokens = int(task_tokens) if isinstance(task_tokens, (int, float)) else 0
+    output = record.get("output_tokens")
+    if (
+        isinstance(output, (int, float))
+        and not isinstance(output, bool)
+        and math.isfinite(output)
+        and output >= 0
+    ):
+        return tokens, int(output)
+    return tokens, round(tokens * output_ratio)
+
+
+def replay_chunk(chunk: Chunk, max_examples: int = 5) -> Dict[str, Any]:
+    """Decide every line of a chunk under both rule sets; return merged counters."""
+    assert "rules" in _WORKER, "init_worker() must run first"
+    rules_a, rules_b = _WORKER["rules"]
+    output_ratio = _WORKER["output_ratio"]
+    stats = empty_stats()
+    for line_no, line in chunk:
+        record: Any = None
+        try:
+            record = json.loads(line)
+            decision_a = policy_engine.decide_record(record, rules_a)
+            decision_b = policy_engine.decide_record(record, rules_b)
+        except (json.JSONDecodeError, ValueError, TypeError, OverflowError) as exc:
+            stats["errors"] += 1
+            if len(stats["error_examples"]) < max_examples:
+                stats["error_examples"].append({"line": line_no, "error": str(exc)})
+            continue
+        tokens, output = record_tokens(record, output_ratio)
+        stats["records"] += 1
+        stats["input_tokens"] += tokens
+        stats["output_tokens"] += output
+        label_a = f"{decision_a['route']}/{decision_a['reason']}"
+        label_b = f"{decision_b['route']}/{decision_b['reason']}"
+        stats["reasons_a"][label_a] += 1
+        stats["reasons_b"][label_b] += 1
+        if decision_a["route"] == "local":
+            stats["local_a"] += 1
+            stats["local_tokens_a"] += tokens + output
+        if decision_b["route"] == "local":
+            stats["local_b"] += 1
+            stats["local_tokens_b"] += tokens + output
+        if label_a != label_b:
+            stats["changed"] += 1
+            stats["transitions"][f"{label_a} -> {label_b}"] += 1
+            if len(stats["changed_examples"]) < max_examples:
+                example: Dict[str, Any] = {"line": line_no, "a": label_a, "b": label_b}
+                if "id" in record:
+                    example["id"] = record["id"]
+                stats["changed_examples"].append(example)
+    return stats
+
+
+def merge_stats(total: Dict[str, Any], part: Dict[str, Any], max_examples: int) -> None:
+    for key, value in part.items():
+        if isinstance(value, list):
+            total[key] = sorted(total[key] + value, key=lambda e: e["line"])[:max_examples]
+        elif isinstance(value, Counter):
+            total[key].update(value)
+        else:
+            total[key] += value
+
+
+def read_chunks(source: IO[str], chunk_size: int) -> Iterator[Chunk]:
+    numbered = ((n, line) for n, line in enumerate(source, start=1) if line.strip())
+    while True:
+        chunk = list(itertools.islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def replay(
+    source: IO[str],
+    rules_a: Dict[str, Any],
+    rules_b: Dict[str, Any],
+    workers: int = 1,
+    chunk_size: int = 2000,
+    output_ratio: float = DEFAULT_OUTPUT_RATIO,
+    max_examples: int = 5,
+) -> Dict[str, Any]:
+    total = empty_stats()
+    chunks = read_chunks(source, chunk_size)
+    if workers <= 1:
+        init_worker(rules_a, rules_b, output_ratio)
+        for chunk in chunks:
+            merge_stats(total, replay_chunk(chunk, max_examples), max_examples)
+        return total
+    with multiprocessing.Pool(
+        workers, initializer=init_worker, initargs=(rules_a, rules_b, output_ratio)
+    ) as pool:
+        for part in pool.imap_unordered(
+            functools.partial(replay_chunk, max_examples=max_examples), chunks
+        ):
+            merge_stats(total, part, max_examples)
+    return total
+
+
+def share(part: int, whole: int) -> float:
+    return 0.0 if whole == 0 else part / whole
+
+
+def costs_for(
+    stats: Dict[str, Any], local_tokens_key: str, pricing: Dict[str, Any], name: str
+) -> Dict[str, float]:
+    total_tokens = stats["input_tokens"] + stats["output_tokens"]
+    scenario = cost_model.Scenario(
+        name=name,
+        input_tokens=stats["input_tokens"],
+        output_tokens=stats["output_tokens"],
+        local_share=share(stats[local_tokens_key], total_tokens),
+    )
+    return cost_model.compute_costs(
+        cost_model.parse_pricing(pricing["claude_pricing"]),
+        float(pricing["local_cost_per_mtok"]),
+        scenario,
+    )
+
+
+def build_report(stats: Dict[str, Any], pricing: Dict[str, Any]) -> Dict[str, Any]:
+    records = stats["records"]
+    total_tokens = stats["input_tokens"] + stats["output_tokens"]
+    cost_a = costs_for(stats, "local_tokens_a", pricing, "A")
+    cost_b = costs_for(stats, "local_tokens_b", pricing, "B")
+    return {
+        "ok": stats["errors"] == 0,
+        "records": records,
+        "errors": stats["errors"],
+        "changed": stats["changed"],
+        "changed_pct": round(share(stats["changed"], records) * 100.0, 3),
+        "transitions": dict(stats["transitions"].most_common()),
+        "by_reason": {
+            "a": dict(stats["reasons_a"].most_common()),
+            "b": dict(stats["reasons_b"].most_common()),
+        },
+        "local_share": {
+            "a": round(share(stats["local_a"], records), 4),
+            "b": round(share(stats["local_b"], records), 4),
+        },
+        "local_token_share": {
+            "a": round(share(stats["local_tokens_a"], total_tokens), 4),
+            "b": round(share(stats["local_tokens_b"], total_tokens), 4),
+        },
+        "tokens": {"input": stats["input_tokens"], "output": stats["output_tokens"]},
+        "cost": {
+            "a": {k: round(v, 4) for k, v in cost_a.items()},
+            "b": {k: round(v, 4) for k, v in cost_b.items()},
+            "delta": round(cost_b["total_cost"] - cost_a["total_cost"], 4),
+        },
+        "changed_examples": stats["changed_examples"],
+        "error_examples": stats["error_examples"],
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log", required=True, help="JSONL task records ('-' for stdin)")
+    parser.add_argument("--rules-a", required=True, help="Baseline policy rules JSON")
+    parser.add_argument("--rules-b", required=True, help="Candidate policy rules JSON")
+    parser.add_argument(
+        "--pricing",
+        default=str(DEFAULT_PRICING_PATH),
+        help="JSON with claude_pricing and local_cost_per_mtok (scenarios.json)",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Records per work unit")
+    parser.add_argument(
+        "--output-ratio",
+        type=float,
+        default=DEFAULT_OUTPUT_RATIO,
+        help="Output tokens per input token for records without output_tokens",
+    )
+    parser.add_argument("--max-examples", type=int, default=5)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    rules_a = policy_engine.load_rules(Path(args.rules_a))
+    rules_b = policy_engine.load_rules(Path(args.rules_b))
+    pricing = cost_model.load_config(Path(args.pricing))
+    started = time.perf_counter()
+    try:
+        if args.log == "-":
+            stats = replay(
+                sys.stdin,
+                rules_a,
+                rules_b,
+                args.workers,
+                args.chunk_size,
+                args.output_ratio,
+                args.max_examples,
+            )
+        else:
+            with open(args.log, encoding="utf-8") as handle:
+                stats = replay(
+                    handle,
+                    rules_a,
+                    rules_b,
+                    args.workers,
+                    args.chunk_size,
+                    args.output_ratio,
+                    args.max_examples,
+                )
+    except OSError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - started
+    report = build_report(stats, pricing)
+    report["records_per_sec"] = round(stats["records"] / elapsed, 1) if elapsed else None
+    print(json.dumps(report, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Route a whole git change set (or the tracked tree) with one rules load.
+
+Sources:
+- `--range A..B` / `--range REV`: `git diff --numstat -z` (changed line counts)
+- `--staged`: `git diff --cached --numstat -z` (pre-commit)
+- default: `git ls-files -z` plus one `lstat` per file (sizes); `--rev REV`
+  reads sizes from `git ls-tree -r -l -z REV` instead, without touching files
+
+Tokens are estimated without reading file contents: changed lines times
+`--bytes-per-line` for diffs, file size for trees, divided by the
+per-extension bytes/token ratio from `token_model.json`. Each path is
+normalized and matched once; the aggregate decision is derived from the
+per-file matches and equals `policy_engine.evaluate` on the same paths.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import policy_engine
+import token_estimator
+
+DEFAULT_BYTES_PER_LINE = 40.0
+BINARY_SUFFIXES = frozenset(
+    {
+        ".png",
+        ".jpg",
+        ".jpeg",
+        ".gif",
+        ".ico",
+        ".webp",
+        ".pdf",
+        ".zip",
+        ".gz",
+        ".tgz",
+        ".tar",
+        ".xz",
+        ".bz2",
+        ".7z",
+        ".jar",
+        ".class",
+        ".so",
+        ".dylib",
+        ".dll",
+        ".exe",
+        ".o",
+        ".a",
+        ".pyc",
+        ".bin",
+        ".woff",
+        ".woff2",
+        ".ttf",
+        ".otf",
+        ".mp3",
+        ".mp4",
+    }
+)
+
+
+@dataclass(frozen=True)
+class ScanEntry:
+    path: str
+    size_bytes: int = 0
+    added: Optional[int] = None
+    deleted: Optional[int] = None
+    binary: bool = False
+
+
+def git(repo: Path, args: List[str]) -> bytes:
+    result = subprocess.run(["git", "-C", str(repo), *args], capture_output=True, check=False)
+    if result.returncode != 0:
+        detail = result.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"git {' '.join(args)} failed: {detail}")
+    return result.stdout
+
+
+def parse_numstat(raw: bytes) -> List[ScanEntry]:
+    """Parse `git diff --numstat -z`; renames list the new path."""
+    fields = raw.decode("utf-8", errors="surrogateescape").split("\0")
+    entries: List[ScanEntry] = []
+    i = 0
+    while i < len(fields):
+        head = fields[i]
+        i += 1
+        if not head:
+            continue
+        added, deleted, path = head.split("\t", 2)
+        if not path:
+            # Rename/copy: "added\tdeleted\t\0old\0new\0".
+            path = fields[i + 1]
+            i += 2
+        binary = added == "-"
+        entries.append(
+            ScanEntry(
+                path=path,
+                added=0 if binary else int(added),
+                deleted=0 if binary else int(deleted),
+                binary=binary,
+            )
+        )
+    return entries
+
+
+def parse_ls_tree(raw: bytes) -> List[ScanEntry]:
+    """Parse `git ls-tree -r -l -z`: "<mode> <type> <oid> <size>\t<path>"."""
+    entries: List[ScanEntry] = []
+    for record in raw.decode("utf-8", errors="surrogateescape").split("\0"):
+        if not record:
+            continue
+        meta, path = record.split("\t", 1)
+        size = meta.split()[3]
+        entries.append(ScanEntry(path=path, size_bytes=int(size) if size.isdigit() else 0))
+    return entries
+
+
+def list_worktree(repo: Path) -> List[ScanEntry]:
+    raw = git(repo, ["ls-files", "-z"])
+    entries: List[ScanEntry] = []
+    for path in raw.decode("utf-8", errors="surrogateescape").split("\0"):
+        if not path:
+            continue
+        try:
+            size = os.lstat(os.path.join(repo, path)).st_size
+        except OSError:
+            size = 0  # deleted in the worktree but still in the index
+        entries.append(ScanEntry(path=path, size_bytes=size))
+    return entries
+
+
+def collect(
+    repo: Path, rev_range: Optional[str], staged: bool, rev: Optional[str]
+) -> Tuple[str, List[ScanEntry]]:
+    if staged:
+        return "staged", parse_numstat(git(repo, ["diff", "--cached", "--numstat", "-z"]))
+    if rev_range:
+        return "diff", parse_numstat(git(repo, ["diff", "--numstat", "-z", rev_range, "--"]))
+    if rev:
+        return "tree", parse_ls_tree(git(repo, ["ls-tree", "-r", "-l", "-z", rev]))
+    return "worktree", list_worktree(repo)
+
+
+def estimate_tokens(entry: ScanEntry, ratio: float, bytes_per_line: float) -> int:
+    """Tokens for one entry given its bytes/token ratio (0 means binary)."""
+    if entry.binary or not ratio:
+        return 0
+    if entry.added is not None:
+        size = (entry.added + (entry.deleted or 0)) * bytes_per_line
+    else:
+        size = entry.size_bytes
+    return round(size / ratio)
+
+
+def suffix_ratios(model: token_estimator.TokenModel) -> Dict[str, float]:
+    ratios = dict(model.bytes_per_token)
+    ratios.update((suffix, 0.0) for suffix in BINARY_SUFFIXES)
+    return ratios
+
+
+def scan(
+    entries: Iterable[ScanEntry],
+    compiled: policy_engine.CompiledRules,
+    model: token_estimator.TokenModel,
+    bytes_per_line: float = DEFAULT_BYTES_PER_LINE,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Per-file static decisions plus aggregate flags for the whole set."""
+    denied = compiled.denylist.matches_key
+    sensitive = compiled.sensitive.matches_key
+    threshold = compiled.long_context_threshold_tokens
+    ratios = suffix_ratios(model)
+    default_ratio = model.default_bytes_per_token
+    splitext = os.path.splitext
+    per_file: List[Dict[str, Any]] = []
+    total_tokens = 0
+    any_denied = any_sensitive = False
+    for entry in entries:
+        key = policy_engine.path_key(entry.path)
+        suffix = splitext(key)[1].lower() or token_estimator.NO_SUFFIX
+        ratio = ratios.get(suffix, default_ratio)
+        tokens = estimate_tokens(entry, ratio, bytes_per_line)
+        total_tokens += tokens
+        if denied(key):
+            any_denied = True
+            route, reason = "claude_only", "denylist_path"
+        elif sensitive(key):
+            any_sensitive = True
+            route, reason = "claude_first", "sensitive_path"
+        elif threshold and tokens > threshold:
+            route, reason = "claude_first", "long_context"
+        else:
+            route, reason = "local", "default_safe"
+        item: Dict[str, Any] = {
+            "path": entry.path,
+            "tokens": tokens,
+            "route": route,
+            "reason": reason,
+        }
+        if entry.added is not None:
+            item["added"] = entry.added
+            item["deleted"] = entry.deleted
+        if entry.binary:
+            item["binary"] = True
+        per_file.append(item)
+    summary = {"tokens": total_tokens, "denied": any_denied, "sensitive": any_sensitive}
+    return per_file, summary
+
+
+def aggregate_decision(
+    summary: Dict[str, Any],
+    compiled: policy_engine.CompiledRules,
+    vram_free_mib: Optional[int],
+    vram_free_ratio: Optional[float],
+    static_only: bool,
+) -> Dict[str, str]:
+    """Same precedence as ``policy_engine.evaluate`` over the whole change set."""
+    if summary["denied"]:
+        return {"route": "claude_only", "reason": "denylist_path"}
+    if summary["sensitive"]:
+        return {"route": "claude_first", "reason": "sensitive_path"}
+    threshold = compiled.long_context_threshold_tokens
+    if threshold and summary["tokens"] > threshold:
+        return {"route": "claude_first", "reason": "long_context"}
+    if not static_only:
+        decision = policy_engine.vram_decision(compiled, vram_free_mib, vram_free_ratio)
+        if decision is not None:
+            return decision
+    return {"route": "local", "reason": "default_safe"}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", required=True, help="Path to policy rules JSON")
+    parser.add_argument("--repo", default=".", help="Git repository (default: cwd)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--range", dest="rev_range", help="Diff range, e.g. origin/main...HEAD")
+    source.add_argument("--staged", action="store_true", help="Scan the staged change set")
+    source.add_argument("--rev", help="Scan every file tracked at this revision")
+    parser.add_argument(
+        "--token-model", default=str(token_estimator.DEFAULT_MODEL_PATH), help="Token model JSON"
+    )
+    parser.add_argument(
+        "--bytes-per-line",
+        type=float,
+        default=DEFAULT_BYTES_PER_LINE,
+        help="Average bytes per changed line for diff token estimates",
+    )
+    parser.add_argument("--vram-sample", help="Optional VRAM sample JSON from vram_probe.py")
+    parser.add_argument("--vram-free-mib", type=int, help="Optional free VRAM in MiB")
+    parser.add_argument("--vram-free-ratio", type=float, help="Optional free VRAM ratio (0-1)")
+    parser.add_argument(
+        "--static-only",
+        action="store_true",
+        help="Skip the VRAM stage (path/token gate for CI without GPUs)",
+    )
+    parser.add_argument("--summary-only", action="store_true", help="Omit per-file decisions")
+    parser.add_argument(
+        "--fail-on-route",
+        action="append",
+        default=[],
+        choices=["claude_only", "claude_first", "local"],
+        help="Exit 1 if the aggregate route is one of these (repeatable)",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    started = time.perf_counter()
+    compiled = policy_engine.compile_rules(policy_engine.load_rules(Path(args.rules)))
+    model = token_estimator.load_model(Path(args.token_model))
+    vram_free_mib = args.vram_free_mib
+    vram_free_ratio = args.vram_free_ratio
+    if args.vram_sample:
+        sample_mib, sample_ratio = policy_engine.load_vram_signal(Path(args.vram_sample))
+        vram_free_mib = sample_mib if vram_free_mib is None else vram_free_mib
+        vram_free_ratio = sample_ratio if vram_free_ratio is None else vram_free_ratio
+
+    try:
+        mode, entries = collect(Path(args.repo), args.rev_range, args.staged, args.rev)
+    except (OSError, RuntimeError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+
+    per_file, summary = scan(entries, compiled, model, args.bytes_per_line)
+    decision = aggregate_decision(
+        summary, compiled, vram_free_mib, vram_free_ratio, args.static_only
+    )
+    payload: Dict[str, Any] = {
+        "ok": True,
+        "mode": mode,
+        "range": args.rev_range or args.rev,
+        "files": len(per_file),
+        "total_tokens": summary["tokens"],
+        "decision": decision,
+        "by_reason": dict(Counter(item["reason"] for item in per_file)),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+    if not args.summary_only:
+        payload["per_file"] = per_file
+    print(json.dumps(payload, indent=2))
+    if decision["route"] in args.fail_on_route:
+        print(
+            f"ERROR: change set routes {decision['route']} ({decision['reason']})", file=sys.stderr
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
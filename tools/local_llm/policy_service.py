@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""Long-lived local policy decision service.
+
+Owns the compiled policy rules, refreshes the VRAM signal in a background
+thread (so callers never spawn nvidia-smi per decision), and caches the
+path/token stage of each decision in an LRU keyed by the normalized path set,
+token bucket and rules hash.
+
+Endpoints (bind to localhost only):
+- POST /v1/decide  body: {"paths": [...], "tokens": N, "vram_free_mib"?, "vram_free_ratio"?,
+                          "prompt"?, "tools"?, "id"?}
+- GET  /v1/vram    latest VRAM sample and its age
+- POST /v1/observe body: {"runtime": name, "event"?: "start" | "end", "latency_sec"?}
+                    reports request starts/finishes and latencies for load routing
+- POST /v1/usage   body: {"input_tokens", "output_tokens", "route"?, "ts"?}
+                    feeds the spend governor (rules "budget" block)
+- GET  /v1/budget   window spend and budget pressure
+- GET  /v1/resident models considered resident per runtime (affinity routing)
+- GET  /v1/load     per-runtime latency EWMA, in-flight/queue depth and predicted latency
+- GET  /healthz    liveness + cache counters
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import load_signals
+import placement
+import policy_engine
+import residency
+import secret_scan
+import spend_governor
+import task_classifier
+import vram_probe
+
+CacheKey = Tuple[str, Tuple[str, ...], bool]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", required=True, help="Path to policy rules JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18181)
+    parser.add_argument(
+        "--vram-interval-sec",
+        type=float,
+        default=2.0,
+        help="Background VRAM refresh interval (0 disables sampling)",
+    )
+    parser.add_argument("--vram-timeout-sec", type=int, default=2, help="nvidia-smi timeout")
+    parser.add_argument("--cache-size", type=int, default=4096, help="Decision LRU entries")
+    parser.add_argument("--runtime-matrix", help="Runtime matrix JSON; enables per-GPU placement")
+    parser.add_argument("--model-catalog", default=str(placement.DEFAULT_CATALOG_PATH))
+    parser.add_argument(
+        "--residency-interval-sec",
+        type=float,
+        default=0.0,
+        help="Poll runtimes for loaded models (0: only track models this service placed)",
+    )
+    parser.add_argument(
+        "--residency-ttl-sec",
+        type=float,
+        default=residency.DEFAULT_TTL_SEC,
+        help="Forget served models after this long (match the runtime keep_alive)",
+    )
+    parser.add_argument(
+        "--classify", action="store_true", help="Assign L0-L3 task tiers from prompt/paths/tools"
+    )
+    parser.add_argument("--classifier-weights", default=str(task_classifier.DEFAULT_WEIGHTS_PATH))
+    parser.add_argument(
+        "--scan-content",
+        action="store_true",
+        help="Scan file contents for secrets before routing local (results cached per file)",
+    )
+    parser.add_argument(
+        "--load-interval-sec",
+        type=float,
+        default=0.0,
+        help="Poll runtime /slots and /metrics for queue depth (needs --runtime-matrix)",
+    )
+    parser.add_argument(
+        "--latency-alpha",
+        type=float,
+        default=load_signals.DEFAULT_ALPHA,
+        help="EWMA weight of each latency reported to /v1/observe",
+    )
+    parser.add_argument(
+        "--pricing",
+        default=str(spend_governor.DEFAULT_PRICING_PATH),
+        help="Claude/local pricing for the spend governor (scenarios.json)",
+    )
+    return parser.parse_args()
+
+
+def rules_hash(rules: Dict[str, Any]) -> str:
+    canonical = json.dumps(rules, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class Periodic:
+    """Run a callable on a daemon thread every ``interval_sec`` until stopped."""
+
+    def __init__(self, name: str, interval_sec: float, func: Callable[[], None]) -> None:
+        self.name = name
+        self.interval_sec = interval_sec
+        self.func = func
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.func()
+            self._stop.wait(self.interval_sec)
+
+    def start(self) -> None:
+        if self.interval_sec <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout_sec: float = 3.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout_sec)
+
+
+class VramMonitor:
+    """Refresh the VRAM routing signal on a background thread."""
+
+    def __init__(self, interval_sec: float, timeout_sec: int) -> None:
+        self.interval_sec = interval_sec
+        self.timeout_sec = timeout_sec
+        self._lock = threading.Lock()
+        self._poller = Periodic("vram-monitor", interval_sec, self.refresh)
+        self._sample: Optional[Dict[str, Any]] = None
+        self._sampled_at: Optional[float] = None
+        self._error: Optional[str] = None
+
+    def refresh(self) -> None:
+        try:
+            gpus = vram_probe.sample_nvidia(timeout_sec=self.timeout_sec)
+            if not gpus:
+                raise RuntimeError("no GPUs detected")
+            sample: Optional[Dict[str, Any]] = vram_probe.summarize(gpus)
+            error = None
+        except Exception as exc:  # keep serving with the last good sample
+            sample = None
+            error = str(exc)
+        with self._lock:
+            if sample is not None:
+                self._sample = sample
+                self._sampled_at = time.monotonic()
+            self._error = error
+
+    def start(self) -> None:
+        self._poller.start()
+
+    def stop(self) -> None:
+        self._poller.stop(timeout_sec=self.timeout_sec + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            sample = self._sample
+            sampled_at = self._sampled_at
+            error = self._error
+        age = None if sampled_at is None else round(time.monotonic() - sampled_at, 3)
+        return {
+            "min_free_mib": sample.get("min_free_mib") if sample else None,
+            "min_free_ratio": sample.get("min_free_ratio") if sample else None,
+            "gpus": sample.get("gpus", []) if sample else [],
+            "age_sec": age,
+            "error": error,
+        }
+
+
+class DecisionCache:
+    """Thread-safe LRU for the path/token stage of policy decisions."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[CacheKey, Optional[Dict[str, str]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> Tuple[bool, Optional[Dict[str, str]]]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: CacheKey, value: Optional[Dict[str, str]]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class PolicyService:
+    def __init__(
+        self,
+        rules: Dict[str, Any],
+        monitor: VramMonitor,
+        cache: DecisionCache,
+        placement_config: Optional[placement.PlacementConfig] = None,
+        tracker: Optional[residency.ResidencyTracker] = None,
+        classifier: Optional[task_classifier.TaskClassifier] = None,
+        scanner: Optional[secret_scan.SecretScanner] = None,
+        load: Optional[load_signals.LoadTracker] = None,
+        governor: Optional[spend_governor.SpendGovernor] = None,
+    ) -> None:
+        self.compiled = policy_engine.compile_rules(rules)
+        self.rules_hash = rules_hash(rules)
+        self.monitor = monitor
+        self.cache = cache
+        self.placement_config = placement_config
+        self.tracker = tracker or residency.ResidencyTracker()
+        self.classifier = classifier
+        self.scanner = scanner
+        self._scan_lock = threading.Lock()
+        self.load = load or load_signals.LoadTracker()
+        self.governor = governor
+
+    def cache_key(self, task: policy_engine.TaskRecord) -> CacheKey:
+        normalized = tuple(sorted({policy_engine.normalize_path(p) for p in task.paths}))
+        threshold = self.compiled.long_context_threshold_tokens
+        over_threshold = bool(threshold) and task.tokens > threshold
+        return self.rules_hash, normalized, over_threshold
+
+    def load_stage(
+        self, task: policy_engine.TaskRecord
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[placement.PlacementConfig]]:
+        """Saturation decision plus the placement config minus saturated runtimes.
+
+        A request-supplied ``predicted_latency_sec`` wins. With placement, only
+        runtimes over the SLO are dropped; the task is saturated when all are.
+        Otherwise the best prediction among tracked runtimes is used.
+        """
+        config = self.placement_config
+        if task.predicted_latency_sec is not None or not self.compiled.local_latency_slo_sec:
+            return policy_engine.load_decision(self.compiled, task.predicted_latency_sec), config
+        names = [r.name for r in config.runtimes] if config is not None else self.load.runtimes()
+        predicted = {name: self.load.predicted_latency(name) for name in names}
+        saturated = {
+            name
+            for name, latency in predicted.items()
+            if policy_engine.load_decision(self.compiled, latency) is not None
+        }
+        if config is not None and len(saturated) < len(names):
+            runtimes = [r for r in config.runtimes if r.name not in saturated]
+            return None, dataclasses.replace(config, runtimes=runtimes) if saturated else config
+        known = [latency for latency in predicted.values() if latency is not None]
+        return policy_engine.load_decision(self.compiled, min(known) if known else None), config
+
+    def observe(self, record: Any) -> Dict[str, Any]:
+        if not isinstance(record, dict):
+            raise ValueError("record must be an object")
+        runtime = record.get("runtime")
+        if not isinstance(runtime, str) or not runtime:
+            raise ValueError("runtime must be a non-empty string")
+        event = record.get("event")
+        if event not in (None, "start", "end"):
+            raise ValueError("event must be 'start' or 'end'")
+        latency = policy_engine.optional_number(record, "latency_sec")
+        if latency is not None and latency < 0:
+            raise ValueError("latency_sec must be >= 0")
+        if event == "start":
+            self.load.start(runtime)
+        elif event == "end":
+            self.load.finish(runtime, latency)
+        elif latency is not None:
+            self.load.observe_latency(runtime, latency)
+        return self.load.snapshot(runtime).to_dict()
+
+    def record_usage(self, record: Any) -> Dict[str, Any]:
+        if self.governor is None:
+            raise ValueError("rules have no budget block")
+        cost = self.governor.record_usage(record)
+        return {"cost_usd": round(cost, 6), **self.governor.snapshot()}
+
+    def budget_pressure(self, task: policy_engine.TaskRecord) -> Optional[float]:
+        if task.budget_pressure is not None:
+            return task.budget_pressure
+        return self.governor.pressure() if self.governor is not None else None
+
+    def scan_content(self, paths: List[str]) -> Optional[Dict[str, Any]]:
+        assert self.scanner is not None
+        with self._scan_lock:
+            return self.scanner.first_finding(paths)
+
+    def decide(self, record: Any) -> Dict[str, Any]:
+        task = policy_engine.parse_record(record)
+        key = self.cache_key(task)
+        static: Optional[Dict[str, Any]]
+        cached, static = self.cache.get(key)
+        if not cached:
+            static = policy_engine.static_decision(task.paths, task.tokens, self.compiled)
+            self.cache.put(key, static)
+        tier = None
+        if self.classifier is not None:
+            tier = self.classifier.classify(task.prompt, task.paths, task.tools).tier
+
+        gpus = task.gpus
+        if task.vram_free_mib is not None or task.vram_free_ratio is not None or gpus is not None:
+            vram: Dict[str, Any] = {
+                "source": "request",
+                "age_sec": 0.0,
+                "min_free_mib": task.vram_free_mib,
+                "min_free_ratio": task.vram_free_ratio,
+            }
+        else:
+            snapshot = self.monitor.snapshot()
+            gpus = snapshot["gpus"]
+            vram = {
+                "source": "sampler" if snapshot["age_sec"] is not None else "none",
+                "age_sec": snapshot["age_sec"],
+                "min_free_mib": snapshot["min_free_mib"],
+                "min_free_ratio": snapshot["min_free_ratio"],
+            }
+
+        resident = task.resident
+        if resident is None and self.placement_config is not None:
+            resident = self.tracker.snapshot()
+        decision = policy_engine.evaluate_stages(
+            static,
+            task.paths,
+            self.compiled,
+            vram_free_mib=vram["min_free_mib"],
+            vram_free_ratio=vram["min_free_ratio"],
+            gpus=gpus,
+            placement_config=self.placement_config,
+            resident=resident,
+            tier=tier,
+            content_scan=self.scan_content if self.scanner is not None else None,
+            budget_pressure=self.budget_pressure(task),
+            load_stage=functools.partial(self.load_stage, task),
+        )
+        chosen = decision.get("placement")
+        if chosen:
+            self.tracker.observe(chosen["runtime"], chosen["model"])
+
+        response: Dict[str, Any] = dict(decision)
+        response["cached"] = cached
+        response["rules_hash"] = self.rules_hash
+        response["vram"] = vram
+        if tier is not None:
+            response["tier"] = tier
+        if "id" in record:
+            response["id"] = record["id"]
+        return response
+
+
+def send_json(handler: BaseHTTPRequestHandler, status: int, payload: Dict[str, Any]) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    handler.send_response(status)
+    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def make_handler(service: PolicyService) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "policy-service/0.1"
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: object) -> None:
+            return
+
+        def do_GET(self) -> None:
+            if self.path == "/healthz":
+                send_json(
+                    self,
+                    200,
+                    {"ok": True, "rules_hash": service.rules_hash, "cache": service.cache.stats()},
+                )
+                return
+            if self.path == "/v1/vram":
+                send_json(self, 200, service.monitor.snapshot())
+                return
+            if self.path == "/v1/resident":
+                snapshot = service.tracker.snapshot()
+                send_json(self, 200, {k: sorted(v) for k, v in snapshot.items()})
+                return
+            if self.path == "/v1/budget":
+                if service.governor is None:
+                    send_json(self, 404, {"error": "rules have no budget block"})
+                    return
+                send_json(self, 200, service.governor.snapshot())
+                return
+            if self.path == "/v1/load":
+                load = service.load
+                send_json(self, 200, {n: load.snapshot(n).to_dict() for n in load.runtimes()})
+                return
+            send_json(self, 404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length", "0") or "0")
+            raw = self.rfile.read(length).decode("utf-8", errors="replace")
+            routes = {
+                "/v1/decide": service.decide,
+                "/v1/observe": service.observe,
+                "/v1/usage": service.record_usage,
+            }
+            if self.path not in routes:
+                send_json(self, 404, {"error": "not found"})
+                return
+            try:
+                payload = routes[self.path](json.loads(raw))
+            except (json.JSONDecodeError, ValueError, TypeError, OverflowError) as exc:
+                send_json(self, 400, {"error": str(exc)})
+                return
+            send_json(self, 200, payload)
+
+    return Handler
+
+
+def main() -> int:
+    args = parse_args()
+    rules = policy_engine.load_rules(Path(args.rules))
+    monitor = VramMonitor(args.vram_interval_sec, args.vram_timeout_sec)
+    placement_config = None
+    if args.runtime_matrix:
+        placement_config = placement.load_config(
+            Path(args.runtime_matrix), Path(args.model_catalog)
+        )
+    tracker = residency.ResidencyTracker(ttl_sec=args.residency_ttl_sec)
+    classifier = None
+    if args.classify:
+        classifier = task_classifier.load_classifier(Path(args.classifier_weights))
+    scanner = None
+    if args.scan_content:
+        # In-memory cache only: the service sees every request, so it stays warm.
+        scanner = secret_scan.SecretScanner(secret_scan.open_cache(None))
+    budget = spend_governor.parse_budget(rules.get("budget"))
+    governor = None
+    if budget is not None:
+        governor = spend_governor.load_governor(budget, Path(args.pricing))
+    service = PolicyService(
+        rules,
+        monitor,
+        DecisionCache(args.cache_size),
+        placement_config,
+        tracker,
+        classifier,
+        scanner,
+        load_signals.LoadTracker(alpha=args.latency_alpha),
+        governor,
+    )
+    residency_poller = Periodic(
+        "residency-poller",
+        args.residency_interval_sec if placement_config is not None else 0,
+        lambda: tracker.poll(placement_config.runtimes if placement_config else []),
+    )
+    load_poller = Periodic(
+        "load-poller",
+        args.load_interval_sec if placement_config is not None else 0,
+        lambda: service.load.poll(placement_config.runtimes if placement_config else []),
+    )
+    monitor.start()
+    residency_poller.start()
+    load_poller.start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        server.server_close()
+        monitor.stop()
+        residency_poller.stop()
+        load_poller.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
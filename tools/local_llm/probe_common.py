@@ -1,11 +1,38 @@
 #!/usr/bin/env python3
-"""Shared utilities for tool-call probing."""
+"""Shared utilities for tool-call probing.
+
+`HttpClient` is the one HTTP path for every probe: it keeps idle
+`http.client` connections per (scheme, host, port) and reuses them, applies a
+single timeout policy, and maps failures to the probes' error strings
+(`HTTP <code> (<body>)`, `URL error (...)`, `timeout (...)`,
+`non-JSON response (...)`). Each response carries a `Timing` breakdown:
+connect (0 on a reused connection), send, time to first byte and body.
+
+`HttpClient.stream_chat` sends a `stream: true` chat completion and parses
+the SSE chunks as they arrive, timestamping every chunk that carries output
+(content, reasoning or tool-call deltas) for time-to-first-token and
+inter-token latency. It also assembles the deltas into the final message, so
+tool calls can be validated on a streamed request.
+
+`validate_tool_calls` checks a message against any set of expected calls
+(several parallel calls, nested object arguments); `validate_add_call` is the
+strict single `add(a=2, b=3)` case: one call, exactly those arguments.
+"""
 
 from __future__ import annotations
 
+import http.client
+import itertools
 import json
+import math
+import threading
+import time
+import urllib.parse
+from dataclasses import asdict, dataclass, field
 from typing import Any
 
+ConnectionKey = tuple[str, str, int]
+
 
 def parse_arguments(raw: Any) -> tuple[dict[str, Any] | None, str | None]:
     """Parse tool call arguments from various formats.
@@ -31,12 +58,59 @@ def parse_arguments(raw: Any) -> tuple[dict[str, Any] | None, str | None]:
     return None, f"unsupported arguments type: {type(raw).__name__}"
 
 
-def validate_add_call(message: dict[str, Any]) -> tuple[bool, str]:
-    """Validate that a message contains a valid 'add' tool call with a=2, b=3.
-    
+def arguments_match(expected: Any, actual: Any, exact: bool = False) -> bool:
+    """Whether ``actual`` tool arguments satisfy ``expected``.
+
+    Objects match when every expected key matches (extra keys are allowed
+    unless ``exact``); lists match element-wise; scalars compare equal
+    (``2 == 2.0``, but booleans only match booleans).
+
+    Args:
+        expected: Expected value (object, list or scalar)
+        actual: Value parsed from the model's arguments
+        exact: Reject object keys beyond the expected ones, at any depth
+
+    Returns:
+        True if ``actual`` matches
+    """
+    if isinstance(expected, dict):
+        return (
+            isinstance(actual, dict)
+            and (not exact or actual.keys() == expected.keys())
+            and all(
+                key in actual and arguments_match(value, actual[key], exact)
+                for key, value in expected.items()
+            )
+        )
+    if isinstance(expected, list):
+        return (
+            isinstance(actual, list)
+            and len(actual) == len(expected)
+            and all(arguments_match(e, a, exact) for e, a in zip(expected, actual, strict=True))
+        )
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        return expected is actual
+    return bool(expected == actual)
+
+
+def validate_tool_calls(
+    message: dict[str, Any],
+    expected: list[tuple[str, dict[str, Any]]],
+    allow_extra: bool = False,
+    exact: bool = False,
+) -> tuple[bool, str]:
+    """Validate that a message contains the expected tool calls, in any order.
+
+    Each expected (name, arguments) pair must match a distinct call; see
+    ``arguments_match`` for how arguments compare.
+
     Args:
         message: The message dict from API response
-        
+        expected: Expected (function name, arguments) pairs
+        allow_extra: Accept calls beyond the expected ones
+        exact: Require the calls in ``expected`` order, with no argument keys
+            beyond the expected ones
+
     Returns:
         Tuple of (is_valid, reason)
     """
@@ -44,24 +118,60 @@ def validate_add_call(message: dict[str, Any]) -> tuple[bool, str]:
     if not tool_calls:
         content = message.get("content", "")
         return False, f"missing tool_calls (content={content})"
-    if not isinstance(tool_calls, list) or not tool_calls:
+    if not isinstance(tool_calls, list):
         return False, "tool_calls is not a non-empty list"
-    first = tool_calls[0]
-    if not isinstance(first, dict):
-        return False, "tool_calls[0] is not an object"
-    function = first.get("function")
-    if not isinstance(function, dict):
-        return False, "tool_calls[0].function missing or invalid"
-    if function.get("name") != "add":
-        return False, f"unexpected function name ({function.get('name')})"
-    args, err = parse_arguments(function.get("arguments"))
-    if err:
-        return False, err
-    if args.get("a") != 2 or args.get("b") != 3:
-        return False, f"unexpected arguments (a={args.get('a')}, b={args.get('b')})"
+    calls: list[tuple[Any, dict[str, Any]]] = []
+    for index, call in enumerate(tool_calls):
+        if not isinstance(call, dict):
+            return False, f"tool_calls[{index}] is not an object"
+        function = call.get("function")
+        if not isinstance(function, dict):
+            return False, f"tool_calls[{index}].function missing or invalid"
+        args, err = parse_arguments(function.get("arguments"))
+        if args is None:
+            return False, err or "missing arguments"
+        calls.append((function.get("name"), args))
+    remaining = list(calls)
+    for name, want in expected:
+        candidates = remaining[:1] if exact else remaining
+        match = next(
+            (
+                call
+                for call in candidates
+                if call[0] == name and arguments_match(want, call[1], exact)
+            ),
+            None,
+        )
+        if match is not None:
+            remaining.remove(match)
+            continue
+        same_name = [call for call in candidates if call[0] == name]
+        if same_name:
+            got_args = same_name[0][1]
+            keys = list(want) + [key for key in got_args if exact and key not in want]
+            got = ", ".join(f"{key}={got_args.get(key)}" for key in keys)
+            return False, f"unexpected arguments ({got})"
+        if candidates:
+            return False, f"unexpected function name ({candidates[0][0]})"
+        return False, f"expected {len(expected)} tool calls, got {len(calls)}"
+    if remaining and not allow_extra:
+        names = ", ".join(str(call[0]) for call in remaining)
+        return False, f"unexpected extra tool calls ({names})"
     return True, "ok"
 
 
+def validate_add_call(message: dict[str, Any]) -> tuple[bool, str]:
+    """Validate that a message holds exactly one tool call: 'add' with a=2, b=3.
+    
+    Args:
+        message: The message dict from API response
+        
+    Returns:
+        Tuple of (is_valid, reason)
+    """
+    return validate_tool_calls(message, [("add", {"a": 2, "b": 3})], exact=True)
+
+
 def create_add_tool_payload(model: str) -> dict[str, Any]:
     """Create a standard tool call probe payload for the 'add' function.
     
@@ -91,3 +201,471 @@ def create_add_tool_payload(model: str) -> dict[str, Any]:
         "tool_choice": "auto",
         "temperature": 0,
     }
+
+
+class ProbeError(Exception):
+    """A failed probe request; ``str()`` is the standard probe error string.
+
+    ``kind`` is one of ``http``, ``url``, ``timeout`` or ``json``.
+    """
+
+    def __init__(self, kind: str, message: str, status: int | None = None) -> None:
+        super().__init__(message)
+        self.kind = kind
+        self.status = status
+
+
+@dataclass(frozen=True)
+class Timing:
+    connect_sec: float
+    send_sec: float
+    ttfb_sec: float
+    body_sec: float
+    total_sec: float
+    reused: bool
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class HttpResponse:
+    status: int
+    body: bytes
+    timing: Timing
+
+    def json(self) -> Any:
+        """Decode the body as JSON.
+
+        Raises:
+            ProbeError: kind ``json`` if the body is not valid JSON
+        """
+        try:
+            return json.loads(self.body.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise ProbeError("json", f"non-JSON response ({exc})") from exc
+
+
+def mean_timing(timings: list[Timing]) -> dict[str, Any] | None:
+    """Average each phase over requests (None for no requests)."""
+    if not timings:
+        return None
+    fields = ("connect_sec", "send_sec", "ttfb_sec", "body_sec", "total_sec")
+    out: dict[str, Any] = {
+        name: sum(getattr(t, name) for t in timings) / len(timings) for name in fields
+    }
+    out["reused"] = sum(1 for t in timings if t.reused)
+    return out
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Linear-interpolated percentile (``pct`` in 0-100) of a non-empty list."""
+    ordered = sorted(values)
+    if not ordered:
+        raise ValueError("percentile of empty sequence")
+    rank = (len(ordered) - 1) * pct / 100.0
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def distribution(values: list[float]) -> dict[str, Any] | None:
+    """Count, mean, p50/p90/p99 and max of a sample (None when empty)."""
+    if not values:
+        return None
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+def merge_delta(message: dict[str, Any], chunk: Any) -> None:
+    """Fold one SSE chunk's delta into ``message`` (content and tool calls by index).
+
+    Args:
+        message: The assistant message assembled so far (mutated)
+        chunk: A parsed ``chat.completion.chunk``
+    """
+    choices = chunk.get("choices") if isinstance(chunk, dict) else None
+    if not isinstance(choices, list) or not choices or not isinstance(choices[0], dict):
+        return
+    delta = choices[0].get("delta")
+    if not isinstance(delta, dict):
+        return
+    if isinstance(delta.get("content"), str):
+        message["content"] = message.get("content", "") + delta["content"]
+    for part in delta.get("tool_calls") or []:
+        if not isinstance(part, dict):
+            continue
+        calls = message.setdefault("tool_calls", [])
+        index = part.get("index", len(calls))
+        while len(calls) <= index:
+            calls.append({"type": "function", "function": {"name": "", "arguments": ""}})
+        call = calls[index]
+        if part.get("id"):
+            call["id"] = part["id"]
+        function = part.get("function")
+        if isinstance(function, dict):
+            for key in ("name", "arguments"):
+                value = function.get(key)
+                if isinstance(value, str):
+                    call["function"][key] += value
+                elif value is not None:
+                    call["function"][key] = value  # some runtimes send arguments as an object
+
+
+def delta_has_output(chunk: Any) -> bool:
+    if not isinstance(chunk, dict):
+        return False
+    choices = chunk.get("choices")
+    if not isinstance(choices, list) or not choices or not isinstance(choices[0], dict):
+        return False
+    delta = choices[0].get("delta")
+    if not isinstance(delta, dict):
+        return False
+    return any(delta.get(key) for key in ("content", "reasoning_content", "tool_calls"))
+
+
+@dataclass(frozen=True)
+class StreamResult:
+    """One streamed completion; times are seconds since the request started.
+
+    ``token_times`` has one entry per output chunk. Runtimes stream about one
+    token per chunk, so chunk gaps are the inter-token latencies; when the
+    final ``usage`` reports more tokens than chunks, decode throughput uses the
+    reported count. ``streamed`` is False if the server ignored ``stream``.
+    ``message`` is the assistant message assembled from the deltas (content
+    and tool calls), shaped like a non-streamed ``choices[0].message``.
+    """
+
+    token_times: tuple[float, ...]
+    total_sec: float
+    completion_tokens: int | None
+    prompt_tokens: int | None
+    streamed: bool
+    timing: Timing
+    message: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def ttft_sec(self) -> float | None:
+        return self.token_times[0] if self.token_times else None
+
+    @property
+    def output_tokens(self) -> int:
+        if self.completion_tokens is not None:
+            return self.completion_tokens
+        return len(self.token_times)
+
+    def usage(self) -> dict[str, int]:
+        """The reported usage counts, shaped like a non-streamed ``usage`` object."""
+        counts = {"prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+        return {key: value for key, value in counts.items() if value is not None}
+
+    def inter_token_sec(self) -> list[float]:
+        times = self.token_times
+        return [later - earlier for earlier, later in itertools.pairwise(times)]
+
+    def decode_tokens_per_sec(self) -> float | None:
+        """Tokens after the first over the time from first to last output chunk."""
+        if len(self.token_times) < 2:
+            return None
+        span = self.token_times[-1] - self.token_times[0]
+        tokens = max(self.output_tokens, len(self.token_times)) - 1
+        return None if span <= 0 else tokens / span
+
+    def prefill_tokens_per_sec(self) -> float | None:
+        ttft = self.ttft_sec
+        if not self.prompt_tokens or not ttft:
+            return None
+        return self.prompt_tokens / ttft
+
+
+def stream_summary(streams: list[StreamResult]) -> dict[str, Any]:
+    """Streaming metrics over several completions; inter-token gaps are pooled.
+
+    Args:
+        streams: results of ``HttpClient.stream_chat``
+
+    Returns:
+        ``streamed`` (False if any server ignored ``stream``), ``avg_ttft_sec``,
+        an ``inter_token_sec`` distribution, ``avg_decode_tokens_per_sec`` and
+        ``avg_prefill_tokens_per_sec`` (None where a value was never measured)
+    """
+
+    def mean(values: list[float | None]) -> float | None:
+        present = [v for v in values if v is not None]
+        return None if not present else sum(present) / len(present)
+
+    return {
+        "streamed": all(s.streamed for s in streams),
+        "avg_ttft_sec": mean([s.ttft_sec for s in streams]),
+        "inter_token_sec": distribution([gap for s in streams for gap in s.inter_token_sec()]),
+        "avg_decode_tokens_per_sec": mean([s.decode_tokens_per_sec() for s in streams]),
+        "avg_prefill_tokens_per_sec": mean([s.prefill_tokens_per_sec() for s in streams]),
+    }
+
+
+def parse_usage(data: Any) -> tuple[int | None, int | None]:
+    usage = data.get("usage") if isinstance(data, dict) else None
+    if not isinstance(usage, dict):
+        return None, None
+    completion = usage.get("completion_tokens")
+    prompt = usage.get("prompt_tokens")
+    return (
+        int(completion) if isinstance(completion, (int, float)) else None,
+        int(prompt) if isinstance(prompt, (int, float)) else None,
+    )
+
+
+class HttpClient:
+    """Thread-safe keep-alive HTTP client shared by the probes.
+
+    A connection is checked out for one request at a time and returned to the
+    per-host idle pool unless the server asked to close it. A request that
+    fails on a reused connection before any response (the server closed the
+    idle socket) is retried once on a fresh connection.
+    """
+
+    def __init__(self, timeout_sec: float = 60.0, max_idle_per_host: int = 8) -> None:
+        self.timeout_sec = timeout_sec
+        self.max_idle_per_host = max_idle_per_host
+        self._idle: dict[ConnectionKey, list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def _checkout(
+        self, key: ConnectionKey, timeout_sec: float
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            pool = self._idle.get(key)
+            if pool:
+                conn = pool.pop()
+                conn.timeout = timeout_sec
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout_sec)
+                return conn, True
+        scheme, host, port = key
+        factory = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return factory(host, port, timeout=timeout_sec), False
+
+    def _checkin(self, key: ConnectionKey, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            pool = self._idle.setdefault(key, [])
+            if len(pool) < self.max_idle_per_host:
+                pool.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for pool in pools.values():
+            for conn in pool:
+                conn.close()
+
+    def open(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout_sec: float | None = None,
+    ) -> tuple[http.client.HTTPResponse, Timing, ConnectionKey, http.client.HTTPConnection]:
+        """Send a request and read the status line and headers.
+
+        The caller reads the body and hands the connection back with
+        ``release``. Connection and timeout failures raise ``ProbeError``.
+        """
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ProbeError("url", f"URL error (unsupported URL {url!r})")
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        key: ConnectionKey = (parsed.scheme, parsed.hostname, port)
+        target = parsed.path or "/"
+        if parsed.query:
+            target += "?" + parsed.query
+        timeout = self.timeout_sec if timeout_sec is None else timeout_sec
+        for attempt in (0, 1):
+            conn, reused = self._checkout(key, timeout)
+            start = time.perf_counter()
+            try:
+                connect_sec = 0.0
+                if conn.sock is None:
+                    conn.connect()
+                    connect_sec = time.perf_counter() - start
+                sent_at = time.perf_counter()
+                conn.request(method, target, body=body, headers=headers or {})
+                send_sec = time.perf_counter() - sent_at
+                waited_at = time.perf_counter()
+                response = conn.getresponse()
+                ttfb_sec = time.perf_counter() - waited_at
+            except TimeoutError as exc:
+                conn.close()
+                raise ProbeError("timeout", f"timeout ({exc})") from exc
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as exc:
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise ProbeError("url", f"URL error ({exc})") from exc
+            except (OSError, http.client.HTTPException) as exc:
+                conn.close()
+                raise ProbeError("url", f"URL error ({exc})") from exc
+            timing = Timing(connect_sec, send_sec, ttfb_sec, 0.0, 0.0, reused)
+            return response, timing, key, conn
+        raise AssertionError("unreachable")
+
+    def release(
+        self,
+        key: ConnectionKey,
+        conn: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+    ) -> None:
+        """Return a fully read connection to the pool (or close it)."""
+        if response.will_close or not response.isclosed():
+            conn.close()
+            return
+        self._checkin(key, conn)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout_sec: float | None = None,
+    ) -> HttpResponse:
+        """Send a request and read the whole response.
+
+        Raises:
+            ProbeError: kind ``http`` for non-2xx (message includes the error
+                body), ``url`` for connection failures, ``timeout`` for timeouts
+        """
+        response, timing, key, conn = self.open(method, url, body, headers, timeout_sec)
+        started = time.perf_counter()
+        try:
+            data = response.read()
+        except TimeoutError as exc:
+            conn.close()
+            raise ProbeError("timeout", f"timeout ({exc})") from exc
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            raise ProbeError("url", f"URL error ({exc})") from exc
+        body_sec = time.perf_counter() - started
+        self.release(key, conn, response)
+        total = timing.connect_sec + timing.send_sec + timing.ttfb_sec + body_sec
+        timing = Timing(
+            timing.connect_sec, timing.send_sec, timing.ttfb_sec, body_sec, total, timing.reused
+        )
+        if not 200 <= response.status < 300:
+            detail = data.decode("utf-8", errors="replace").strip() or "no error body"
+            raise ProbeError("http", f"HTTP {response.status} ({detail})", response.status)
+        return HttpResponse(status=response.status, body=data, timing=timing)
+
+    def post_json(
+        self, url: str, payload: dict[str, Any], timeout_sec: float | None = None
+    ) -> tuple[Any, Timing]:
+        """POST a JSON payload and decode the JSON response.
+
+        Returns:
+            Tuple of (decoded JSON, timing)
+        """
+        response = self.request(
+            "POST",
+            url,
+            body=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            timeout_sec=timeout_sec,
+        )
+        return response.json(), response.timing
+
+    def get_json(self, url: str, timeout_sec: float | None = None) -> Any:
+        return self.request("GET", url, timeout_sec=timeout_sec).json()
+
+    def stream_chat(
+        self, url: str, payload: dict[str, Any], timeout_sec: float | None = None
+    ) -> StreamResult:
+        """POST ``payload`` with ``stream: true`` and time the SSE output chunks.
+
+        Raises:
+            ProbeError: as ``request``, plus kind ``json`` for a malformed chunk
+        """
+        body = dict(payload, stream=True, stream_options={"include_usage": True})
+        response, timing, key, conn = self.open(
+            "POST",
+            url,
+            body=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Accept": "text/event-stream"},
+            timeout_sec=timeout_sec,
+        )
+        started = time.perf_counter() - timing.connect_sec - timing.send_sec - timing.ttfb_sec
+        token_times: list[float] = []
+        completion: int | None = None
+        prompt: int | None = None
+        message: dict[str, Any] = {"role": "assistant"}
+        streamed = "event-stream" in (response.getheader("Content-Type") or "")
+        try:
+            if not 200 <= response.status < 300 or not streamed:
+                raw = response.read()
+                if not 200 <= response.status < 300:
+                    detail = raw.decode("utf-8", errors="replace").strip() or "no error body"
+                    conn.close()
+                    raise ProbeError("http", f"HTTP {response.status} ({detail})", response.status)
+                data = HttpResponse(response.status, raw, timing).json()
+                completion, prompt = parse_usage(data)
+                try:
+                    message = dict(data["choices"][0]["message"])
+                except (KeyError, IndexError, TypeError):
+                    pass
+            else:
+                while True:
+                    line = response.readline()
+                    if not line:
+                        break
+                    text = line.decode("utf-8", errors="replace").strip()
+                    if not text.startswith("data:"):
+                        continue  # blank separators, comments, event names
+                    data_text = text[5:].strip()
+                    if data_text == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data_text)
+                    except json.JSONDecodeError as exc:
+                        conn.close()
+                        raise ProbeError("json", f"non-JSON stream chunk ({exc})") from exc
+                    if delta_has_output(chunk):
+                        token_times.append(time.perf_counter() - started)
+                    merge_delta(message, chunk)
+                    chunk_completion, chunk_prompt = parse_usage(chunk)
+                    completion = chunk_completion if chunk_completion is not None else completion
+                    prompt = chunk_prompt if chunk_prompt is not None else prompt
+                response.read()  # drain the terminator so the connection can be reused
+        except TimeoutError as exc:
+            conn.close()
+            raise ProbeError("timeout", f"timeout ({exc})") from exc
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            raise ProbeError("url", f"URL error ({exc})") from exc
+        total = time.perf_counter() - started
+        self.release(key, conn, response)
+        body_sec = total - timing.connect_sec - timing.send_sec - timing.ttfb_sec
+        return StreamResult(
+            token_times=tuple(token_times),
+            total_sec=total,
+            completion_tokens=completion,
+            prompt_tokens=prompt,
+            streamed=streamed,
+            timing=Timing(
+                timing.connect_sec, timing.send_sec, timing.ttfb_sec, body_sec, total, timing.reused
+            ),
+            message=message,
+        )
+
+
+_DEFAULT_CLIENT = HttpClient()  # opens no connections until the first request
+
+
+def default_client() -> HttpClient:
+    """Process-wide client, so every probe in a process shares connections."""
+    return _DEFAULT_CLIENT
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Bounded parallel execution for probe scripts.
+
+Each task names the lanes it occupies (a runtime, a GPU); a lane admits at
+most its limit of tasks at once, so models that share a GPU run serially while
+runtimes on other hosts or CPU backends proceed in parallel. Workers take the
+earliest pending task whose lanes all have room, results come back in task
+order, and with ``fail_fast`` the first failure stops dispatch and returns
+without waiting for in-flight probes (workers are daemon threads, so their
+blocked requests are abandoned when the process exits).
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar, cast
+
+T = TypeVar("T")
+
+DEFAULT_JOBS = 4
+_RAISED = object()  # a task's outcome when it raised; None is a legitimate result
+
+
+@dataclass(frozen=True)
+class ProbeTask(Generic[T]):
+    lanes: Tuple[str, ...]
+    run: Callable[[], T]
+
+
+@dataclass
+class PoolResult(Generic[T]):
+    """Results in task order; None for tasks cancelled or still in flight at a fail-fast stop."""
+
+    results: List[Optional[T]]
+    completed: List[bool]
+    stopped: bool = False
+
+    def cancelled(self) -> List[int]:
+        return [i for i, done in enumerate(self.completed) if not done]
+
+
+@dataclass
+class _PoolState:
+    running: int = 0
+    stopped: bool = False
+    error: Optional[BaseException] = None
+
+
+def runtime_lanes(runtime: Dict[str, Any]) -> Tuple[Tuple[str, ...], Dict[str, int]]:
+    """Lanes and limits for a runtime matrix entry.
+
+    The runtime lane allows ``max_concurrency`` (default 1) concurrent models;
+    each GPU index in ``gpus`` is a lane of one, shared by every runtime that
+    lists it.
+    """
+    name = str(runtime.get("name", "unknown"))
+    limits = {f"runtime:{name}": max(1, int(runtime.get("max_concurrency", 1)))}
+    gpus = runtime.get("gpus")
+    if isinstance(gpus, list):
+        for index in gpus:
+            limits[f"gpu:{int(index)}"] = 1
+    return tuple(limits), limits
+
+
+def run_tasks(
+    tasks: List[ProbeTask[T]],
+    jobs: int = DEFAULT_JOBS,
+    lane_limits: Optional[Dict[str, int]] = None,
+    fail_fast: bool = False,
+    failed: Callable[[T], bool] = lambda _: False,
+) -> PoolResult[T]:
+    """Run tasks on up to ``jobs`` threads within per-lane limits (unlisted lanes: 1)."""
+    limits = lane_limits or {}
+    results: List[Optional[T]] = [None] * len(tasks)
+    completed = [False] * len(tasks)
+    pending = list(range(len(tasks)))
+    active: Dict[str, int] = {}
+    state = _PoolState()
+    cond = threading.Condition()
+
+    def has_room(index: int) -> bool:
+        return all(active.get(lane, 0) < limits.get(lane, 1) for lane in tasks[index].lanes)
+
+    def finished() -> bool:
+        return state.stopped or (not pending and state.running == 0)
+
+    def worker() -> None:
+        while True:
+            with cond:
+                while True:
+                    if state.stopped or not pending:
+                        return
+                    index = next((i for i in pending if has_room(i)), None)
+                    if index is not None:
+                        break
+                    cond.wait()
+                pending.remove(index)
+                for lane in tasks[index].lanes:
+                    active[lane] = active.get(lane, 0) + 1
+                state.running += 1
+            outcome: object = _RAISED
+            try:
+                outcome = tasks[index].run()
+            except BaseException as exc:  # re-raised on the caller's thread
+                with cond:
+                    state.error = state.error or exc
+                    state.stopped = True
+            with cond:
+                for lane in tasks[index].lanes:
+                    active[lane] -= 1
+                state.running -= 1
+                if outcome is not _RAISED and not state.stopped:
+                    result = cast(T, outcome)
+                    results[index] = result
+                    completed[index] = True
+                    if fail_fast and failed(result):
+                        state.stopped = True
+                cond.notify_all()
+
+    threads = [
+        threading.Thread(target=worker, name=f"probe-{n}", daemon=True)
+        for n in range(max(1, min(jobs, len(tasks))))
+    ]
+    for thread in threads:
+        thread.start()
+    with cond:
+        while not finished():
+            cond.wait()
+        error = state.error
+        stopped = state.stopped
+    if error is not None:
+        raise error
+    return PoolResult(results=list(results), completed=list(completed), stopped=stopped)
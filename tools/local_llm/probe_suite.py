@@ -1,28 +1,51 @@
 #!/usr/bin/env python3
-"""Run tool-call probes across a list of models."""
+"""Run tool-call probes across a list of models.
+
+Models are probed on up to ``--jobs`` threads; each ``--url`` admits
+``--per-runtime`` concurrent models (default 1, so models sharing one GPU run
+serially) and several ``--url`` values (hosts or CPU backends) run in parallel.
+Output is in config order whatever the completion order.
+"""
 
 from __future__ import annotations
 
 import argparse
+import functools
 import json
-import socket
-import urllib.error
-import urllib.request
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
-from probe_common import create_add_tool_payload, validate_add_call
+from probe_common import (
+    HttpClient,
+    ProbeError,
+    create_add_tool_payload,
+    default_client,
+    validate_add_call,
+)
+from probe_pool import DEFAULT_JOBS, ProbeTask, run_tasks
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
-    parser.add_argument("--url", required=True, help="Chat completions URL")
+    parser.add_argument(
+        "--url", required=True, nargs="+", help="Chat completions URL(s); each gets every model"
+    )
     parser.add_argument("--config", required=True, help="Path to models JSON")
     parser.add_argument("--timeout-sec", type=int, default=60, help="Request timeout")
     parser.add_argument(
         "--fail-fast",
         action="store_true",
-        help="Stop after the first failure (default: continue and report all failures)",
+        help="Stop after the first failure and abandon in-flight probes "
+        "(default: continue and report all failures)",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=DEFAULT_JOBS, help="Maximum concurrent probes overall"
+    )
+    parser.add_argument(
+        "--per-runtime",
+        type=int,
+        default=1,
+        help="Concurrent models per URL (raise only if the runtime serves models in parallel)",
     )
     return parser.parse_args()
 
@@ -32,33 +55,14 @@ def load_models(path: Path) -> List[str]:
     return list(data.get("models", []))
 
 
-def probe_model(url: str, model: str, timeout_sec: int) -> tuple[bool, str]:
+def probe_model(
+    url: str, model: str, timeout_sec: int, client: Optional[HttpClient] = None
+) -> tuple[bool, str]:
     payload = create_add_tool_payload(model)
-
-    request = urllib.request.Request(
-        url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-
     try:
-        with urllib.request.urlopen(request, timeout=timeout_sec) as response:
-            raw = response.read().decode("utf-8", errors="replace")
-        try:
-            data = json.loads(raw)
-        except json.JSONDecodeError as exc:
-            return False, f"non-JSON response ({exc})"
-    except urllib.error.HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="replace").strip()
-        detail = body or "no error body"
-        return False, f"HTTP {exc.code} ({detail})"
-    except urllib.error.URLError as exc:
-        return False, f"URL error ({exc})"
-    except TimeoutError as exc:
-        return False, f"timeout ({exc})"
-    except socket.timeout as exc:
-        return False, f"timeout ({exc})"
+        data, _ = (client or default_client()).post_json(url, payload, timeout_sec=timeout_sec)
+    except ProbeError as exc:
+        return False, str(exc)
 
     message = data.get("choices", [{}])[0].get("message", {})
     return validate_add_call(message)
@@ -70,22 +74,37 @@ def main() -> int:
     if not models:
         raise ValueError("No models specified in config")
 
+    multi = len(args.url) > 1
+    labels: List[str] = []
+    tasks: List[ProbeTask[Tuple[bool, str]]] = []
+    for url in args.url:
+        for model in models:
+            labels.append(f"{model} @ {url}" if multi else model)
+            run = functools.partial(probe_model, url, model, args.timeout_sec)
+            tasks.append(ProbeTask(lanes=(url,), run=run))
+    outcome = run_tasks(
+        tasks,
+        jobs=args.jobs,
+        lane_limits={url: max(1, args.per_runtime) for url in args.url},
+        fail_fast=args.fail_fast,
+        failed=lambda result: not result[0],
+    )
+
     failures: Dict[str, str] = {}
-    for model in models:
-        ok, reason = probe_model(args.url, model, timeout_sec=args.timeout_sec)
-        if not ok:
-            failures[model] = reason
-            if args.fail_fast:
-                print(f"{model}: FAIL ({reason})")
+    for label, result in zip(labels, outcome.results, strict=True):
+        if result is not None and not result[0]:
+            failures[label] = result[1]
+            if outcome.stopped:
+                print(f"{label}: FAIL ({result[1]})")
                 return 1
 
     if failures:
-        for model, reason in failures.items():
-            print(f"{model}: FAIL ({reason})")
+        for label, reason in failures.items():
+            print(f"{label}: FAIL ({reason})")
         return 1
 
-    for model in models:
-        print(f"{model}: PASS")
+    for label in labels:
+        print(f"{label}: PASS")
     return 0
 
 
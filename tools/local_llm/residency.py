@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Track which models are resident (loaded) on each local runtime.
+
+Two sources feed the tracker:
+- polling: Ollama `GET /api/ps` lists loaded models; runtimes without it
+  (llama.cpp, vLLM) fall back to `GET /v1/models`, which only lists what the
+  server has loaded
+- observation: every local placement marks its model as recently served
+
+Entries expire after `ttl_sec` (Ollama unloads idle models after its
+keep_alive, 5 minutes by default), so stale residency never pins routing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from placement import Residency, RuntimeSpec, load_runtimes
+
+DEFAULT_TTL_SEC = 300.0
+
+
+def base_url(chat_url: str) -> str:
+    parsed = urllib.parse.urlparse(chat_url)
+    return urllib.parse.urlunparse(parsed._replace(path="", query="", fragment=""))
+
+
+def get_json(url: str, timeout_sec: float) -> Optional[Any]:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout_sec) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except (urllib.error.URLError, TimeoutError, ValueError, OSError):
+        return None
+
+
+def fetch_resident_models(runtime: RuntimeSpec, timeout_sec: float = 2.0) -> Optional[List[str]]:
+    """Loaded model names for a runtime, or None if the runtime is unreachable."""
+    base = base_url(runtime.url)
+    data = get_json(f"{base}/api/ps", timeout_sec)
+    if isinstance(data, dict) and isinstance(data.get("models"), list):
+        return [
+            str(m.get("name") or m.get("model"))
+            for m in data["models"]
+            if isinstance(m, dict) and (m.get("name") or m.get("model"))
+        ]
+    data = get_json(f"{base}/v1/models", timeout_sec)
+    if isinstance(data, dict) and isinstance(data.get("data"), list):
+        return [str(m["id"]) for m in data["data"] if isinstance(m, dict) and "id" in m]
+    return None
+
+
+def load_resident_file(path: Path) -> Residency:
+    """Read `{"runtime": ["model", ...]}` (e.g. written by `residency.py --output`)."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return parse_residency(data)
+
+
+def parse_residency(data: Any) -> Residency:
+    if not isinstance(data, dict):
+        raise ValueError("resident must be an object of runtime -> [models]")
+    out: Residency = {}
+    for runtime, models in data.items():
+        if not isinstance(models, list) or not all(isinstance(m, str) for m in models):
+            raise ValueError(f"resident[{runtime}] must be a string array")
+        out[str(runtime)] = set(models)
+    return out
+
+
+class ResidencyTracker:
+    """Thread-safe recently-served/loaded model set per runtime with TTL expiry."""
+
+    def __init__(self, ttl_sec: float = DEFAULT_TTL_SEC) -> None:
+        self.ttl_sec = ttl_sec
+        self._seen: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, runtime: str, model: str, now: Optional[float] = None) -> None:
+        stamp = time.monotonic() if now is None else now
+        with self._lock:
+            self._seen.setdefault(runtime, {})[model] = stamp
+
+    def replace(self, runtime: str, models: List[str], now: Optional[float] = None) -> None:
+        """Authoritative update from a runtime poll (drops models it no longer reports)."""
+        stamp = time.monotonic() if now is None else now
+        with self._lock:
+            self._seen[runtime] = {model: stamp for model in models}
+
+    def snapshot(self, now: Optional[float] = None) -> Residency:
+        current = time.monotonic() if now is None else now
+        with self._lock:
+            return {
+                runtime: {m for m, seen in models.items() if current - seen <= self.ttl_sec}
+                for runtime, models in self._seen.items()
+            }
+
+    def poll(self, runtimes: List[RuntimeSpec], timeout_sec: float = 2.0) -> None:
+        for runtime in runtimes:
+            models = fetch_resident_models(runtime, timeout_sec)
+            if models is not None:
+                self.replace(runtime.name, models)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", required=True, help="Runtime matrix JSON")
+    parser.add_argument("--timeout-sec", type=float, default=2.0)
+    parser.add_argument("--output", help="Write the residency JSON to this path")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    runtimes = load_runtimes(Path(args.config))
+    payload: Dict[str, Any] = {}
+    unreachable: List[str] = []
+    for runtime in runtimes:
+        models = fetch_resident_models(runtime, args.timeout_sec)
+        if models is None:
+            unreachable.append(runtime.name)
+            continue
+        payload[runtime.name] = sorted(models)
+    output = json.dumps(payload, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    for name in unreachable:
+        print(f"WARN: runtime {name} unreachable", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""Append-only SQLite history of probe and benchmark results.
+
+Every stored run keeps its full JSON payload in `runs`. It is also flattened
+into `measurements` rows of (model, runtime, host, metric, value), indexed on
+model, runtime, host fingerprint and timestamp. That lets the query CLI pull
+one metric's series or per-group aggregates with SQL instead of loading the
+history. Rows are only ever inserted. The database runs in WAL mode, so
+concurrent probes can record while a query is running.
+
+The host fingerprint hashes the hostname, OS and (when nvidia-smi is present)
+GPU names and driver version. A driver upgrade therefore starts a new series
+that can be compared with the old one.
+
+Probes take `--store [PATH]` (default: `default_store_path()`, overridable
+with `LOCALLLM_RESULTS_DB`). Existing output files can be ingested with
+`results_store.py record --tool runtime_probe --input out.json`.
+
+Query examples:
+  results_store.py series --metric avg_latency_sec --model llama3.1:latest
+  results_store.py aggregate --metric avg_tokens_per_sec --group-by model,host
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import functools
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+STORE_ENV = "LOCALLLM_RESULTS_DB"
+GROUP_COLUMNS = ("model", "runtime", "host", "tool")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    fingerprint TEXT PRIMARY KEY,
+    info TEXT NOT NULL,
+    first_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    tool TEXT NOT NULL,
+    schema_version TEXT,
+    host TEXT NOT NULL,
+    ok INTEGER,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    ts REAL NOT NULL,
+    tool TEXT NOT NULL,
+    host TEXT NOT NULL,
+    model TEXT,
+    runtime TEXT,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_ts ON runs(ts);
+CREATE INDEX IF NOT EXISTS runs_tool_ts ON runs(tool, ts);
+CREATE INDEX IF NOT EXISTS m_metric_model_ts ON measurements(metric, model, ts);
+CREATE INDEX IF NOT EXISTS m_metric_runtime_ts ON measurements(metric, runtime, ts);
+CREATE INDEX IF NOT EXISTS m_metric_host_ts ON measurements(metric, host, ts);
+CREATE INDEX IF NOT EXISTS m_ts ON measurements(ts);
+"""
+
+LATENCY_METRICS = (
+    "avg_latency_sec",
+    "avg_tokens_per_sec",
+    "latency_stats.p50",
+    "latency_stats.p90",
+    "latency_stats.p99",
+    "latency_stats.stddev",
+    "stats.p50",
+    "stats.p90",
+    "stats.p99",
+    "stats.stddev",
+    "stream.avg_ttft_sec",
+    "stream.avg_decode_tokens_per_sec",
+    "stream.avg_prefill_tokens_per_sec",
+)
+
+
+Measurement = Tuple[Optional[str], Optional[str], str, float]  # model, runtime, metric, value
+
+
+def default_store_path() -> Path:
+    override = os.environ.get(STORE_ENV)
+    if override:
+        return Path(override)
+    base = os.environ.get("XDG_DATA_HOME") or str(Path.home() / ".local" / "share")
+    return Path(base) / "claude-code-localllm" / "results.sqlite"
+
+
+@functools.lru_cache(maxsize=1)
+def host_fingerprint() -> Tuple[str, Dict[str, Any]]:
+    """Stable short hash of this machine's identity and GPU stack (cached per process)."""
+    info: Dict[str, Any] = {
+        "hostname": platform.node(),
+        "os": platform.platform(),
+        "python": platform.python_version(),
+        "gpus": [],
+    }
+    exe = shutil.which("nvidia-smi")
+    if exe:
+        try:
+            completed = subprocess.run(
+                [exe, "--query-gpu=name,driver_version", "--format=csv,noheader"],
+                check=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                timeout=2,
+            )
+            lines = completed.stdout.splitlines()
+            info["gpus"] = [line.strip() for line in lines if line.strip()]
+        except (OSError, subprocess.SubprocessError):
+            pass
+    identity = json.dumps({k: info[k] for k in ("hostname", "os", "gpus")}, sort_keys=True).encode(
+        "utf-8"
+    )
+    return hashlib.sha256(identity).hexdigest()[:16], info
+
+
+def number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def lookup(data: Any, dotted: str) -> Any:
+    for key in dotted.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def pick(
+    data: Any, names: Sequence[str], model: Optional[str], runtime: Optional[str], suffix: str = ""
+) -> List[Measurement]:
+    rows: List[Measurement] = []
+    for name in names:
+        value = number(lookup(data, name))
+        if value is not None:
+            rows.append((model, runtime, name + suffix, value))
+    return rows
+
+
+def extract_measurements(tool: str, payload: Dict[str, Any]) -> List[Measurement]:
+    """Flatten the metrics of a known output shape; unknown shapes store no rows."""
+    schema = payload.get("schema_version")
+    rows: List[Measurement] = []
+    if schema in ("runtime-probe-v1", "vram-bench-v1"):
+        for result in payload.get("results", []):
+            if not isinstance(result, dict):
+                continue
+            model, runtime = result.get("model"), result.get("runtime")
+            latency = result.get("latency")
+            if isinstance(latency, dict) and latency.get("ok"):
+                rows += pick(latency, LATENCY_METRICS, model, runtime)
+            tool_result = result.get("tool_calls") or result.get("tool")
+            if isinstance(tool_result, dict) and "ok" in tool_result:
+                rows.append((model, runtime, "tool_call_ok", 1.0 if tool_result["ok"] else 0.0))
+            rows += pick(
+                result,
+                (
+                    "min_free_drop_mib",
+                    "work_sec",
+                    "vram_series.peak_used_mib",
+                    "vram_series.tokens_per_utilization_sec",
+                ),
+                model,
+                runtime,
+            )
+    elif schema == "load-sweep-v1":
+        for step in payload.get("steps", []):
+            if "concurrency" in step:
+                key = f"@c={step['concurrency']}"
+            else:
+                key = f"@r={step.get('rate_rps')}"
+            rows += pick(
+                step,
+                (
+                    "request_throughput_rps",
+                    "output_tokens_per_sec",
+                    "latency_sec.p50",
+                    "latency_sec.p95",
+                    "latency_sec.p99",
+                    "ttft_sec.p50",
+                    "ttft_sec.p95",
+                ),
+                payload.get("model"),
+                payload.get("runtime"),
+                key,
+            )
+    elif schema == "context-sweep-v1":
+        for cell in payload.get("grid", []):
+            if "error" in cell:
+                continue
+            key = f"@p={cell.get('prompt_tokens_target')},o={cell.get('output_tokens_target')}"
+            rows += pick(
+                cell,
+                (
+                    "ttft_sec",
+                    "prefill_tokens_per_sec",
+                    "decode_tokens_per_sec",
+                    "peak_vram_used_mib",
+                ),
+                payload.get("model"),
+                payload.get("runtime"),
+                key,
+            )
+    elif schema == "tool-matrix-v1":
+        model, runtime = payload.get("model"), payload.get("runtime")
+        for cell in payload.get("cells", []):
+            key = f"@n={cell.get('tool_count')},s={cell.get('schema_size')},{cell.get('shape')}"
+            passed = 1.0 if cell.get("ok") else 0.0
+            rows.append((model, runtime, "tool_call_ok" + key, passed))
+            rows += pick(cell, ("ttft_sec", "total_sec", "prompt_tokens"), model, runtime, key)
+    elif payload.get("ok") and "avg_latency_sec" in payload:  # latency_probe
+        rows += pick(payload, LATENCY_METRICS, payload.get("model"), payload.get("runtime"))
+    return rows
+
+
+class ResultsStore:
+    """Append-only results database (one connection; use from one thread)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def record(self, tool: str, payload: Dict[str, Any], ts: Optional[float] = None) -> int:
+        """Insert one run and its measurements; returns the run id."""
+        when = ts if ts is not None else number(payload.get("timestamp")) or time.time()
+        host, info = host_fingerprint()
+        measurements = extract_measurements(tool, payload)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO hosts (fingerprint, info, first_seen) VALUES (?, ?, ?)",
+                (host, json.dumps(info, sort_keys=True), when),
+            )
+            ok = payload.get("ok")
+            cursor = self.conn.execute(
+                "INSERT INTO runs (ts, tool, schema_version, host, ok, payload)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    when,
+                    tool,
+                    payload.get("schema_version"),
+                    host,
+                    None if ok is None else int(bool(ok)),
+                    json.dumps(payload, separators=(",", ":")),
+                ),
+            )
+            run_id = int(cursor.lastrowid or 0)
+            self.conn.executemany(
+                "INSERT INTO measurements (run_id, ts, tool, host, model, runtime, metric, value)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, when, tool, host, m, r, metric, v) for m, r, metric, v in measurements],
+            )
+        return run_id
+
+    @staticmethod
+    def _filters(
+        metric: str,
+        filters: Dict[str, Optional[str]],
+        since: Optional[float],
+        until: Optional[float],
+    ) -> Tuple[str, List[Any]]:
+        clauses = ["metric = ?"]
+        params: List[Any] = [metric]
+        for column, value in filters.items():
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        return " AND ".join(clauses), params
+
+    def series(
+        self,
+        metric: str,
+        *,
+        model: Optional[str] = None,
+        runtime: Optional[str] = None,
+        host: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Measurements in time order, streamed from the cursor."""
+        where, params = self._filters(
+            metric, {"model": model, "runtime": runtime, "host": host}, since, until
+        )
+        cursor = self.conn.execute(
+            "SELECT ts, run_id, tool, host, model, runtime, value FROM measurements"
+            f" WHERE {where} ORDER BY ts",
+            params,
+        )
+        for ts, run_id, tool, host_fp, model_name, runtime_name, value in cursor:
+            yield {
+                "ts": ts,
+                "run_id": run_id,
+                "tool": tool,
+                "host": host_fp,
+                "model": model_name,
+                "runtime": runtime_name,
+                "value": value,
+            }
+
+    def aggregate(
+        self,
+        metric: str,
+        group_by: Sequence[str] = ("model",),
+        *,
+        model: Optional[str] = None,
+        runtime: Optional[str] = None,
+        host: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """count/mean/min/max/first/last timestamps of ``metric`` per group."""
+        bad = [c for c in group_by if c not in GROUP_COLUMNS]
+        if bad or not group_by:
+            raise ValueError(f"group_by must be drawn from {list(GROUP_COLUMNS)}, got {bad}")
+        where, params = self._filters(
+            metric, {"model": model, "runtime": runtime, "host": host}, since, until
+        )
+        columns = ", ".join(group_by)
+        cursor = self.conn.execute(
+            f"SELECT {columns}, COUNT(*), AVG(value), MIN(value), MAX(value), MIN(ts), MAX(ts)"
+            f" FROM measurements WHERE {where} GROUP BY {columns} ORDER BY {columns}",
+            params,
+        )
+        rows = []
+        for row in cursor:
+            keys = dict(zip(group_by, row[: len(group_by)], strict=True))
+            count, mean, low, high, first, last = row[len(group_by) :]
+            rows.append(
+                {
+                    **keys,
+                    "count": count,
+                    "mean": mean,
+                    "min": low,
+                    "max": high,
+                    "first_ts": first,
+                    "last_ts": last,
+                }
+            )
+        return rows
+
+    def latest_payload(
+        self,
+        schema_version: str,
+        host: Optional[str] = None,
+        exclude: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Most recent stored payload of ``schema_version`` that is not ``exclude``."""
+        clauses, params = ["schema_version = ?"], [schema_version]
+        if host is not None:
+            clauses.append("host = ?")
+            params.append(host)
+        cursor = self.conn.execute(
+            f"SELECT payload FROM runs WHERE {' AND '.join(clauses)} ORDER BY ts DESC, id DESC",
+            params,
+        )
+        for (text,) in cursor:
+            payload = json.loads(text)
+            if isinstance(payload, dict) and payload != exclude:
+                return payload
+        return None
+
+    def hosts(self) -> List[Dict[str, Any]]:
+        cursor = self.conn.execute(
+            "SELECT fingerprint, info, first_seen FROM hosts ORDER BY first_seen"
+        )
+        return [{"fingerprint": f, "first_seen": t, **json.loads(i)} for f, i, t in cursor]
+
+
+def add_store_arg(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--store",
+        nargs="?",
+        const=str(default_store_path()),
+        help="Append the result to the SQLite results store (default path if no value)",
+    )
+
+
+def store_result(path: Optional[str], tool: str, payload: Dict[str, Any]) -> None:
+    """Record ``payload`` when ``--store`` was given; storage errors only warn."""
+    if not path:
+        return
+    try:
+        store = ResultsStore(Path(path))
+        try:
+            store.record(tool, payload)
+        finally:
+            store.close()
+    except (OSError, sqlite3.Error) as exc:
+        print(f"WARN: could not record result in {path}: {exc}", file=sys.stderr)
+
+
+def parse_time(text: Optional[str]) -> Optional[float]:
+    """Epoch seconds or an ISO date/time (UTC when no offset is given)."""
+    if text is None:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parsed = datetime.datetime.fromisoformat(text)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=str(default_store_path()), help="Results database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record = sub.add_parser("record", help="Ingest an existing output file")
+    record.add_argument("--tool", required=True, help="Producing tool, e.g. runtime_probe")
+    record.add_argument("--input", required=True, help="JSON output file ('-' for stdin)")
+
+    for name in ("series", "aggregate"):
+        query = sub.add_parser(name)
+        query.add_argument("--metric", required=True)
+        query.add_argument("--model")
+        query.add_argument("--runtime")
+        query.add_argument("--host", help="Host fingerprint")
+        query.add_argument("--since", help="Epoch seconds or ISO date")
+        query.add_argument("--until", help="Epoch seconds or ISO date")
+        if name == "aggregate":
+            query.add_argument(
+                "--group-by", default="model", help="Comma list of model,runtime,host,tool"
+            )
+
+    sub.add_parser("hosts", help="List host fingerprints")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        store = ResultsStore(Path(args.db))
+    except (OSError, sqlite3.Error) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    try:
+        if args.command == "record":
+            if args.input == "-":
+                payload = json.loads(sys.stdin.read())
+            else:
+                payload = json.loads(Path(args.input).read_text(encoding="utf-8"))
+            if not isinstance(payload, dict):
+                raise ValueError("input must be a JSON object")
+            run_id = store.record(args.tool, payload)
+            print(json.dumps({"ok": True, "run_id": run_id}))
+        elif args.command == "series":
+            rows = store.series(
+                args.metric,
+                model=args.model,
+                runtime=args.runtime,
+                host=args.host,
+                since=parse_time(args.since),
+                until=parse_time(args.until),
+            )
+            for row in rows:
+                print(json.dumps(row))
+        elif args.command == "aggregate":
+            groups = store.aggregate(
+                args.metric,
+                [c.strip() for c in args.group_by.split(",") if c.strip()],
+                model=args.model,
+                runtime=args.runtime,
+                host=args.host,
+                since=parse_time(args.since),
+                until=parse_time(args.until),
+            )
+            print(json.dumps({"ok": True, "metric": args.metric, "groups": groups}, indent=2))
+        else:
+            print(json.dumps({"ok": True, "hosts": store.hosts()}, indent=2))
+    except (OSError, ValueError, sqlite3.Error) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,23 +1,61 @@
 #!/usr/bin/env python3
-"""Run tool-call and latency probes across multiple runtimes."""
+"""Run tool-call and latency probes across multiple runtimes.
+
+Each runtime/model pair is one task on a bounded thread pool (``--jobs``). A
+runtime admits ``max_concurrency`` models at once (default 1), and runtimes
+that list the same ``gpus`` index share that GPU serially; runtimes on other
+hosts or CPU backends probe in parallel. Results keep config order.
+
+With `--stream` (or `"stream": true` in the config) the latency iterations
+stream their output and `latency.stream` reports TTFT, inter-token latency
+and decode vs prefill throughput, as `latency_probe.py --stream` does.
+
+Latency sampling follows `latency_stats`: config `warmup` (default 1)
+iterations are discarded, `iterations` are kept, and with `target_ci` set
+sampling continues up to `max_iterations` until the CI is narrow enough.
+`latency.stats` carries percentiles, the CI and a histogram.
+"""
 
 from __future__ import annotations
 
 import argparse
+import functools
 import json
-import time
-import urllib.error
-import urllib.request
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Union
 
-from probe_common import create_add_tool_payload, validate_add_call
+from latency_stats import SamplingPlan, run_adaptive, summary_stats
+from probe_common import (
+    HttpClient,
+    ProbeError,
+    StreamResult,
+    Timing,
+    create_add_tool_payload,
+    default_client,
+    mean_timing,
+    stream_summary,
+    validate_add_call,
+)
+from probe_pool import DEFAULT_JOBS, ProbeTask, run_tasks, runtime_lanes
+from results_store import add_store_arg, store_result
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", required=True, help="Path to runtime config")
     parser.add_argument("--output", help="Optional JSON output path")
+    parser.add_argument(
+        "--jobs", type=int, default=DEFAULT_JOBS, help="Maximum concurrent model probes overall"
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop at the first failing model and abandon in-flight probes",
+    )
+    parser.add_argument(
+        "--stream", action="store_true", help="Stream latency iterations and report TTFT/ITL"
+    )
+    add_store_arg(parser)
     return parser.parse_args()
 
 
@@ -27,28 +65,20 @@ def load_config(path: Path) -> Dict[str, Any]:
     data.setdefault("latency_prompt", "Say hello in one sentence.")
     data.setdefault("iterations", 3)
     data.setdefault("timeout_sec", 60)
+    data.setdefault("stream", False)
+    data.setdefault("warmup", 1)
+    data.setdefault("target_ci", 0.0)
     return data
 
 
-def probe_tool_calls(url: str, model: str, timeout_sec: int) -> Dict[str, Any]:
+def probe_tool_calls(
+    url: str, model: str, timeout_sec: int, client: Optional[HttpClient] = None
+) -> Dict[str, Any]:
     payload = create_add_tool_payload(model)
-    request = urllib.request.Request(
-        url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
     try:
-        with urllib.request.urlopen(request, timeout=timeout_sec) as response:
-            data = json.loads(response.read().decode("utf-8"))
-    except urllib.error.HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="replace").strip()
-        detail = body or "no error body"
-        return {"ok": False, "error": f"HTTP {exc.code} ({detail})"}
-    except urllib.error.URLError as exc:
-        return {"ok": False, "error": f"URL error ({exc})"}
-    except TimeoutError as exc:
-        return {"ok": False, "error": f"timeout ({exc})"}
+        data, _ = (client or default_client()).post_json(url, payload, timeout_sec=timeout_sec)
+    except ProbeError as exc:
+        return {"ok": False, "error": str(exc)}
 
     message = data.get("choices", [{}])[0].get("message", {})
     ok, reason = validate_add_call(message)
@@ -57,72 +87,125 @@ def probe_tool_calls(url: str, model: str, timeout_sec: int) -> Dict[str, Any]:
     return {"ok": False, "error": reason}
 
 
-def probe_latency(url: str, model: str, prompt: str, iterations: int, timeout_sec: int) -> Dict[str, Any]:
+def probe_latency(
+    url: str,
+    model: str,
+    prompt: str,
+    iterations: int,
+    timeout_sec: int,
+    client: Optional[HttpClient] = None,
+    stream: bool = False,
+    plan: Optional[SamplingPlan] = None,
+) -> Dict[str, Any]:
+    """Latency summary; ``plan`` (default: ``iterations`` runs, no warm-up) sets sampling."""
     payload = {
         "model": model,
         "messages": [{"role": "user", "content": prompt}],
         "max_tokens": 64,
     }
-    request = urllib.request.Request(
-        url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    results: List[Dict[str, Any]] = []
-    missing_usage = False
-    for _ in range(iterations):
-        start = time.time()
-        try:
-            with urllib.request.urlopen(request, timeout=timeout_sec) as response:
-                data = json.loads(response.read().decode("utf-8"))
-        except urllib.error.HTTPError as exc:
-            body = exc.read().decode("utf-8", errors="replace").strip()
-            detail = body or "no error body"
-            return {"ok": False, "error": f"HTTP {exc.code} ({detail})"}
-        except urllib.error.URLError as exc:
-            return {"ok": False, "error": f"URL error ({exc})"}
-        except TimeoutError as exc:
-            return {"ok": False, "error": f"timeout ({exc})"}
-        elapsed = time.time() - start
-        usage = data.get("usage", {})
-        output_tokens: Optional[int]
-        tokens_per_sec: Optional[float]
-        if not isinstance(usage, dict) or "completion_tokens" not in usage:
-            missing_usage = True
-            output_tokens = None
-            tokens_per_sec = None
+    http_client = client or default_client()
+
+    def measure() -> Dict[str, Any]:
+        if stream:
+            streamed = http_client.stream_chat(url, payload, timeout_sec=timeout_sec)
+            data: Any = {"usage": streamed.usage()}
+            timing = streamed.timing
         else:
+            streamed = None
+            data, timing = http_client.post_json(url, payload, timeout_sec=timeout_sec)
+        elapsed = timing.total_sec
+        usage = data.get("usage", {})
+        output_tokens: Optional[int] = None
+        tokens_per_sec: Optional[float] = None
+        if isinstance(usage, dict) and "completion_tokens" in usage:
             output_tokens = int(usage.get("completion_tokens", 0))
             tokens_per_sec = None if elapsed == 0 else float(output_tokens / elapsed)
-        results.append(
-            {
-                "elapsed_sec": elapsed,
-                "output_tokens": output_tokens,
-                "tokens_per_sec": tokens_per_sec,
-            }
+        return {
+            "elapsed_sec": elapsed,
+            "output_tokens": output_tokens,
+            "tokens_per_sec": tokens_per_sec,
+            "timing": timing,
+            "stream": streamed,
+        }
+
+    try:
+        results, stats = run_adaptive(
+            measure, lambda r: r["elapsed_sec"], plan or SamplingPlan(0, iterations, iterations)
         )
+    except ProbeError as exc:
+        return {"ok": False, "error": str(exc)}
+    timings: List[Timing] = [r["timing"] for r in results]
+    streams: List[StreamResult] = [r["stream"] for r in results if r["stream"] is not None]
+    missing_usage = any(r["output_tokens"] is None for r in results)
 
-    avg_latency = sum(r["elapsed_sec"] for r in results) / len(results)
-    tps_values = [r["tokens_per_sec"] for r in results if isinstance(r.get("tokens_per_sec"), (int, float))]
+    tps_values = [
+        r["tokens_per_sec"] for r in results if isinstance(r.get("tokens_per_sec"), (int, float))
+    ]
     avg_tps: Optional[float] = None
     if tps_values:
         avg_tps = sum(float(v) for v in tps_values) / len(tps_values)
-    return {
+    summary = {
         "ok": True,
-        "avg_latency_sec": avg_latency,
+        "avg_latency_sec": stats.mean,
         "avg_tokens_per_sec": avg_tps,
-        "iterations": iterations,
+        "iterations": len(results),
         "usage_missing": missing_usage,
+        "timing": mean_timing(timings),
+        "stats": stats.to_dict(),
+        "tokens_per_sec_stats": summary_stats([float(v) for v in tps_values]),
     }
+    if stream:
+        summary["stream"] = stream_summary(streams)
+    return summary
+
+
+def sampling_plan(config: Dict[str, Any]) -> SamplingPlan:
+    iterations = int(config["iterations"])
+    return SamplingPlan(
+        warmup=int(config["warmup"]),
+        min_iterations=iterations,
+        max_iterations=max(int(config.get("max_iterations") or iterations), iterations),
+        target_rel_ci=float(config["target_ci"]),
+    )
+
+
+def probe_model(runtime: str, url: str, model: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    tool_result = probe_tool_calls(url, model, config["timeout_sec"])
+    latency_result = probe_latency(
+        url,
+        model,
+        config["latency_prompt"],
+        config["iterations"],
+        config["timeout_sec"],
+        stream=bool(config["stream"]),
+        plan=sampling_plan(config),
+    )
+    return {
+        "runtime": runtime,
+        "url": url,
+        "model": model,
+        "tool_calls": tool_result,
+        "latency": latency_result,
+    }
+
+
+def entry_failed(entry: Dict[str, Any]) -> bool:
+    return not entry["tool_calls"].get("ok") or not entry["latency"].get("ok")
 
 
 def main() -> int:
     args = parse_args()
     config = load_config(Path(args.config))
+    if args.stream:
+        config["stream"] = True
     results: List[Dict[str, Any]] = []
     failures: List[Dict[str, str]] = []
 
+    # Config order: each slot is a task index or a config failure.
+    slots: List[Union[int, Dict[str, str]]] = []
+    tasks: List[ProbeTask[Dict[str, Any]]] = []
+    task_keys: List[Dict[str, str]] = []
+    lane_limits: Dict[str, int] = {}
     for runtime in config["runtimes"]:
         if runtime.get("enabled") is False:
             continue
@@ -130,36 +213,57 @@ def main() -> int:
         url = runtime.get("url")
         models = runtime.get("models", [])
         if not url or not models:
-            failures.append({"runtime": name, "error": "missing url or models"})
+            slots.append({"runtime": name, "error": "missing url or models"})
             continue
-
+        lanes, limits = runtime_lanes(runtime)
+        lane_limits.update(limits)
         for model in models:
-            tool_result = probe_tool_calls(url, model, config["timeout_sec"])
-            latency_result = probe_latency(
-                url, model, config["latency_prompt"], config["iterations"], config["timeout_sec"]
+            slots.append(len(tasks))
+            task_keys.append({"runtime": name, "model": model})
+            tasks.append(
+                ProbeTask(lanes=lanes, run=functools.partial(probe_model, name, url, model, config))
             )
-            entry = {
-                "runtime": name,
-                "url": url,
-                "model": model,
-                "tool_calls": tool_result,
-                "latency": latency_result,
-            }
-            results.append(entry)
-            if not tool_result.get("ok") or not latency_result.get("ok"):
-                failures.append(
-                    {
-                        "runtime": name,
-                        "model": model,
-                        "error": tool_result.get("error") or latency_result.get("error") or "unknown error",
-                    }
-                )
-
-    summary = {"schema_version": "runtime-probe-v1", "results": results, "failures": failures}
+
+    outcome = run_tasks(
+        tasks,
+        jobs=args.jobs,
+        lane_limits=lane_limits,
+        fail_fast=args.fail_fast,
+        failed=entry_failed,
+    )
+    for slot in slots:
+        if isinstance(slot, dict):
+            failures.append(slot)
+            continue
+        entry: Optional[Dict[str, Any]] = outcome.results[slot]
+        if entry is None:
+            continue
+        results.append(entry)
+        if entry_failed(entry):
+            tool_result = entry["tool_calls"]
+            latency_result = entry["latency"]
+            failures.append(
+                {
+                    "runtime": entry["runtime"],
+                    "model": entry["model"],
+                    "error": tool_result.get("error")
+                    or latency_result.get("error")
+                    or "unknown error",
+                }
+            )
+
+    summary: Dict[str, Any] = {
+        "schema_version": "runtime-probe-v1",
+        "results": results,
+        "failures": failures,
+    }
+    if outcome.stopped:
+        summary["cancelled"] = [task_keys[index] for index in outcome.cancelled()]
     output = json.dumps(summary, indent=2)
     print(output)
     if args.output:
         Path(args.output).write_text(output, encoding="utf-8")
+    store_result(args.store, "runtime_probe", summary)
 
     return 1 if failures else 0
 
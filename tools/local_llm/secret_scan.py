@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Detect secrets in file contents before a task is routed to a local model.
+
+Each file is memory-mapped and scanned once by a single combined regex
+covering key prefixes (AWS, GitHub, Anthropic, Slack, Google), PEM private
+key headers and `key/secret/token/password = <value>` assignments, whose value
+must also pass a Shannon entropy check. Every alternative starts with a
+literal, so the regex engine skips ahead on the first byte instead of trying
+each position; the scan stops at the first confirmed hit.
+
+Results (including "clean") are cached by path + mtime + size, so repeated
+routing of the same working tree costs one ``stat`` per file. A regular file
+that cannot be read or mapped, or whose first ``max_bytes`` are clean but which
+is larger than that, is reported as an ``unscannable`` finding, so the gate
+fails closed, and is never cached.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import re
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple
+
+from file_cache import StatCache, default_cache_dir, stat_key
+
+DEFAULT_MAX_BYTES = 32 << 20
+BINARY_SNIFF_BYTES = 8192
+MIN_ENTROPY_BITS = 3.8
+
+ASSIGNMENT_WORDS = ("key", "secret", "token", "passwd", "password")
+ASSIGNMENT_TAIL = rb"[\w.-]*[\"']?\s*[:=]\s*[\"']?([A-Za-z0-9+/=_-]{20,})"
+
+# (kind, literal heads, tail). The combined regex is head + tail for every head.
+DETECTORS: List[Tuple[str, Tuple[bytes, ...], bytes]] = [
+    ("aws_access_key", (b"AKIA", b"ASIA"), rb"[0-9A-Z]{16}"),
+    ("private_key", (b"-----BEGIN ",), rb"[A-Z0-9 ]*PRIVATE KEY-----"),
+    ("github_token", (b"ghp_", b"gho_", b"ghu_", b"ghs_", b"ghr_"), rb"[A-Za-z0-9]{36,}"),
+    ("github_token", (b"github_pat_",), rb"[A-Za-z0-9_]{60,}"),
+    ("anthropic_key", (b"sk-ant-",), rb"[A-Za-z0-9_-]{20,}"),
+    ("slack_token", (b"xoxa-", b"xoxb-", b"xoxp-", b"xoxr-", b"xoxs-"), rb"[A-Za-z0-9-]{10,}"),
+    ("google_api_key", (b"AIza",), rb"[0-9A-Za-z_-]{35}"),
+    (
+        "high_entropy_assignment",
+        tuple(
+            variant
+            for word in ASSIGNMENT_WORDS
+            for variant in dict.fromkeys(
+                (word.encode(), word.capitalize().encode(), word.upper().encode())
+            )
+        ),
+        ASSIGNMENT_TAIL,
+    ),
+]
+ENTROPY_KINDS = frozenset({"high_entropy_assignment"})
+UNSCANNABLE = "unscannable"
+
+
+@dataclass(frozen=True)
+class Finding:
+    path: str
+    kind: str
+    line: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def compile_detectors() -> Tuple[Pattern[bytes], List[Tuple[bytes, str, Pattern[bytes]]]]:
+    """Combined scan regex plus (head, kind, anchored regex) to classify each match.
+
+    The combined regex uses no named groups: they disable the literal-prefix
+    fast path, which costs roughly 20x in scan throughput.
+    """
+    alternatives: List[bytes] = []
+    heads: List[Tuple[bytes, str, Pattern[bytes]]] = []
+    for kind, literals, tail in DETECTORS:
+        for head in literals:
+            alternatives.append(head + tail)
+            heads.append((head, kind, re.compile(head + tail)))
+    return re.compile(b"|".join(alternatives)), heads
+
+
+SCAN_REGEX, MATCH_HEADS = compile_detectors()
+FINGERPRINT = hashlib.sha256(SCAN_REGEX.pattern + str(MIN_ENTROPY_BITS).encode()).hexdigest()[:16]
+
+
+def shannon_entropy(value: bytes) -> float:
+    if not value:
+        return 0.0
+    size = len(value)
+    return -sum(n / size * math.log2(n / size) for n in Counter(value).values())
+
+
+def classify_match(data: Any, start: int) -> Optional[str]:
+    """Kind of the match at ``start``, or None if an entropy check rejects it."""
+    for head, kind, regex in MATCH_HEADS:
+        if data[start : start + len(head)] != head:
+            continue
+        match = regex.match(data, start)
+        if match is None:
+            continue
+        if kind in ENTROPY_KINDS and shannon_entropy(match.group(1)) < MIN_ENTROPY_BITS:
+            return None
+        return kind
+    return None
+
+
+def scan_buffer(data: Any, end: int) -> Optional[Tuple[str, int]]:
+    """First confirmed (kind, byte offset) in ``data[:end]``.
+
+    After a rejected candidate the search resumes one byte later (not after the
+    match), so a low-entropy assignment cannot hide a key prefix inside it.
+    """
+    pos = 0
+    while True:
+        match = SCAN_REGEX.search(data, pos, end)
+        if match is None:
+            return None
+        kind = classify_match(data, match.start())
+        if kind is not None:
+            return kind, match.start()
+        pos = match.start() + 1
+
+
+class SecretScanner:
+    """Scan files for secrets with a per-file stat cache; stops at the first hit."""
+
+    def __init__(
+        self, cache: Optional[StatCache] = None, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> None:
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.files_scanned = 0
+        self.bytes_scanned = 0
+
+    def scan_file(self, path: str) -> Optional[Finding]:
+        key = stat_key(path)
+        if key is None:
+            return None
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if isinstance(cached, list):
+                return Finding(path=path, kind=cached[0], line=cached[1]) if cached else None
+        result = self._scan_uncached(path, key[2])
+        if self.cache is not None and (result is None or result.kind != UNSCANNABLE):
+            self.cache.put(key, [result.kind, result.line] if result else [])
+        return result
+
+    def _scan_uncached(self, path: str, size: int) -> Optional[Finding]:
+        if size == 0:
+            return None
+        try:
+            with (
+                open(path, "rb") as handle,
+                mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data,
+            ):
+                if data.find(b"\0", 0, BINARY_SNIFF_BYTES) != -1:
+                    return None
+                end = min(size, self.max_bytes)
+                self.files_scanned += 1
+                self.bytes_scanned += end
+                hit = scan_buffer(data, end)
+                if hit is None:
+                    # A clean prefix says nothing about the unscanned tail.
+                    return Finding(path=path, kind=UNSCANNABLE, line=0) if size > end else None
+                kind, offset = hit
+                line = data[:offset].count(b"\n") + 1
+                return Finding(path=path, kind=kind, line=line)
+        except IsADirectoryError:
+            return None
+        except (OSError, ValueError):
+            # Unreadable, unmappable or deleted mid-scan: not known to be clean.
+            return Finding(path=path, kind=UNSCANNABLE, line=0)
+
+    def scan_paths(self, paths: Iterable[str]) -> Optional[Finding]:
+        for path in paths:
+            finding = self.scan_file(path)
+            if finding is not None:
+                return finding
+        return None
+
+    def first_finding(self, paths: List[str]) -> Optional[Dict[str, Any]]:
+        """Policy engine hook: the first finding as a dict, or None."""
+        finding = self.scan_paths(paths)
+        return finding.to_dict() if finding is not None else None
+
+
+def open_cache(path: Optional[Path]) -> StatCache:
+    return StatCache(path, fingerprint=f"secret-scan-v1:{FINGERPRINT}")
+
+
+def default_cache_path() -> Path:
+    return default_cache_dir() / "secret_scan.json"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paths", nargs="+", required=True, help="Files to scan")
+    parser.add_argument("--cache", default=str(default_cache_path()), help="Scan result cache")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the cache")
+    parser.add_argument("--all", action="store_true", help="Report every file with a hit")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    started = time.perf_counter()
+    cache = None if args.no_cache else open_cache(Path(args.cache))
+    scanner = SecretScanner(cache, max_bytes=args.max_bytes)
+    findings: List[Finding] = []
+    if args.all:
+        findings = [f for f in (scanner.scan_file(p) for p in args.paths) if f is not None]
+    else:
+        first = scanner.scan_paths(args.paths)
+        findings = [first] if first is not None else []
+    if cache is not None:
+        cache.save()
+    payload = {
+        "ok": not findings,
+        "findings": [f.to_dict() for f in findings],
+        "files_scanned": scanner.files_scanned,
+        "bytes_scanned": scanner.bytes_scanned,
+        "cache_hits": cache.hits if cache is not None else 0,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+    print(json.dumps(payload, indent=2))
+    return 0 if not findings else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
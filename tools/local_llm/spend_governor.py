@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Rolling-window spend tracking and a budget-pressure routing signal.
+
+Usage records (`{"input_tokens", "output_tokens", "route"?, "ts"?}`, where
+`route: "local"` bills at `local_cost_per_mtok` and anything else at Claude
+`Pricing`, the same math as `cost_model.compute_costs`) are added to a ring of
+`buckets` time buckets spanning `window_sec`. The ring keeps a running total,
+so state is fixed per window and reading the spend costs O(1) plus clearing
+buckets that expired since the last update.
+
+Budget pressure is window spend divided by `budget_usd`. At or above
+`pressure_threshold` the policy engine relaxes `claude_first` decisions whose
+reason is in `relax_reasons` and lets them route local (reason
+`budget_pressure`). `claude_only` is never relaxed, and capacity reasons
+(VRAM, placement, saturation) cannot be listed.
+
+Rules block:
+  "budget": {"budget_usd": 5.0, "window_sec": 3600, "buckets": 60,
+             "pressure_threshold": 1.0, "relax_reasons": ["long_context"]}
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional
+
+import cost_model
+
+DEFAULT_PRICING_PATH = Path(__file__).resolve().parent / "scenarios.json"
+DEFAULT_RELAX_REASONS = ("long_context", "task_tier_l2")
+CAPACITY_REASONS = frozenset(
+    {"missing_vram_signal", "low_vram", "no_local_capacity", "local_saturated"}
+)
+
+
+@dataclass(frozen=True)
+class BudgetConfig:
+    budget_usd: float
+    window_sec: float
+    buckets: int = 60
+    pressure_threshold: float = 1.0
+    relax_reasons: FrozenSet[str] = frozenset(DEFAULT_RELAX_REASONS)
+
+    def relaxes(self, decision: Dict[str, Any], pressure: Optional[float]) -> bool:
+        return (
+            pressure is not None
+            and pressure >= self.pressure_threshold
+            and decision.get("route") == "claude_first"
+            and decision.get("reason") in self.relax_reasons
+        )
+
+
+def parse_budget(data: Any) -> Optional[BudgetConfig]:
+    """The rules `budget` block, or None when absent."""
+    if data is None:
+        return None
+    if not isinstance(data, dict):
+        raise ValueError("budget must be an object")
+    budget_usd = float(data.get("budget_usd", 0))
+    window_sec = float(data.get("window_sec", 3600))
+    buckets = int(data.get("buckets", 60))
+    if budget_usd <= 0 or window_sec <= 0 or buckets <= 0:
+        raise ValueError("budget_usd, window_sec and buckets must be positive")
+    reasons = data.get("relax_reasons", list(DEFAULT_RELAX_REASONS))
+    if not isinstance(reasons, list) or not all(isinstance(r, str) for r in reasons):
+        raise ValueError("budget.relax_reasons must be a string array")
+    blocked = sorted(CAPACITY_REASONS.intersection(reasons))
+    if blocked:
+        raise ValueError(f"budget.relax_reasons cannot relax capacity reasons: {blocked}")
+    return BudgetConfig(
+        budget_usd=budget_usd,
+        window_sec=window_sec,
+        buckets=buckets,
+        pressure_threshold=float(data.get("pressure_threshold", 1.0)),
+        relax_reasons=frozenset(reasons),
+    )
+
+
+class SpendWindow:
+    """Sum of values over the trailing ``window_sec``, in ``buckets`` ring slots."""
+
+    def __init__(self, window_sec: float, buckets: int) -> None:
+        self.bucket_sec = window_sec / buckets
+        self.size = buckets
+        self._values = [0.0] * buckets
+        self._total = 0.0
+        self._head: Optional[int] = None  # newest bucket epoch seen
+
+    def _advance(self, epoch: int) -> None:
+        if self._head is None:
+            self._head = epoch
+            return
+        if epoch <= self._head:
+            return
+        for step in range(self._head + 1, min(epoch, self._head + self.size) + 1):
+            slot = step % self.size
+            self._total -= self._values[slot]
+            self._values[slot] = 0.0
+        self._head = epoch
+        if self._total < 1e-12:
+            self._total = 0.0  # drop float drift once the window empties
+
+    def add(self, ts: float, value: float) -> bool:
+        """Add ``value`` at ``ts``; False if ``ts`` is already outside the window."""
+        epoch = int(ts // self.bucket_sec)
+        self._advance(epoch)
+        assert self._head is not None
+        if epoch <= self._head - self.size:
+            return False
+        self._values[epoch % self.size] += value
+        self._total += value
+        return True
+
+    def total(self, now: float) -> float:
+        self._advance(int(now // self.bucket_sec))
+        return self._total
+
+
+class SpendGovernor:
+    """Thread-safe spend window over usage records plus the derived budget pressure."""
+
+    def __init__(
+        self, config: BudgetConfig, pricing: cost_model.Pricing, local_cost_per_mtok: float
+    ) -> None:
+        self.config = config
+        self.pricing = pricing
+        self.local_cost_per_mtok = local_cost_per_mtok
+        self._window = SpendWindow(config.window_sec, config.buckets)
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def cost(self, input_tokens: int, output_tokens: int, route: str) -> float:
+        if route == "local":
+            return cost_model.mtok(input_tokens + output_tokens) * self.local_cost_per_mtok
+        return cost_model.claude_cost(self.pricing, input_tokens, output_tokens)
+
+    def record(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        route: str = "claude",
+        ts: Optional[float] = None,
+    ) -> float:
+        cost = self.cost(input_tokens, output_tokens, route)
+        with self._lock:
+            if self._window.add(time.time() if ts is None else ts, cost):
+                self.records += 1
+        return cost
+
+    def record_usage(self, record: Any) -> float:
+        """Validate and add one usage record (JSON object); returns its cost."""
+        if not isinstance(record, dict):
+            raise ValueError("usage record must be an object")
+        values: Dict[str, float] = {}
+        for key in ("input_tokens", "output_tokens"):
+            value = record.get(key, 0)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                raise ValueError(f"{key} must be a non-negative number")
+            values[key] = value
+        ts = record.get("ts")
+        if ts is not None and (isinstance(ts, bool) or not isinstance(ts, (int, float))):
+            raise ValueError("ts must be a number (epoch seconds)")
+        route = record.get("route", "claude")
+        if not isinstance(route, str):
+            raise ValueError("route must be a string")
+        return self.record(int(values["input_tokens"]), int(values["output_tokens"]), route, ts)
+
+    def spend(self, now: Optional[float] = None) -> float:
+        with self._lock:
+            return self._window.total(time.time() if now is None else now)
+
+    def pressure(self, now: Optional[float] = None) -> float:
+        return self.spend(now) / self.config.budget_usd
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        spend = self.spend(now)
+        pressure = spend / self.config.budget_usd
+        return {
+            "spend_usd": round(spend, 6),
+            "budget_usd": self.config.budget_usd,
+            "window_sec": self.config.window_sec,
+            "pressure": round(pressure, 4),
+            "relaxing": pressure >= self.config.pressure_threshold,
+            "records": self.records,
+        }
+
+
+def load_governor(budget: BudgetConfig, pricing_path: Path) -> SpendGovernor:
+    config = cost_model.load_config(pricing_path)
+    return SpendGovernor(
+        budget,
+        cost_model.parse_pricing(config["claude_pricing"]),
+        float(config["local_cost_per_mtok"]),
+    )
+
+
+def replay_usage(governor: SpendGovernor, lines: List[str]) -> int:
+    """Feed JSONL usage lines to the governor; returns the number of invalid lines."""
+    errors = 0
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            governor.record_usage(json.loads(line))
+        except (json.JSONDecodeError, ValueError) as exc:
+            errors += 1
+            print(f"WARN: usage line {line_no}: {exc}", file=sys.stderr)
+    return errors
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", required=True, help="Policy rules JSON with a budget block")
+    parser.add_argument("--usage-log", required=True, help="JSONL usage records ('-' for stdin)")
+    parser.add_argument(
+        "--pricing",
+        default=str(DEFAULT_PRICING_PATH),
+        help="JSON with claude_pricing and local_cost_per_mtok (scenarios.json)",
+    )
+    parser.add_argument("--now", type=float, help="Evaluate the window at this epoch time")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    rules = json.loads(Path(args.rules).read_text(encoding="utf-8"))
+    try:
+        budget = parse_budget(rules.get("budget"))
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    if budget is None:
+        print("ERROR: rules have no budget block", file=sys.stderr)
+        return 2
+    governor = load_governor(budget, Path(args.pricing))
+    if args.usage_log == "-":
+        lines = sys.stdin.readlines()
+    else:
+        lines = Path(args.usage_log).read_text(encoding="utf-8").splitlines()
+    errors = replay_usage(governor, lines)
+    payload = {"ok": errors == 0, "errors": errors, **governor.snapshot(args.now)}
+    print(json.dumps(payload, indent=2))
+    return 0 if errors == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
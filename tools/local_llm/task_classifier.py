@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Assign an L0-L3 task tier (docs/task-classification.md) from prompt, paths and tools.
+
+Features are binary and declared in `task_classifier_weights.json`:
+- `keyword`: word-bounded regexes over the lowercased prompt (write them in
+  lowercase); all keyword patterns are compiled into one alternation grouped
+  by first character, so the prompt is scanned once and each word start only
+  tries the patterns that can match it
+- `path`: glob lists over the task paths (same normalization as the policy engine)
+- `path_count`: at least `min` paths
+- `tool`: any of the listed tool names in the task's tool mix
+
+Each tier scores `bias + sum(weight[feature])` over the active features and the
+highest score wins (ties go to the higher tier). Only the first
+`max_prompt_chars` of the prompt are scanned (the task instruction, not the
+attached context); prompt features are cached by prompt hash, so repeat
+classification of the same prompt skips the scan.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Pattern, Tuple
+
+DEFAULT_WEIGHTS_PATH = Path(__file__).resolve().parent / "task_classifier_weights.json"
+FEATURE_KINDS = ("keyword", "path", "path_count", "tool")
+
+
+@dataclass(frozen=True)
+class Classification:
+    tier: str
+    scores: Dict[str, float]
+    features: Tuple[str, ...]
+    cached: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tier": self.tier,
+            "scores": {k: round(v, 4) for k, v in self.scores.items()},
+            "features": list(self.features),
+            "cached": self.cached,
+        }
+
+
+@dataclass(frozen=True)
+class PathFeature:
+    name: str
+    regex: Pattern[str]
+
+
+@dataclass(frozen=True)
+class ClassifierModel:
+    tiers: Tuple[str, ...]
+    weights: Dict[str, Dict[str, float]]
+    keyword_regex: Optional[Pattern[str]]
+    keyword_groups: Dict[str, str]
+    path_features: Tuple[PathFeature, ...]
+    path_count_features: Tuple[Tuple[str, int], ...]
+    tool_features: Dict[str, FrozenSet[str]] = field(default_factory=dict)
+    max_prompt_chars: int = 4096
+    fingerprint: str = ""
+
+
+def path_key(path: str) -> str:
+    return os.path.normcase(path.replace("\\", "/").replace("//", "/"))
+
+
+def compile_keywords(
+    keywords: List[Tuple[str, str]],
+) -> Tuple[Optional[Pattern[str]], Dict[str, str]]:
+    """One regex for all (feature, pattern) pairs, factored on the first literal character.
+
+    Returns the regex and a map from its named groups to feature names.
+    """
+    by_first: Dict[str, List[str]] = {}
+    other: List[str] = []
+    groups: Dict[str, str] = {}
+    for feature, pattern in keywords:
+        group = f"k{len(groups)}"
+        groups[group] = feature
+        head, rest = pattern[:1], pattern[1:]
+        quantified = rest[:1] in ("?", "*", "+", "{")
+        if head.isalnum() and "|" not in pattern and not quantified:
+            by_first.setdefault(head.lower(), []).append(f"(?P<{group}>{rest})")
+        else:
+            other.append(f"(?P<{group}>{pattern})")
+    if not groups:
+        return None, groups
+    branches = [
+        re.escape(head) + f"(?:{'|'.join(rests)})" for head, rests in sorted(by_first.items())
+    ]
+    return re.compile(rf"\b(?:{'|'.join(branches + other)})\b"), groups
+
+
+def compile_model(data: Dict[str, Any], fingerprint: str = "") -> ClassifierModel:
+    tiers = tuple(str(t) for t in data.get("tiers", []))
+    if not tiers:
+        raise ValueError("classifier model must list tiers")
+    weights = {
+        str(tier): {str(k): float(v) for k, v in data.get("weights", {}).get(tier, {}).items()}
+        for tier in tiers
+    }
+    keywords: List[Tuple[str, str]] = []
+    path_features: List[PathFeature] = []
+    path_counts: List[Tuple[str, int]] = []
+    tools: Dict[str, FrozenSet[str]] = {}
+    for name, spec in data.get("features", {}).items():
+        kind = spec.get("kind")
+        patterns = [str(p) for p in spec.get("patterns", [])]
+        if kind not in FEATURE_KINDS:
+            raise ValueError(f"feature {name}: unknown kind {kind!r}")
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name):
+            raise ValueError(f"feature {name}: name must be an identifier")
+        if kind == "keyword":
+            keywords.extend((name, p) for p in patterns)
+        elif kind == "path" and patterns:
+            translated = "|".join(fnmatch.translate(path_key(p)) for p in patterns)
+            path_features.append(PathFeature(name=name, regex=re.compile(translated)))
+        elif kind == "path_count":
+            path_counts.append((name, int(spec.get("min", 1))))
+        elif kind == "tool":
+            tools[name] = frozenset(p.lower() for p in patterns)
+    keyword_regex, keyword_groups = compile_keywords(keywords)
+    return ClassifierModel(
+        tiers=tiers,
+        weights=weights,
+        keyword_regex=keyword_regex,
+        keyword_groups=keyword_groups,
+        path_features=tuple(path_features),
+        path_count_features=tuple(path_counts),
+        tool_features=tools,
+        max_prompt_chars=int(data.get("max_prompt_chars", 4096)),
+        fingerprint=fingerprint,
+    )
+
+
+def load_model(path: Path = DEFAULT_WEIGHTS_PATH) -> ClassifierModel:
+    raw = path.read_text(encoding="utf-8")
+    return compile_model(json.loads(raw), hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16])
+
+
+class TaskClassifier:
+    """Thread-safe classifier with an LRU of prompt features keyed by prompt hash."""
+
+    def __init__(self, model: ClassifierModel, cache_size: int = 4096) -> None:
+        self.model = model
+        self.cache_size = cache_size
+        self._cache: OrderedDict[bytes, FrozenSet[str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def prompt_features(self, prompt: str) -> Tuple[FrozenSet[str], bool]:
+        regex = self.model.keyword_regex
+        if not prompt or regex is None:
+            return frozenset(), False
+        text = prompt[: self.model.max_prompt_chars]
+        raw = text.encode("utf-8", errors="surrogatepass")
+        key = hashlib.blake2b(raw, digest_size=16).digest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key], True
+            self.misses += 1
+        groups = self.model.keyword_groups
+        found = frozenset(groups[m.lastgroup] for m in regex.finditer(text.lower()) if m.lastgroup)
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[key] = found
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return found, False
+
+    def features(
+        self, prompt: str, paths: List[str], tools: List[str]
+    ) -> Tuple[FrozenSet[str], bool]:
+        active, cached = self.prompt_features(prompt)
+        extra = set()
+        if paths:
+            keys = [path_key(p) for p in paths]
+            for feature in self.model.path_features:
+                if any(feature.regex.match(k) for k in keys):
+                    extra.add(feature.name)
+        for name, minimum in self.model.path_count_features:
+            if len(paths) >= minimum:
+                extra.add(name)
+        if tools:
+            names = {t.lower() for t in tools}
+            for name, wanted in self.model.tool_features.items():
+                if names & wanted:
+                    extra.add(name)
+        return active | extra, cached
+
+    def classify(
+        self, prompt: str = "", paths: Optional[List[str]] = None, tools: Optional[List[str]] = None
+    ) -> Classification:
+        active, cached = self.features(prompt, paths or [], tools or [])
+        scores: Dict[str, float] = {}
+        for tier in self.model.tiers:
+            weights = self.model.weights[tier]
+            scores[tier] = weights.get("bias", 0.0) + sum(weights.get(f, 0.0) for f in active)
+        # Iterate high tier first so ties escalate.
+        tier = max(reversed(self.model.tiers), key=lambda t: scores[t])
+        return Classification(
+            tier=tier, scores=scores, features=tuple(sorted(active)), cached=cached
+        )
+
+
+def load_classifier(path: Path = DEFAULT_WEIGHTS_PATH, cache_size: int = 4096) -> TaskClassifier:
+    return TaskClassifier(load_model(path), cache_size=cache_size)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    prompt = parser.add_mutually_exclusive_group()
+    prompt.add_argument("--prompt", default="", help="Task prompt text")
+    prompt.add_argument("--prompt-file", help="Read the task prompt from a file ('-' for stdin)")
+    parser.add_argument("--paths", nargs="*", default=[], help="Task file paths")
+    parser.add_argument("--tools", nargs="*", default=[], help="Tool names available to the task")
+    parser.add_argument("--weights", default=str(DEFAULT_WEIGHTS_PATH), help="Classifier JSON")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    text = args.prompt
+    if args.prompt_file == "-":
+        text = sys.stdin.read()
+    elif args.prompt_file:
+        text = Path(args.prompt_file).read_text(encoding="utf-8")
+    try:
+        classifier = load_classifier(Path(args.weights))
+    except (OSError, ValueError, re.error) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    started = time.perf_counter()
+    result = classifier.classify(text, args.paths, args.tools)
+    payload = {"ok": True, **result.to_dict()}
+    payload["duration_us"] = round((time.perf_counter() - started) * 1e6, 1)
+    print(json.dumps(payload, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
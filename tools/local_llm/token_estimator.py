@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Estimate prompt tokens for a set of files without a tokenizer dependency.
+
+Each file is streamed once to count ASCII vs non-ASCII bytes (and detect
+binaries); tokens are derived from a per-extension bytes-per-token model
+(`token_model.json`). Estimates are cached by path + mtime + size, so repeat
+runs over the same tree cost one ``stat`` per file.
+
+Optionally calibrate the model against a local tokenizer vocab file
+(`tokenizer.json` or a plain token->id JSON map) with ``--calibrate-vocab``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from file_cache import StatCache, default_cache_dir, stat_key
+
+DEFAULT_MODEL_PATH = Path(__file__).resolve().parent / "token_model.json"
+CHUNK_BYTES = 1 << 16
+ASCII_BYTES = bytes(range(128))
+CALIBRATION_SAMPLE_BYTES = 1 << 16
+NO_SUFFIX = "<none>"  # model key for files without an extension
+
+
+def suffix_key(path: str) -> str:
+    return os.path.splitext(path)[1].lower() or NO_SUFFIX
+
+
+@dataclass(frozen=True)
+class TokenModel:
+    default_bytes_per_token: float
+    non_ascii_bytes_per_token: float
+    bytes_per_token: Dict[str, float] = field(default_factory=dict)
+    fingerprint: str = ""
+
+    def ratio_for(self, path: str) -> float:
+        suffix = suffix_key(path)
+        return self.bytes_per_token.get(suffix, self.default_bytes_per_token)
+
+
+@dataclass(frozen=True)
+class FileEstimate:
+    path: str
+    tokens: int
+    size: int
+    binary: bool = False
+    missing: bool = False
+    cached: bool = False
+
+
+def load_model(path: Path = DEFAULT_MODEL_PATH) -> TokenModel:
+    raw = path.read_text(encoding="utf-8")
+    data = json.loads(raw)
+    return TokenModel(
+        default_bytes_per_token=float(data.get("default_bytes_per_token", 4.0)),
+        non_ascii_bytes_per_token=float(data.get("non_ascii_bytes_per_token", 2.0)),
+        bytes_per_token={k.lower(): float(v) for k, v in data.get("bytes_per_token", {}).items()},
+        fingerprint=hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16],
+    )
+
+
+def open_cache(path: Optional[Path], model: TokenModel) -> StatCache:
+    return StatCache(path, fingerprint=f"token-estimator-v1:{model.fingerprint}")
+
+
+def default_cache_path() -> Path:
+    return default_cache_dir() / "token_estimates.json"
+
+
+def scan_bytes(path: str) -> Tuple[int, int, bool]:
+    """Stream a file; return (ascii_bytes, non_ascii_bytes, is_binary)."""
+    ascii_bytes = 0
+    non_ascii = 0
+    with open(path, "rb") as handle:
+        first = True
+        while True:
+            chunk = handle.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            if first and b"\0" in chunk:
+                return 0, 0, True
+            first = False
+            high = len(chunk.translate(None, ASCII_BYTES))
+            non_ascii += high
+            ascii_bytes += len(chunk) - high
+    return ascii_bytes, non_ascii, False
+
+
+def estimate_file(path: str, model: TokenModel, cache: Optional[StatCache] = None) -> FileEstimate:
+    key = stat_key(path)
+    if key is None:
+        return FileEstimate(path=path, tokens=0, size=0, missing=True)
+    if cache is not None:
+        hit = cache.get(key)
+        if isinstance(hit, list) and len(hit) == 2:
+            return FileEstimate(
+                path=path, tokens=int(hit[0]), size=key[2], binary=bool(hit[1]), cached=True
+            )
+    try:
+        ascii_bytes, non_ascii, binary = scan_bytes(path)
+    except (IsADirectoryError, PermissionError, OSError):
+        return FileEstimate(path=path, tokens=0, size=0, missing=True)
+    tokens = 0
+    if not binary:
+        tokens = round(
+            ascii_bytes / model.ratio_for(path) + non_ascii / model.non_ascii_bytes_per_token
+        )
+    if cache is not None:
+        cache.put(key, [tokens, binary])
+    return FileEstimate(path=path, tokens=tokens, size=key[2], binary=binary)
+
+
+def estimate_paths(
+    paths: Iterable[str], model: TokenModel, cache: Optional[StatCache] = None
+) -> Tuple[int, List[FileEstimate]]:
+    estimates = [estimate_file(p, model, cache) for p in paths]
+    return sum(e.tokens for e in estimates), estimates
+
+
+def total_tokens(paths: Iterable[str], model: TokenModel, cache: Optional[StatCache] = None) -> int:
+    return estimate_paths(paths, model, cache)[0]
+
+
+def load_vocab(path: Path) -> List[str]:
+    """Load token strings from a HF tokenizer.json, a token->id map, or a list."""
+    data: Any = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, dict) and isinstance(data.get("model"), dict):
+        data = data["model"].get("vocab", {})
+    if isinstance(data, dict):
+        tokens = list(data.keys())
+    elif isinstance(data, list):
+        tokens = [t[0] if isinstance(t, list) else t for t in data]
+    else:
+        raise ValueError("unsupported vocab format")
+    # Byte-level BPE ("Ġ") and SentencePiece ("▁") encode a leading space.
+    return [str(t).replace("Ġ", " ").replace("▁", " ").replace("Ċ", "\n") for t in tokens]
+
+
+def greedy_token_count(text: str, vocab: set, max_len: int) -> int:
+    """Greedy longest-match tokenization; an upper bound close to real BPE counts."""
+    count = 0
+    pos = 0
+    size = len(text)
+    while pos < size:
+        step = 1
+        for length in range(min(max_len, size - pos), 1, -1):
+            if text[pos : pos + length] in vocab:
+                step = length
+                break
+        pos += step
+        count += 1
+    return count
+
+
+def calibrate(paths: Iterable[str], vocab_tokens: List[str]) -> Dict[str, float]:
+    """Measure ASCII bytes/token per extension on the first 64 KiB of each file."""
+    vocab = {t for t in vocab_tokens if t}
+    max_len = max((len(t) for t in vocab), default=1)
+    totals: Dict[str, List[int]] = {}
+    for path in paths:
+        try:
+            with open(path, "rb") as handle:
+                raw = handle.read(CALIBRATION_SAMPLE_BYTES)
+        except OSError:
+            continue
+        if b"\0" in raw:
+            continue
+        text = raw.decode("ascii", errors="ignore")
+        if not text:
+            continue
+        suffix = suffix_key(path)
+        bucket = totals.setdefault(suffix, [0, 0])
+        bucket[0] += len(text)
+        bucket[1] += greedy_token_count(text, vocab, max_len)
+    return {ext: round(b / t, 3) for ext, (b, t) in sorted(totals.items()) if t}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paths", nargs="+", required=True, help="Files to estimate")
+    parser.add_argument("--model", default=str(DEFAULT_MODEL_PATH), help="Token model JSON")
+    parser.add_argument("--cache", default=str(default_cache_path()), help="Estimate cache file")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the cache")
+    parser.add_argument("--per-file", action="store_true", help="Include per-file estimates")
+    parser.add_argument(
+        "--calibrate-vocab",
+        help="Tokenizer vocab JSON; print a calibrated model for --paths instead of estimating",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    model_path = Path(args.model)
+    if args.calibrate_vocab:
+        measured = calibrate(args.paths, load_vocab(Path(args.calibrate_vocab)))
+        if not measured:
+            print("ERROR: no text samples to calibrate against", file=sys.stderr)
+            return 1
+        data = json.loads(model_path.read_text(encoding="utf-8"))
+        data["bytes_per_token"] = {**data.get("bytes_per_token", {}), **measured}
+        data["calibration"] = {
+            "source": "vocab",
+            "vocab": args.calibrate_vocab,
+            "files": len(args.paths),
+            "measured": measured,
+        }
+        print(json.dumps(data, indent=2))
+        return 0
+
+    started = time.perf_counter()
+    model = load_model(model_path)
+    cache = None if args.no_cache else open_cache(Path(args.cache), model)
+    total, estimates = estimate_paths(args.paths, model, cache)
+    if cache is not None:
+        cache.save()
+    payload: Dict[str, Any] = {
+        "ok": True,
+        "total_tokens": total,
+        "files": len(estimates),
+        "missing": sum(1 for e in estimates if e.missing),
+        "binary": sum(1 for e in estimates if e.binary),
+        "cache_hits": cache.hits if cache is not None else 0,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+    if args.per_file:
+        payload["per_file"] = [
+            {
+                "path": e.path,
+                "tokens": e.tokens,
+                "size": e.size,
+                "binary": e.binary,
+                "missing": e.missing,
+            }
+            for e in estimates
+        ]
+    print(json.dumps(payload, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
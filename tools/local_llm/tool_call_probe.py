@@ -5,12 +5,9 @@ from __future__ import annotations
 
 import argparse
 import json
-import socket
-import urllib.error
-import urllib.request
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
-from probe_common import parse_arguments
+from probe_common import HttpClient, ProbeError, validate_tool_calls
 
 
 def parse_args() -> argparse.Namespace:
@@ -26,50 +23,23 @@ def parse_args() -> argparse.Namespace:
 
 
 def validate_tool_call(message: Dict[str, Any], tool_name: str, a: int, b: int) -> tuple[bool, str]:
-    tool_calls = message.get("tool_calls")
-    if not tool_calls:
-        content = message.get("content", "")
-        return False, f"missing tool_calls (content={content})"
+    return validate_tool_calls(message, [(tool_name, {"a": a, "b": b})], exact=True)
 
-    first = tool_calls[0] if isinstance(tool_calls, list) else None
-    if not isinstance(first, dict):
-        return False, "tool_calls[0] is not an object"
 
-    function = first.get("function")
-    if not isinstance(function, dict):
-        return False, "tool_calls[0].function missing or invalid"
-
-    name = function.get("name")
-    if name != tool_name:
-        return False, f"unexpected function name ({name})"
-
-    args, err = parse_arguments(function.get("arguments"))
-    if err:
-        return False, err
-
-    got_a = args.get("a")
-    got_b = args.get("b")
-    if got_a != a or got_b != b:
-        return False, f"unexpected arguments (a={got_a}, b={got_b})"
-
-    return True, "ok"
-
-
-def main() -> int:
-    args = parse_args()
-    payload = {
-        "model": args.model,
+def build_payload(model: str, tool_name: str = "add", a: int = 2, b: int = 3) -> Dict[str, Any]:
+    return {
+        "model": model,
         "messages": [
             {
                 "role": "user",
-                "content": f"Call tool {args.tool_name} with a={args.a} and b={args.b}.",
+                "content": f"Call tool {tool_name} with a={a} and b={b}.",
             }
         ],
         "tools": [
             {
                 "type": "function",
                 "function": {
-                    "name": args.tool_name,
+                    "name": tool_name,
                     "description": "Add two integers",
                     "parameters": {
                         "type": "object",
@@ -83,56 +53,59 @@ def main() -> int:
         "temperature": 0,
     }
 
-    request = urllib.request.Request(
-        args.url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
 
+def check(
+    url: str,
+    model: str,
+    tool_name: str = "add",
+    a: int = 2,
+    b: int = 3,
+    timeout_sec: int = 60,
+    client: Optional[HttpClient] = None,
+) -> Tuple[bool, str]:
+    """Send the probe request and validate the tool call; request failures raise ProbeError."""
+    http_client = client or HttpClient(timeout_sec=timeout_sec)
     try:
-        with urllib.request.urlopen(request, timeout=args.timeout_sec) as response:
-            data = json.loads(response.read().decode("utf-8"))
-    except urllib.error.HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="replace").strip()
-        detail = body or "no error body"
-        if args.json:
-            print(json.dumps({"ok": False, "error": f"HTTP {exc.code} ({detail})"}))
-        else:
-            print(f"Tool-call probe failed: HTTP {exc.code} ({detail})")
-        return 1
-    except urllib.error.URLError as exc:
-        if args.json:
-            print(json.dumps({"ok": False, "error": f"URL error ({exc})"}))
-        else:
-            print(f"Tool-call probe failed: URL error ({exc})")
-        return 1
-    except TimeoutError as exc:
-        if args.json:
-            print(json.dumps({"ok": False, "error": f"timeout ({exc})"}))
-        else:
-            print(f"Tool-call probe failed: timeout ({exc})")
-        return 1
-    except socket.timeout as exc:
-        if args.json:
-            print(json.dumps({"ok": False, "error": f"timeout ({exc})"}))
-        else:
-            print(f"Tool-call probe failed: timeout ({exc})")
-        return 1
-
+        data, _ = http_client.post_json(
+            url, build_payload(model, tool_name, a, b), timeout_sec=timeout_sec
+        )
+    finally:
+        if client is None:
+            http_client.close()
     message = data.get("choices", [{}])[0].get("message", {})
-    ok, reason = validate_tool_call(message, args.tool_name, args.a, args.b)
-    if ok:
-        if args.json:
-            print(json.dumps({"ok": True}))
-        else:
-            print("Tool-call compliant")
-        return 0
+    return validate_tool_call(message, tool_name, a, b)
+
+
+def probe(
+    url: str,
+    model: str,
+    tool_name: str = "add",
+    a: int = 2,
+    b: int = 3,
+    timeout_sec: int = 60,
+    client: Optional[HttpClient] = None,
+) -> Dict[str, Any]:
+    """``check`` as the ``--json`` payload: ``{"ok": true}`` or ``{"ok": false, "error"}``."""
+    try:
+        ok, reason = check(url, model, tool_name, a, b, timeout_sec, client)
+    except ProbeError as exc:
+        return {"ok": False, "error": str(exc)}
+    return {"ok": True} if ok else {"ok": False, "error": reason}
+
+
+def main() -> int:
+    args = parse_args()
     if args.json:
-        print(json.dumps({"ok": False, "error": reason}))
-    else:
-        print(f"Tool-call invalid: {reason}")
-    return 1
+        result = probe(args.url, args.model, args.tool_name, args.a, args.b, args.timeout_sec)
+        print(json.dumps(result))
+        return 0 if result["ok"] else 1
+    try:
+        ok, reason = check(args.url, args.model, args.tool_name, args.a, args.b, args.timeout_sec)
+    except ProbeError as exc:
+        print(f"Tool-call probe failed: {exc}")
+        return 1
+    print("Tool-call compliant" if ok else f"Tool-call invalid: {reason}")
+    return 0 if ok else 1
 
 
 if __name__ == "__main__":
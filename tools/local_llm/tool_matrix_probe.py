@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""Tool-call probe matrix: tool count x schema size x call shape.
+
+The `add` probe sends one tiny tool. Agent sessions send dozens of tools with
+large JSON schemas, and the extra prefill and the harder selection are where
+local models slow down and start to fail. Each cell of this matrix:
+- hides the target tool(s) among synthetic filler tools, for a total of
+  `--tool-counts` tools (default 1 to 60);
+- sizes every filler schema `small` (two string properties) or `large`
+  (a dozen documented properties with enums, arrays and a nested object,
+  roughly the size of a coding-agent tool);
+- asks for one call shape:
+  - `flat`: one `add(a, b)` call;
+  - `nested`: one `create_event` call whose arguments nest objects and a
+    list of objects;
+  - `parallel`: `--parallel-calls` `add` calls in one response.
+
+Requests are streamed. The tool calls are assembled from the deltas and
+checked with `probe_common.validate_tool_calls`. Each cell records
+correctness and its reason, time to first output (`ttft_sec`, dominated by
+prefill of the tool schemas), end-to-end latency and the server's
+`prompt_tokens`. Every request starts with a unique system nonce and its own
+tool order, so prefix caching cannot carry one cell's prefill into the next.
+
+`summary` reports, per shape and schema size, the largest tool count up to
+which every cell passed. Output uses `schema_version: tool-matrix-v1`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from probe_common import HttpClient, ProbeError, StreamResult, validate_tool_calls
+from results_store import add_store_arg, store_result
+
+SCHEMA_VERSION = "tool-matrix-v1"
+DEFAULT_TOOL_COUNTS = "1,5,15,30,60"
+SCHEMA_SIZES = ("small", "large")
+SHAPES = ("flat", "nested", "parallel")
+
+VERBS = (
+    "read write list search update delete create fetch run move "
+    "copy rename watch lint format deploy query archive sync tag"
+).split()
+NOUNS = (
+    "file directory issue branch commit ticket notebook secret image "
+    "table queue bucket cluster job page comment release package"
+).split()
+FILLER_NAMES = [f"{verb}_{noun}" for verb in VERBS for noun in NOUNS]
+# Every cell has one target tool plus distinct fillers.
+MAX_TOOL_COUNT = len(FILLER_NAMES) + 1
+LARGE_FIELDS = (
+    ("path", "string"),
+    ("owner", "string"),
+    ("limit", "integer"),
+    ("offset", "integer"),
+    ("dry_run", "boolean"),
+    ("label", "string"),
+    ("query", "string"),
+    ("timeout_ms", "integer"),
+    ("force", "boolean"),
+    ("region", "string"),
+    ("revision", "string"),
+    ("priority", "integer"),
+)
+
+ADD_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "add",
+        "description": "Add two integers",
+        "parameters": {
+            "type": "object",
+            "properties": {"a": {"type": "integer"}, "b": {"type": "integer"}},
+            "required": ["a", "b"],
+        },
+    },
+}
+
+EVENT_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "create_event",
+        "description": "Create a calendar event.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "title": {"type": "string"},
+                "start": {
+                    "type": "object",
+                    "properties": {
+                        "date": {"type": "string", "description": "YYYY-MM-DD"},
+                        "time": {"type": "string", "description": "HH:MM, 24-hour clock"},
+                        "timezone": {"type": "string", "enum": ["UTC", "America/New_York"]},
+                    },
+                    "required": ["date", "time", "timezone"],
+                },
+                "duration_minutes": {"type": "integer"},
+                "attendees": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "email": {"type": "string"},
+                            "optional": {"type": "boolean"},
+                        },
+                        "required": ["email", "optional"],
+                    },
+                },
+            },
+            "required": ["title", "start", "duration_minutes", "attendees"],
+        },
+    },
+}
+
+EVENT_PROMPT = (
+    'Call tool create_event for a meeting titled "Design review" starting on 2025-03-14 '
+    "at 15:30 UTC, lasting 45 minutes, with required attendee ann@example.com and optional "
+    "attendee bob@example.com."
+)
+EVENT_ARGS = {
+    "title": "Design review",
+    "start": {"date": "2025-03-14", "time": "15:30", "timezone": "UTC"},
+    "duration_minutes": 45,
+    "attendees": [
+        {"email": "ann@example.com", "optional": False},
+        {"email": "bob@example.com", "optional": True},
+    ],
+}
+
+Expected = List[Tuple[str, Dict[str, Any]]]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", required=True, help="Chat completions URL")
+    parser.add_argument("--model", required=True, help="Model name")
+    parser.add_argument("--runtime", default="", help="Runtime label recorded in the output")
+    parser.add_argument(
+        "--tool-counts",
+        default=DEFAULT_TOOL_COUNTS,
+        help=f"Comma-separated tool counts (max {MAX_TOOL_COUNT})",
+    )
+    parser.add_argument(
+        "--schema-sizes", default=",".join(SCHEMA_SIZES), help="Comma list of small,large"
+    )
+    parser.add_argument(
+        "--shapes", default=",".join(SHAPES), help="Comma list of flat,nested,parallel"
+    )
+    parser.add_argument("--parallel-calls", type=int, default=3, help="Calls in a parallel cell")
+    parser.add_argument("--iterations", type=int, default=1, help="Requests per cell")
+    parser.add_argument("--max-tokens", type=int, default=512, help="max_tokens per request")
+    parser.add_argument("--timeout-sec", type=float, default=300.0, help="Request timeout")
+    parser.add_argument("--seed", type=int, default=0, help="Filler tool RNG seed")
+    parser.add_argument("--output", help="Optional JSON output path")
+    add_store_arg(parser)
+    return parser.parse_args()
+
+
+def parse_choices(text: str, allowed: Sequence[str]) -> List[str]:
+    values = [part.strip() for part in text.split(",") if part.strip()]
+    bad = [v for v in values if v not in allowed]
+    if not values or bad:
+        raise ValueError(f"expected a comma list of {list(allowed)}, got {text!r}")
+    return values
+
+
+def parse_counts(text: str) -> List[int]:
+    values = sorted({int(part) for part in text.split(",") if part.strip()})
+    if not values or values[0] <= 0:
+        raise ValueError(f"expected comma-separated positive tool counts, got {text!r}")
+    if values[-1] > MAX_TOOL_COUNT:
+        raise ValueError(f"tool counts above {MAX_TOOL_COUNT} are not supported, got {values[-1]}")
+    return values
+
+
+def filler_tool(name: str, schema_size: str, rng: random.Random) -> Dict[str, Any]:
+    noun = name.split("_", 1)[1]
+    if schema_size == "small":
+        properties: Dict[str, Any] = {
+            "id": {"type": "string"},
+            "note": {"type": "string"},
+        }
+        description = f"{name.replace('_', ' ').capitalize()}."
+    else:
+        properties = {
+            field: {
+                "type": kind,
+                "description": (
+                    f"The {field} of the {noun} to act on. Leave unset to use the workspace "
+                    "default; values are validated before any change is made."
+                ),
+            }
+            for field, kind in rng.sample(LARGE_FIELDS, 9)
+        }
+        properties["mode"] = {"type": "string", "enum": ["fast", "safe", "verbose", "quiet"]}
+        properties["tags"] = {"type": "array", "items": {"type": "string"}}
+        properties["options"] = {
+            "type": "object",
+            "properties": {
+                "retries": {"type": "integer", "description": "Retry count on failure"},
+                "notify": {"type": "boolean", "description": "Send a notification when done"},
+            },
+        }
+        description = (
+            f"{name.replace('_', ' ').capitalize()} in the current workspace. Use this tool only "
+            f"when the user explicitly asks to {name.split('_', 1)[0]} a {noun}; it reports what "
+            "changed and never prompts for confirmation."
+        )
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": properties, "required": []},
+        },
+    }
+
+
+def build_cell(
+    tool_count: int, schema_size: str, shape: str, parallel_calls: int, rng: random.Random
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]], Expected]:
+    """Tools, messages and expected calls for one cell."""
+    if shape == "nested":
+        targets = [EVENT_TOOL]
+        prompt = EVENT_PROMPT
+        expected: Expected = [("create_event", EVENT_ARGS)]
+    elif shape == "parallel":
+        targets = [ADD_TOOL]
+        pairs = [(2 * n + 2, 2 * n + 3) for n in range(parallel_calls)]
+        prompt = (
+            f"Call tool add {parallel_calls} times in parallel, all in this one response: "
+            + "; ".join(f"a={a} and b={b}" for a, b in pairs)
+            + "."
+        )
+        expected = [("add", {"a": a, "b": b}) for a, b in pairs]
+    else:
+        targets = [ADD_TOOL]
+        prompt = "Call tool add with a=2 and b=3."
+        expected = [("add", {"a": 2, "b": 3})]
+    fillers = [
+        filler_tool(name, schema_size, rng)
+        for name in rng.sample(FILLER_NAMES, max(0, tool_count - len(targets)))
+    ]
+    tools = targets + fillers
+    rng.shuffle(tools)
+    messages = [
+        {
+            "role": "system",
+            "content": f"Session {rng.getrandbits(48):012x}. Use the provided tools.",
+        },
+        {"role": "user", "content": prompt},
+    ]
+    return tools, messages, expected
+
+
+def median(values: Sequence[Optional[float]]) -> Optional[float]:
+    present = [v for v in values if v is not None]
+    return statistics.median(present) if present else None
+
+
+def measure_cell(
+    client: HttpClient,
+    args: argparse.Namespace,
+    tool_count: int,
+    schema_size: str,
+    shape: str,
+    rng: random.Random,
+) -> Dict[str, Any]:
+    cell: Dict[str, Any] = {"tool_count": tool_count, "schema_size": schema_size, "shape": shape}
+    runs: List[StreamResult] = []
+    reasons: List[str] = []
+    passes = 0
+    for _ in range(args.iterations):
+        tools, messages, expected = build_cell(
+            tool_count, schema_size, shape, args.parallel_calls, rng
+        )
+        cell["tools_json_bytes"] = len(json.dumps(tools))
+        payload: Dict[str, Any] = {
+            "model": args.model,
+            "messages": messages,
+            "tools": tools,
+            "tool_choice": "auto",
+            "temperature": 0,
+            "max_tokens": args.max_tokens,
+        }
+        if shape == "parallel":
+            payload["parallel_tool_calls"] = True
+        try:
+            result = client.stream_chat(args.url, payload, timeout_sec=args.timeout_sec)
+        except ProbeError as exc:
+            reasons.append(str(exc))
+            continue
+        runs.append(result)
+        ok, reason = validate_tool_calls(result.message, expected)
+        passes += ok
+        if not ok:
+            reasons.append(reason)
+    cell.update(
+        {
+            "ok": passes == args.iterations,
+            "passes": passes,
+            "iterations": args.iterations,
+            "reasons": sorted(set(reasons)),
+            "prompt_tokens": median([r.prompt_tokens for r in runs]),
+            "ttft_sec": median([r.ttft_sec for r in runs]),
+            "total_sec": median([r.total_sec for r in runs]),
+            "prefill_tokens_per_sec": median([r.prefill_tokens_per_sec() for r in runs]),
+        }
+    )
+    return cell
+
+
+def summarize(cells: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per (shape, schema size): the largest tool count up to which every cell passed."""
+    groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for cell in cells:
+        groups.setdefault((cell["shape"], cell["schema_size"]), []).append(cell)
+    summary = []
+    for (shape, schema_size), group in groups.items():
+        group.sort(key=lambda c: c["tool_count"])
+        max_passing: Optional[int] = None
+        for cell in group:
+            if not cell["ok"]:
+                break
+            max_passing = cell["tool_count"]
+        summary.append(
+            {
+                "shape": shape,
+                "schema_size": schema_size,
+                "max_passing_tool_count": max_passing,
+                "pass_rate": sum(c["passes"] for c in group)
+                / max(1, sum(c["iterations"] for c in group)),
+            }
+        )
+    return summary
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        counts = parse_counts(args.tool_counts)
+        sizes = parse_choices(args.schema_sizes, SCHEMA_SIZES)
+        shapes = parse_choices(args.shapes, SHAPES)
+        if args.iterations < 1 or args.parallel_calls < 2:
+            raise ValueError("--iterations must be >= 1 and --parallel-calls >= 2")
+    except ValueError as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+    rng = random.Random(args.seed)
+    client = HttpClient(timeout_sec=args.timeout_sec)
+    started = time.time()
+    cells: List[Dict[str, Any]] = []
+    try:
+        for shape in shapes:
+            for size in sizes:
+                for count in counts:
+                    cell = measure_cell(client, args, count, size, shape, rng)
+                    cells.append(cell)
+                    print(
+                        f"cell shape={shape} schema={size} tools={count}: "
+                        f"{'ok' if cell['ok'] else '; '.join(cell['reasons'])}",
+                        file=sys.stderr,
+                    )
+    finally:
+        client.close()
+
+    payload = {
+        "ok": all(c["ok"] for c in cells),
+        "schema_version": SCHEMA_VERSION,
+        "timestamp": time.time(),
+        "duration_sec": round(time.time() - started, 3),
+        "url": args.url,
+        "model": args.model,
+        "runtime": args.runtime or None,
+        "parallel_calls": args.parallel_calls,
+        "cells": cells,
+        "summary": summarize(cells),
+    }
+    text = json.dumps(payload, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    store_result(args.store, "tool_matrix_probe", payload)
+    return 0 if payload["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
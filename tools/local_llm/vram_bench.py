@@ -6,6 +6,18 @@ This is a simple orchestrator around existing probes:
 - vram_probe.py (NVIDIA via nvidia-smi)
 - tool_call_probe.py (strict tool_calls conformance)
 - latency_probe.py
+
+The probes run in-process through their `probe()` functions on one keep-alive
+HTTP client, so the VRAM samples bracket only the measured requests
+(`work_sec` is the time between them). `--subprocess` runs each probe as a
+separate `python3` process and parses its JSON output instead. Use it when a
+probe must be isolated from this interpreter.
+
+A `vram_sampler` background sampler (`--sample-interval-ms`, default 100; 0
+disables it) records VRAM, utilization, temperature and pstate throughout
+the run. Each model gets `vram_series`: the ticks between its before and
+after samples, peak/mean usage, and tokens per utilization-second over its
+latency requests. Request windows need in-process mode.
 """
 
 from __future__ import annotations
@@ -15,7 +27,15 @@ import json
 import subprocess
 import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+import latency_probe
+import tool_call_probe
+import vram_probe
+import vram_sampler
+from latency_stats import SamplingPlan
+from probe_common import HttpClient
+from results_store import add_store_arg, store_result
 
 
 def parse_args() -> argparse.Namespace:
@@ -26,6 +46,22 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--timeout-sec", type=int, default=60, help="Per-request timeout")
     parser.add_argument("--iterations", type=int, default=3, help="Latency iterations per model")
     parser.add_argument("--allow-missing-vram", action="store_true", help="Do not fail if vram_probe fails")
+    parser.add_argument(
+        "--subprocess", action="store_true", help="Run each probe as a child process (fallback)"
+    )
+    parser.add_argument(
+        "--sample-interval-ms",
+        type=int,
+        default=vram_sampler.DEFAULT_INTERVAL_MS,
+        help="Background GPU sampling interval (0 disables the sampler)",
+    )
+    parser.add_argument(
+        "--sampler",
+        choices=["loop", "poll"],
+        default="loop",
+        help="Sampler backend: persistent nvidia-smi --loop-ms, or repeated nvidia-smi calls",
+    )
+    add_store_arg(parser)
     return parser.parse_args()
 
 
@@ -40,11 +76,17 @@ def run_json(cmd: List[str]) -> Dict[str, Any]:
         return {"ok": False, "error": f"non-json output ({exc})", "raw": stdout[:1000]}
 
 
-def sample_vram() -> Dict[str, Any]:
+def sample_vram(in_process: bool = True) -> Dict[str, Any]:
+    if in_process:
+        return vram_probe.probe()
     return run_json(["python3", "tools/local_llm/vram_probe.py"])
 
 
-def probe_tool(url: str, model: str, timeout_sec: int) -> Dict[str, Any]:
+def probe_tool(
+    url: str, model: str, timeout_sec: int, client: Optional[HttpClient] = None
+) -> Dict[str, Any]:
+    if client is not None:
+        return tool_call_probe.probe(url, model, timeout_sec=timeout_sec, client=client)
     return run_json(
         [
             "python3",
@@ -60,7 +102,14 @@ def probe_tool(url: str, model: str, timeout_sec: int) -> Dict[str, Any]:
     )
 
 
-def probe_latency(url: str, model: str, timeout_sec: int, iterations: int) -> Dict[str, Any]:
+def probe_latency(
+    url: str, model: str, timeout_sec: int, iterations: int, client: Optional[HttpClient] = None
+) -> Dict[str, Any]:
+    if client is not None:
+        plan = SamplingPlan(min_iterations=iterations, max_iterations=iterations)
+        return latency_probe.probe(
+            url, model, timeout_sec=timeout_sec, plan=plan, client=client, record_requests=True
+        )
     return run_json(
         [
             "python3",
@@ -77,6 +126,29 @@ def probe_latency(url: str, model: str, timeout_sec: int, iterations: int) -> Di
     )
 
 
+def start_sampler(
+    args: argparse.Namespace,
+) -> Tuple[Optional[vram_sampler.BackgroundSampler], Optional[str]]:
+    if args.sample_interval_ms <= 0:
+        return None, None
+    sampler = vram_sampler.BackgroundSampler(
+        vram_sampler.make_backend(args.sampler, args.sample_interval_ms)
+    )
+    try:
+        sampler.start()
+    except Exception as exc:  # report and continue without the series
+        return None, f"vram sampler unavailable: {exc}"
+    return sampler, None
+
+
+def request_windows(latency: Dict[str, Any]) -> List[vram_sampler.RequestWindow]:
+    """Pop the in-process latency request windows (absolute perf_counter times)."""
+    return [
+        vram_sampler.RequestWindow(r["start"], r["end"], r.get("output_tokens"))
+        for r in latency.pop("requests", [])
+    ]
+
+
 def main() -> int:
     args = parse_args()
     config = json.loads(Path(args.config).read_text(encoding="utf-8"))
@@ -88,40 +160,68 @@ def main() -> int:
     started = time.time()
     results: List[Dict[str, Any]] = []
     failures: List[Dict[str, str]] = []
+    in_process = not args.subprocess
+    client = HttpClient(timeout_sec=args.timeout_sec) if in_process else None
+    sampler, sampler_error = start_sampler(args)
 
-    for model in models:
-        before = sample_vram()
-        if not before.get("ok") and not args.allow_missing_vram:
-            failures.append({"model": model, "error": f"vram_probe failed: {before.get('error')}"})
-            continue
-
-        tool = probe_tool(args.url, model, args.timeout_sec)
-        latency = probe_latency(args.url, model, args.timeout_sec, args.iterations)
-
-        time.sleep(0.25)
-        after = sample_vram()
-        if not after.get("ok") and not args.allow_missing_vram:
-            failures.append({"model": model, "error": f"vram_probe failed: {after.get('error')}"})
-            continue
-
-        before_free = before.get("min_free_mib") if before.get("ok") else None
-        after_free = after.get("min_free_mib") if after.get("ok") else None
-        free_drop_mib: Optional[int] = None
-        if isinstance(before_free, (int, float)) and isinstance(after_free, (int, float)):
-            free_drop_mib = int(before_free - after_free)
-
-        entry = {
-            "model": model,
-            "tool": tool,
-            "latency": latency,
-            "vram_before": before,
-            "vram_after": after,
-            "min_free_drop_mib": free_drop_mib,
-        }
-        results.append(entry)
-
-        if not tool.get("ok") or not latency.get("ok"):
-            failures.append({"model": model, "error": tool.get("error") or latency.get("error") or "probe failed"})
+    try:
+        for model in models:
+            before = sample_vram(in_process)
+            window_start = time.perf_counter()
+            if not before.get("ok") and not args.allow_missing_vram:
+                error = f"vram_probe failed: {before.get('error')}"
+                failures.append({"model": model, "error": error})
+                continue
+
+            work_started = time.perf_counter()
+            tool = probe_tool(args.url, model, args.timeout_sec, client)
+            latency = probe_latency(args.url, model, args.timeout_sec, args.iterations, client)
+            work_sec = time.perf_counter() - work_started
+
+            time.sleep(0.25)
+            after = sample_vram(in_process)
+            windows = request_windows(latency)
+            series: Dict[str, Any] = {"ok": False, "error": sampler_error or "sampler disabled"}
+            if sampler is not None:
+                window_end = time.perf_counter()
+                series = vram_sampler.summarize_series(
+                    sampler.samples(window_start, window_end), window_start, window_end, windows
+                )
+            if not after.get("ok") and not args.allow_missing_vram:
+                error = f"vram_probe failed: {after.get('error')}"
+                failures.append({"model": model, "error": error})
+                continue
+
+            before_free = before.get("min_free_mib") if before.get("ok") else None
+            after_free = after.get("min_free_mib") if after.get("ok") else None
+            free_drop_mib: Optional[int] = None
+            if isinstance(before_free, (int, float)) and isinstance(after_free, (int, float)):
+                free_drop_mib = int(before_free - after_free)
+
+            entry = {
+                "model": model,
+                "tool": tool,
+                "latency": latency,
+                "vram_before": before,
+                "vram_after": after,
+                "min_free_drop_mib": free_drop_mib,
+                "work_sec": round(work_sec, 3),
+                "vram_series": series,
+            }
+            results.append(entry)
+
+            if not tool.get("ok") or not latency.get("ok"):
+                failures.append(
+                    {
+                        "model": model,
+                        "error": tool.get("error") or latency.get("error") or "probe failed",
+                    }
+                )
+    finally:
+        if client is not None:
+            client.close()
+        if sampler is not None:
+            sampler.stop()
 
     payload = {
         "schema_version": "vram-bench-v1",
@@ -130,6 +230,7 @@ def main() -> int:
         "duration_sec": round(time.time() - started, 3),
         "url": args.url,
         "config": args.config,
+        "mode": "in_process" if in_process else "subprocess",
         "results": results,
         "failures": failures,
     }
@@ -137,6 +238,7 @@ def main() -> int:
     print(output)
     if args.output:
         Path(args.output).write_text(output, encoding="utf-8")
+    store_result(args.store, "vram_bench", payload)
     return 1 if failures else 0
 
 
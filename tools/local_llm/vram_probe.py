@@ -42,55 +42,67 @@ def parse_csv_line(line: str) -> List[str]:
     return [part.strip() for part in line.split(",")]
 
 
+QUERY_FIELDS = [
+    "index",
+    "name",
+    "memory.total",
+    "memory.used",
+    "memory.free",
+    "utilization.gpu",
+    "temperature.gpu",
+    "pstate",
+]
+
+
+def nvidia_smi_command(exe: str) -> List[str]:
+    return [
+        exe,
+        f"--query-gpu={','.join(QUERY_FIELDS)}",
+        "--format=csv,noheader,nounits",
+    ]
+
+
+def parse_sample_line(raw_line: str) -> GpuSample:
+    parts = parse_csv_line(raw_line.strip())
+    if len(parts) != len(QUERY_FIELDS):
+        raise RuntimeError(f"unexpected nvidia-smi output: {raw_line}")
+    return GpuSample(
+        index=int(parts[0]),
+        name=parts[1],
+        total_mib=int(float(parts[2])),
+        used_mib=int(float(parts[3])),
+        free_mib=int(float(parts[4])),
+        utilization_gpu_pct=parse_int(parts[5]),
+        temperature_c=parse_int(parts[6]),
+        pstate=parts[7] or None,
+    )
+
+
 def sample_nvidia(timeout_sec: int) -> List[GpuSample]:
     exe = shutil.which("nvidia-smi")
     if not exe:
         raise RuntimeError("nvidia-smi not found in PATH")
 
-    query = [
-        "index",
-        "name",
-        "memory.total",
-        "memory.used",
-        "memory.free",
-        "utilization.gpu",
-        "temperature.gpu",
-        "pstate",
-    ]
-    cmd = [
-        exe,
-        f"--query-gpu={','.join(query)}",
-        "--format=csv,noheader,nounits",
-    ]
     completed = subprocess.run(
-        cmd,
+        nvidia_smi_command(exe),
         check=True,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
         timeout=timeout_sec,
     )
-    samples: List[GpuSample] = []
-    for raw_line in completed.stdout.splitlines():
-        line = raw_line.strip()
-        if not line:
-            continue
-        parts = parse_csv_line(line)
-        if len(parts) != len(query):
-            raise RuntimeError(f"unexpected nvidia-smi output: {raw_line}")
-        samples.append(
-            GpuSample(
-                index=int(parts[0]),
-                name=parts[1],
-                total_mib=int(float(parts[2])),
-                used_mib=int(float(parts[3])),
-                free_mib=int(float(parts[4])),
-                utilization_gpu_pct=parse_int(parts[5]),
-                temperature_c=parse_int(parts[6]),
-                pstate=parts[7] or None,
-            )
-        )
-    return samples
+    return [parse_sample_line(line) for line in completed.stdout.splitlines() if line.strip()]
+
+
+def summarize(gpus: List[GpuSample]) -> dict:
+    """Reduce per-GPU samples to the routing signal consumed by policy_engine."""
+    min_free_mib = min(g.free_mib for g in gpus)
+    min_free_ratio = min(g.free_mib / g.total_mib for g in gpus if g.total_mib)
+    return {
+        "gpus": [asdict(g) for g in gpus],
+        "min_free_mib": min_free_mib,
+        "min_free_ratio": round(min_free_ratio, 4),
+    }
 
 
 def parse_args() -> argparse.Namespace:
@@ -99,33 +111,30 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def main() -> int:
-    args = parse_args()
+def probe(timeout_sec: int = 2) -> dict:
+    """One VRAM sample as the CLI's JSON payload (``ok`` false on any failure)."""
     started = time.time()
     try:
-        gpus = sample_nvidia(timeout_sec=args.timeout_sec)
+        gpus = sample_nvidia(timeout_sec=timeout_sec)
     except Exception as exc:  # noqa: BLE001 - CLI tool: report error as JSON
-        payload = {"ok": False, "error": str(exc), "timestamp": time.time()}
-        print(json.dumps(payload, indent=2))
-        return 1
+        return {"ok": False, "error": str(exc), "timestamp": time.time()}
 
     if not gpus:
-        payload = {"ok": False, "error": "no GPUs detected", "timestamp": time.time()}
-        print(json.dumps(payload, indent=2))
-        return 1
+        return {"ok": False, "error": "no GPUs detected", "timestamp": time.time()}
 
-    min_free_mib = min(g.free_mib for g in gpus)
-    min_free_ratio = min(g.free_mib / g.total_mib for g in gpus if g.total_mib)
-    payload = {
+    return {
         "ok": True,
         "timestamp": time.time(),
         "duration_ms": int((time.time() - started) * 1000),
-        "gpus": [asdict(g) for g in gpus],
-        "min_free_mib": min_free_mib,
-        "min_free_ratio": round(min_free_ratio, 4),
+        **summarize(gpus),
     }
+
+
+def main() -> int:
+    args = parse_args()
+    payload = probe(timeout_sec=args.timeout_sec)
     print(json.dumps(payload, indent=2))
-    return 0
+    return 0 if payload["ok"] else 1
 
 
 if __name__ == "__main__":
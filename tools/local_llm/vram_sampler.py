@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""Background GPU sampling (VRAM, utilization, temperature, pstate) during benchmarks.
+
+Two backends feed a `BackgroundSampler`:
+- `NvidiaSmiLoop` keeps one `nvidia-smi --query-gpu=... --loop-ms=N` process
+  running and parses its CSV lines as they arrive (one line per GPU per tick).
+- `PollingBackend` calls a sampling function every interval. It is the
+  fallback for drivers whose `--loop-ms` output is unreliable, and the seam
+  for other vendors' tools.
+
+Samples are stamped with `time.perf_counter()` on arrival, the same clock the
+in-process probes use, so `summarize_series` can line them up with request
+windows. It reports per-GPU peak and mean used VRAM, mean utilization,
+utilization-seconds (utilization held from one sample to the next, integrated
+over the window) and tokens per utilization-second over the request windows.
+The last figure is a rough efficiency measure: how much output one busy
+GPU-second produced.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import vram_probe
+from vram_probe import GpuSample
+
+DEFAULT_INTERVAL_MS = 100
+DEFAULT_MAX_SAMPLES = 100_000
+
+OnSample = Callable[[float, List[GpuSample]], None]
+
+
+@dataclass(frozen=True)
+class TimedSample:
+    t: float  # perf_counter() when the tick arrived
+    gpus: Tuple[GpuSample, ...]
+
+
+@dataclass(frozen=True)
+class RequestWindow:
+    start: float  # perf_counter()
+    end: float
+    output_tokens: Optional[int]
+
+
+class PollingBackend:
+    """Calls ``sample_fn`` every ``interval_ms`` on a daemon thread."""
+
+    def __init__(
+        self,
+        interval_ms: int = DEFAULT_INTERVAL_MS,
+        sample_fn: Callable[[], List[GpuSample]] = lambda: vram_probe.sample_nvidia(2),
+    ) -> None:
+        self.interval_sec = interval_ms / 1000.0
+        self.sample_fn = sample_fn
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, on_sample: OnSample) -> None:
+        on_sample(time.perf_counter(), self.sample_fn())  # fail fast if sampling cannot work
+
+        def loop() -> None:
+            while not self._stop.wait(self.interval_sec):
+                try:
+                    gpus = self.sample_fn()
+                except Exception:  # skip a bad tick, keep sampling
+                    continue
+                on_sample(time.perf_counter(), gpus)
+
+        self._thread = threading.Thread(target=loop, name="vram-poll", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class NvidiaSmiLoop:
+    """Reads a persistent ``nvidia-smi --loop-ms`` process.
+
+    A tick is complete when a line for a GPU index at or below the previous
+    line's index arrives (or the process ends); it is stamped with the arrival
+    time of its first line.
+    """
+
+    def __init__(self, interval_ms: int = DEFAULT_INTERVAL_MS, exe: Optional[str] = None) -> None:
+        self.interval_ms = max(1, interval_ms)
+        self.exe = exe or shutil.which("nvidia-smi")
+        self._proc: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, on_sample: OnSample) -> None:
+        if not self.exe:
+            raise RuntimeError("nvidia-smi not found in PATH")
+        cmd = [*vram_probe.nvidia_smi_command(self.exe), f"--loop-ms={self.interval_ms}"]
+        self._proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1
+        )
+        proc = self._proc
+
+        def read() -> None:
+            assert proc.stdout is not None
+            tick: List[GpuSample] = []
+            tick_at = 0.0
+            for line in proc.stdout:
+                if not line.strip():
+                    continue
+                try:
+                    gpu = vram_probe.parse_sample_line(line)
+                except (RuntimeError, ValueError):
+                    continue
+                now = time.perf_counter()
+                if tick and gpu.index <= tick[-1].index:
+                    on_sample(tick_at, tick)
+                    tick = []
+                if not tick:
+                    tick_at = now
+                tick.append(gpu)
+            if tick:
+                on_sample(tick_at, tick)
+
+        self._thread = threading.Thread(target=read, name="vram-loop", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._proc is not None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                self._proc.wait()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+
+def make_backend(kind: str, interval_ms: int) -> Any:
+    if kind == "loop":
+        return NvidiaSmiLoop(interval_ms)
+    if kind == "poll":
+        return PollingBackend(interval_ms)
+    raise ValueError(f"unknown sampler backend: {kind}")
+
+
+class BackgroundSampler:
+    """Collects backend ticks; keeps at most ``max_samples`` (oldest dropped)."""
+
+    def __init__(self, backend: Any, max_samples: int = DEFAULT_MAX_SAMPLES) -> None:
+        self.backend = backend
+        self.max_samples = max_samples
+        self._samples: List[TimedSample] = []
+        self._lock = threading.Lock()
+
+    def _on_sample(self, t: float, gpus: List[GpuSample]) -> None:
+        with self._lock:
+            self._samples.append(TimedSample(t, tuple(gpus)))
+            if len(self._samples) > self.max_samples:
+                del self._samples[: len(self._samples) - self.max_samples]
+
+    def start(self) -> None:
+        self.backend.start(self._on_sample)
+
+    def stop(self) -> None:
+        self.backend.stop()
+
+    def samples(self, start: float = float("-inf"), end: float = float("inf")) -> List[TimedSample]:
+        """Ticks in [start, end] plus the last tick before ``start`` (the state at ``start``)."""
+        with self._lock:
+            samples = list(self._samples)
+        before = [s for s in samples if s.t < start]
+        inside = [s for s in samples if start <= s.t <= end]
+        return before[-1:] + inside
+
+
+def held_overlap(samples: Sequence[TimedSample], index: int, start: float, end: float) -> float:
+    """Seconds of [start, end] during which sample ``index`` was the latest tick."""
+    begin = max(samples[index].t, start)
+    finish = min(samples[index + 1].t if index + 1 < len(samples) else end, end)
+    return max(0.0, finish - begin)
+
+
+def utilization_sec(samples: Sequence[TimedSample], start: float, end: float) -> float:
+    """GPU-seconds of utilization in [start, end], summed over GPUs."""
+    total = 0.0
+    for index, sample in enumerate(samples):
+        overlap = held_overlap(samples, index, start, end)
+        if overlap:
+            busy = sum((g.utilization_gpu_pct or 0) for g in sample.gpus) / 100.0
+            total += busy * overlap
+    return total
+
+
+def summarize_series(
+    samples: Sequence[TimedSample],
+    start: float,
+    end: float,
+    windows: Sequence[RequestWindow] = (),
+) -> Dict[str, Any]:
+    """Time series (``t`` relative to ``start``) and its peak/mean/efficiency summary."""
+    if not samples:
+        return {"ok": False, "error": "no samples collected"}
+    per_gpu: Dict[int, Dict[str, List[float]]] = {}
+    for sample in samples:
+        for gpu in sample.gpus:
+            stats = per_gpu.setdefault(gpu.index, {"used": [], "util": [], "temp": []})
+            stats["used"].append(gpu.used_mib)
+            if gpu.utilization_gpu_pct is not None:
+                stats["util"].append(gpu.utilization_gpu_pct)
+            if gpu.temperature_c is not None:
+                stats["temp"].append(gpu.temperature_c)
+    gpus = {
+        str(index): {
+            "peak_used_mib": max(stats["used"]),
+            "mean_used_mib": round(sum(stats["used"]) / len(stats["used"]), 1),
+            "mean_utilization_pct": (
+                round(sum(stats["util"]) / len(stats["util"]), 1) if stats["util"] else None
+            ),
+            "max_temperature_c": max(stats["temp"]) if stats["temp"] else None,
+        }
+        for index, stats in sorted(per_gpu.items())
+    }
+    busy_windows = sum(utilization_sec(samples, w.start, w.end) for w in windows)
+    tokens = [w.output_tokens for w in windows]
+    tokens_per_util: Optional[float] = None
+    if windows and busy_windows > 0 and all(t is not None for t in tokens):
+        tokens_per_util = round(sum(t for t in tokens if t is not None) / busy_windows, 3)
+    return {
+        "ok": True,
+        "samples": len(samples),
+        "peak_used_mib": max(max(stats["used"]) for stats in per_gpu.values()),
+        "gpus": gpus,
+        "utilization_sec": round(utilization_sec(samples, start, end), 4),
+        "tokens_per_utilization_sec": tokens_per_util,
+        "requests": [
+            {
+                "start": round(w.start - start, 4),
+                "end": round(w.end - start, 4),
+                "output_tokens": w.output_tokens,
+            }
+            for w in windows
+        ],
+        "series": [
+            {
+                "t": round(max(sample.t, start) - start, 4),
+                "gpus": [
+                    {
+                        "index": g.index,
+                        "used_mib": g.used_mib,
+                        "utilization_gpu_pct": g.utilization_gpu_pct,
+                        "temperature_c": g.temperature_c,
+                        "pstate": g.pstate,
+                    }
+                    for g in sample.gpus
+                ],
+            }
+            for sample in samples
+        ],
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Sample GPUs in the background for a while")
+    parser.add_argument("--duration-sec", type=float, default=5.0, help="How long to sample")
+    parser.add_argument("--interval-ms", type=int, default=DEFAULT_INTERVAL_MS)
+    parser.add_argument("--backend", choices=["loop", "poll"], default="loop")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    sampler = BackgroundSampler(make_backend(args.backend, args.interval_ms))
+    try:
+        sampler.start()
+    except Exception as exc:  # CLI tool: report error as JSON
+        print(json.dumps({"ok": False, "error": str(exc)}, indent=2))
+        return 1
+    start = time.perf_counter()
+    try:
+        time.sleep(args.duration_sec)
+    except KeyboardInterrupt:
+        print("interrupted; summarizing", file=sys.stderr)
+    end = time.perf_counter()
+    sampler.stop()
+    summary = summarize_series(sampler.samples(start, end), start, end)
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["ok"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())